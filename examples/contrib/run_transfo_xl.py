@@ -18,6 +18,8 @@
     In particular https://github.com/kimiyoung/transformer-xl/blob/master/pytorch/eval.py
 
     This script with default values evaluates a pretrained Transformer-XL on WikiText 103
+
+    With --stream_file, a text file of any size is instead read and evaluated as a stream, in constant memory.
 """
 
 
@@ -29,6 +31,7 @@ import time
 import torch
 
 from transformers import TransfoXLCorpus, TransfoXLLMHeadModel
+from transformers.tokenization_transfo_xl import LMStreamIterator
 
 
 logging.basicConfig(
@@ -43,6 +46,13 @@ def main():
     parser.add_argument(
         "--split", type=str, default="test", choices=["all", "valid", "test"], help="which split to evaluate"
     )
+    parser.add_argument(
+        "--stream_file",
+        type=str,
+        default=None,
+        help="text file to evaluate as a stream instead of a split of the corpus (each sequence of the batch reads "
+        "a consecutive part of the file)",
+    )
     parser.add_argument("--batch_size", type=int, default=10, help="batch size")
     parser.add_argument("--tgt_len", type=int, default=128, help="number of tokens to predict")
     parser.add_argument("--ext_len", type=int, default=0, help="length of the extended context")
@@ -75,8 +85,15 @@ def main():
     # The pre-processed corpus is a convertion (using the conversion script )
     corpus = TransfoXLCorpus.from_pretrained(args.model_name)
 
-    va_iter = corpus.get_iterator("valid", args.batch_size, args.tgt_len, device=device, ext_len=args.ext_len)
-    te_iter = corpus.get_iterator("test", args.batch_size, args.tgt_len, device=device, ext_len=args.ext_len)
+    if args.stream_file is not None:
+        streams = [
+            corpus.vocab.encode_file_stream(args.stream_file, shard=i, num_shards=args.batch_size)
+            for i in range(args.batch_size)
+        ]
+        stream_iter = LMStreamIterator(streams, args.tgt_len, device=device, ext_len=args.ext_len)
+    else:
+        va_iter = corpus.get_iterator("valid", args.batch_size, args.tgt_len, device=device, ext_len=args.ext_len)
+        te_iter = corpus.get_iterator("test", args.batch_size, args.tgt_len, device=device, ext_len=args.ext_len)
 
     # Load a pre-trained model
     model = TransfoXLLMHeadModel.from_pretrained(args.model_name)
@@ -100,22 +117,31 @@ def main():
     def evaluate(eval_iter):
         # Turn on evaluation mode which disables dropout.
         model.eval()
-        total_len, total_loss = 0, 0.0
+        total_len, total_loss, n_tokens = 0, 0.0, 0
         start_time = time.time()
         with torch.no_grad():
-            mems = None
+            # The memory is updated in place in buffers allocated once
+            mems = model.init_mems(args.batch_size, use_buffers=True)
             for idx, (data, target, seq_len) in enumerate(eval_iter):
-                ret = model(data, lm_labels=target, mems=mems)
+                ret = model(data, labels=target, mems=mems)
                 loss, _, mems = ret
                 loss = loss.mean()
                 total_loss += seq_len * loss.item()
                 total_len += seq_len
+                n_tokens += target.numel()
             total_time = time.time() - start_time
-        logger.info("Time : {:.2f}s, {:.2f}ms/segment".format(total_time, 1000 * total_time / (idx + 1)))
+        logger.info(
+            "Time : {:.2f}s, {:.2f}ms/segment, {:.0f} tokens/s".format(
+                total_time, 1000 * total_time / (idx + 1), n_tokens / total_time
+            )
+        )
         return total_loss / total_len
 
     # Run on test data.
-    if args.split == "all":
+    if args.stream_file is not None:
+        test_loss = evaluate(stream_iter)
+        valid_loss = None
+    elif args.split == "all":
         test_loss = evaluate(te_iter)
         valid_loss = evaluate(va_iter)
     elif args.split == "valid":
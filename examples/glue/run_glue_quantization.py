@@ -0,0 +1,192 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+""" Compares the accuracy and CPU latency of a model fine-tuned on GLUE before and after dynamic quantization
+    (`PreTrainedModel.quantize`), on the dev set of the task. """
+
+
+import argparse
+import io
+import logging
+import os
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, SequentialSampler, TensorDataset
+from tqdm import tqdm
+
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from transformers import glue_compute_metrics as compute_metrics
+from transformers import glue_convert_examples_to_features as convert_examples_to_features
+from transformers import glue_output_modes as output_modes
+from transformers import glue_processors as processors
+from transformers.modeling_utils import QUANTIZATION_DTYPES
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_dev_dataset(args, task, tokenizer):
+    processor = processors[task]()
+    output_mode = output_modes[task]
+    label_list = processor.get_labels()
+    if task in ["mnli", "mnli-mm"] and args.model_type in ["roberta", "xlmroberta"]:
+        # HACK(label indices are swapped in RoBERTa pretrained model)
+        label_list[1], label_list[2] = label_list[2], label_list[1]
+    features = convert_examples_to_features(
+        processor.get_dev_examples(args.data_dir),
+        tokenizer,
+        label_list=label_list,
+        max_length=args.max_seq_length,
+        output_mode=output_mode,
+        pad_on_left=bool(args.model_type in ["xlnet"]),  # pad on the left for xlnet
+        pad_token=tokenizer.convert_tokens_to_ids([tokenizer.pad_token])[0],
+        pad_token_segment_id=4 if args.model_type in ["xlnet"] else 0,
+    )
+
+    all_input_ids = torch.tensor([f.input_ids for f in features], dtype=torch.long)
+    all_attention_mask = torch.tensor([f.attention_mask for f in features], dtype=torch.long)
+    all_token_type_ids = torch.tensor([f.token_type_ids for f in features], dtype=torch.long)
+    label_dtype = torch.long if output_mode == "classification" else torch.float
+    all_labels = torch.tensor([f.label for f in features], dtype=label_dtype)
+    return TensorDataset(all_input_ids, all_attention_mask, all_token_type_ids, all_labels)
+
+
+def evaluate(args, model, task, dataset, desc):
+    """ Returns the metrics of `model` on `dataset` and the latencies (in seconds) of its forward passes. """
+    dataloader = DataLoader(dataset, sampler=SequentialSampler(dataset), batch_size=args.eval_batch_size)
+    model.eval()
+
+    preds, labels, latencies = [], [], []
+    for batch in tqdm(dataloader, desc=desc):
+        inputs = {"input_ids": batch[0], "attention_mask": batch[1]}
+        if args.model_type != "distilbert":
+            inputs["token_type_ids"] = (
+                batch[2] if args.model_type in ["bert", "xlnet", "albert"] else None
+            )  # XLM, DistilBERT, RoBERTa, and XLM-RoBERTa don't use segment_ids
+        with torch.no_grad():
+            start = time.perf_counter()
+            logits = model(**inputs)[0]
+            latencies.append(time.perf_counter() - start)
+        preds.append(logits.numpy())
+        labels.append(batch[3].numpy())
+
+    preds, labels = np.concatenate(preds), np.concatenate(labels)
+    preds = np.argmax(preds, axis=1) if output_modes[task] == "classification" else np.squeeze(preds)
+    return compute_metrics(task, preds, labels), np.array(latencies)
+
+
+def model_size(model):
+    """ Size (in MB) of the serialized state dict of `model`. """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    # Required parameters
+    parser.add_argument(
+        "--data_dir", default=None, type=str, required=True, help="The input data dir with the GLUE .tsv files.",
+    )
+    parser.add_argument(
+        "--model_type", default=None, type=str, required=True, help="Model type, e.g. bert, roberta, distilbert.",
+    )
+    parser.add_argument(
+        "--model_name_or_path",
+        default=None,
+        type=str,
+        required=True,
+        help="Path to a model fine-tuned on the task (e.g. the output of run_glue.py).",
+    )
+    parser.add_argument(
+        "--task_name",
+        default=None,
+        type=str,
+        required=True,
+        help="The name of the task: " + ", ".join(processors.keys()),
+    )
+
+    # Other parameters
+    parser.add_argument(
+        "--dtype", default="int8", choices=list(QUANTIZATION_DTYPES), help="Type of the quantized weights."
+    )
+    parser.add_argument(
+        "--modules", nargs="*", default=None, help="Names of the sub-modules to quantize (default: whole model)."
+    )
+    parser.add_argument("--max_seq_length", default=128, type=int, help="Maximum total input sequence length.")
+    parser.add_argument("--eval_batch_size", default=8, type=int, help="Batch size for evaluation.")
+    parser.add_argument("--num_threads", default=None, type=int, help="Number of intra-op threads of PyTorch.")
+    parser.add_argument(
+        "--output_dir", default=None, type=str, help="If set, the quantized model is saved in this directory."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(name)s -   %(message)s",
+        datefmt="%m/%d/%Y %H:%M:%S",
+        level=logging.INFO,
+    )
+    if args.num_threads is not None:
+        torch.set_num_threads(args.num_threads)
+
+    args.task_name = args.task_name.lower()
+    if args.task_name not in processors:
+        raise ValueError("Task not found: %s" % (args.task_name))
+
+    config = AutoConfig.from_pretrained(args.model_name_or_path)
+    tokenizer = AutoTokenizer.from_pretrained(args.model_name_or_path)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model_name_or_path, config=config)
+
+    # MNLI is evaluated on both the matched and mis-matched dev sets
+    eval_tasks = ("mnli", "mnli-mm") if args.task_name == "mnli" else (args.task_name,)
+    datasets = [load_dev_dataset(args, task, tokenizer) for task in eval_tasks]
+
+    results = {}
+    for name in ("float32", args.dtype):
+        if name == args.dtype:
+            model.quantize(dtype=args.dtype, modules=args.modules)
+        size = model_size(model)
+        for task, dataset in zip(eval_tasks, datasets):
+            metrics, latencies = evaluate(args, model, task, dataset, desc="Evaluating {} {}".format(task, name))
+            results[(name, task)] = (metrics, latencies, size)
+
+    logger.info("***** Quantization results *****")
+    for (name, task), (metrics, latencies, size) in results.items():
+        logger.info("  %s %s (%.1f MB)", task, name, size)
+        for key in sorted(metrics.keys()):
+            logger.info("    %s = %s", key, str(metrics[key]))
+        logger.info(
+            "    latency per batch of %d: mean %.2f ms, p50 %.2f ms, p95 %.2f ms, total %.2f s",
+            args.eval_batch_size,
+            1000 * latencies.mean(),
+            1000 * np.percentile(latencies, 50),
+            1000 * np.percentile(latencies, 95),
+            latencies.sum(),
+        )
+    for task in eval_tasks:
+        speedup = results[("float32", task)][1].sum() / results[(args.dtype, task)][1].sum()
+        logger.info("  %s speedup: %.2fx", task, speedup)
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        model.save_pretrained(args.output_dir)
+        tokenizer.save_pretrained(args.output_dir)
+        logger.info("Quantized model saved in %s", args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,45 +4,39 @@ from pathlib import Path
 import torch
 from tqdm import tqdm
 
-from transformers import BartForConditionalGeneration, BartTokenizer
+from transformers import BartForConditionalGeneration, BartTokenizer, SummarizationPipeline
 
 
 DEFAULT_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
 
-def chunks(lst, n):
-    """Yield successive n-sized chunks from lst."""
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
-
-
 def generate_summaries(
     examples: list, out_file: str, model_name: str, batch_size: int = 8, device: str = DEFAULT_DEVICE
 ):
     fout = Path(out_file).open("w")
-    model = BartForConditionalGeneration.from_pretrained(model_name, output_past=True,).to(device)
+    model = BartForConditionalGeneration.from_pretrained(model_name, output_past=True,)
     tokenizer = BartTokenizer.from_pretrained("bart-large")
+    device = torch.device(device)
+    # The articles are summarized in batches of articles of similar lengths, the summaries come in the same order
+    device_ordinal = -1 if device.type == "cpu" else device.index or 0
+    summarizer = SummarizationPipeline(model=model, tokenizer=tokenizer, device=device_ordinal, batch_size=batch_size)
 
     max_length = 140
     min_length = 55
 
-    for batch in tqdm(list(chunks(examples, batch_size))):
-        dct = tokenizer.batch_encode_plus(batch, max_length=1024, return_tensors="pt", pad_to_max_length=True)
-        summaries = model.generate(
-            input_ids=dct["input_ids"].to(device),
-            attention_mask=dct["attention_mask"].to(device),
-            num_beams=4,
-            length_penalty=2.0,
-            max_length=max_length + 2,  # +2 from original because we start at step=1 and stop before max_length
-            min_length=min_length + 1,  # +1 from original because we start at step=1
-            no_repeat_ngram_size=3,
-            early_stopping=True,
-            decoder_start_token_id=model.config.eos_token_id,
-        )
-        dec = [tokenizer.decode(g, skip_special_tokens=True, clean_up_tokenization_spaces=False) for g in summaries]
-        for hypothesis in dec:
-            fout.write(hypothesis + "\n")
-            fout.flush()
+    summaries = summarizer.iter_results(
+        examples,
+        num_beams=4,
+        length_penalty=2.0,
+        max_length=max_length + 2,  # +2 from original because we start at step=1 and stop before max_length
+        min_length=min_length + 1,  # +1 from original because we start at step=1
+        no_repeat_ngram_size=3,
+        early_stopping=True,
+        decoder_start_token_id=model.config.eos_token_id,
+    )
+    for summary in tqdm(summaries, total=len(examples)):
+        fout.write(summary["summary_text"] + "\n")
+        fout.flush()
 
 
 def run_generate():
@@ -18,473 +18,473 @@ else:
     absl.logging._warn_preinit_stderr = False
 
 import logging
-
-# Benchmarking
-from .benchmark_utils import (
-    Frame,
-    Memory,
-    MemoryState,
-    MemorySummary,
-    MemoryTrace,
-    UsedMemoryState,
-    bytes_to_human_readable,
-    start_memory_tracing,
-    stop_memory_tracing,
-)
-from .configuration_albert import ALBERT_PRETRAINED_CONFIG_ARCHIVE_MAP, AlbertConfig
-from .configuration_auto import ALL_PRETRAINED_CONFIG_ARCHIVE_MAP, CONFIG_MAPPING, AutoConfig
-from .configuration_bart import BartConfig
-from .configuration_bert import BERT_PRETRAINED_CONFIG_ARCHIVE_MAP, BertConfig
-from .configuration_camembert import CAMEMBERT_PRETRAINED_CONFIG_ARCHIVE_MAP, CamembertConfig
-from .configuration_ctrl import CTRL_PRETRAINED_CONFIG_ARCHIVE_MAP, CTRLConfig
-from .configuration_distilbert import DISTILBERT_PRETRAINED_CONFIG_ARCHIVE_MAP, DistilBertConfig
-from .configuration_electra import ELECTRA_PRETRAINED_CONFIG_ARCHIVE_MAP, ElectraConfig
-from .configuration_flaubert import FLAUBERT_PRETRAINED_CONFIG_ARCHIVE_MAP, FlaubertConfig
-from .configuration_gpt2 import GPT2_PRETRAINED_CONFIG_ARCHIVE_MAP, GPT2Config
-from .configuration_mmbt import MMBTConfig
-from .configuration_openai import OPENAI_GPT_PRETRAINED_CONFIG_ARCHIVE_MAP, OpenAIGPTConfig
-from .configuration_roberta import ROBERTA_PRETRAINED_CONFIG_ARCHIVE_MAP, RobertaConfig
-from .configuration_t5 import T5_PRETRAINED_CONFIG_ARCHIVE_MAP, T5Config
-from .configuration_transfo_xl import TRANSFO_XL_PRETRAINED_CONFIG_ARCHIVE_MAP, TransfoXLConfig
-
-# Configurations
-from .configuration_utils import PretrainedConfig
-from .configuration_xlm import XLM_PRETRAINED_CONFIG_ARCHIVE_MAP, XLMConfig
-from .configuration_xlm_roberta import XLM_ROBERTA_PRETRAINED_CONFIG_ARCHIVE_MAP, XLMRobertaConfig
-from .configuration_xlnet import XLNET_PRETRAINED_CONFIG_ARCHIVE_MAP, XLNetConfig
-from .data import (
-    DataProcessor,
-    InputExample,
-    InputFeatures,
-    SingleSentenceClassificationProcessor,
-    SquadExample,
-    SquadFeatures,
-    SquadV1Processor,
-    SquadV2Processor,
-    glue_convert_examples_to_features,
-    glue_output_modes,
-    glue_processors,
-    glue_tasks_num_labels,
-    is_sklearn_available,
-    squad_convert_examples_to_features,
-    xnli_output_modes,
-    xnli_processors,
-    xnli_tasks_num_labels,
-)
-
-# Files and general utilities
-from .file_utils import (
-    CONFIG_NAME,
-    MODEL_CARD_NAME,
-    PYTORCH_PRETRAINED_BERT_CACHE,
-    PYTORCH_TRANSFORMERS_CACHE,
-    TF2_WEIGHTS_NAME,
-    TF_WEIGHTS_NAME,
-    TRANSFORMERS_CACHE,
-    WEIGHTS_NAME,
-    add_end_docstrings,
-    add_start_docstrings,
-    cached_path,
-    is_tf_available,
-    is_torch_available,
-)
-
-# Model Cards
-from .modelcard import ModelCard
-
-# TF 2.0 <=> PyTorch conversion utilities
-from .modeling_tf_pytorch_utils import (
-    convert_tf_weight_name_to_pt_weight_name,
-    load_pytorch_checkpoint_in_tf2_model,
-    load_pytorch_model_in_tf2_model,
-    load_pytorch_weights_in_tf2_model,
-    load_tf2_checkpoint_in_pytorch_model,
-    load_tf2_model_in_pytorch_model,
-    load_tf2_weights_in_pytorch_model,
-)
-
-# Pipelines
-from .pipelines import (
-    CsvPipelineDataFormat,
-    FeatureExtractionPipeline,
-    FillMaskPipeline,
-    JsonPipelineDataFormat,
-    NerPipeline,
-    PipedPipelineDataFormat,
-    Pipeline,
-    PipelineDataFormat,
-    QuestionAnsweringPipeline,
-    SummarizationPipeline,
-    TextClassificationPipeline,
-    TokenClassificationPipeline,
-    TranslationPipeline,
-    pipeline,
-)
-from .tokenization_albert import AlbertTokenizer
-from .tokenization_auto import TOKENIZER_MAPPING, AutoTokenizer
-from .tokenization_bart import BartTokenizer
-from .tokenization_bert import BasicTokenizer, BertTokenizer, BertTokenizerFast, WordpieceTokenizer
-from .tokenization_bert_japanese import BertJapaneseTokenizer, CharacterTokenizer, MecabTokenizer
-from .tokenization_camembert import CamembertTokenizer
-from .tokenization_ctrl import CTRLTokenizer
-from .tokenization_distilbert import DistilBertTokenizer, DistilBertTokenizerFast
-from .tokenization_electra import ElectraTokenizer, ElectraTokenizerFast
-from .tokenization_flaubert import FlaubertTokenizer
-from .tokenization_gpt2 import GPT2Tokenizer, GPT2TokenizerFast
-from .tokenization_openai import OpenAIGPTTokenizer, OpenAIGPTTokenizerFast
-from .tokenization_roberta import RobertaTokenizer, RobertaTokenizerFast
-from .tokenization_t5 import T5Tokenizer
-from .tokenization_transfo_xl import TransfoXLCorpus, TransfoXLTokenizer, TransfoXLTokenizerFast
-
-# Tokenizers
-from .tokenization_utils import PreTrainedTokenizer
-from .tokenization_xlm import XLMTokenizer
-from .tokenization_xlm_roberta import XLMRobertaTokenizer
-from .tokenization_xlnet import SPIECE_UNDERLINE, XLNetTokenizer
-
-
-logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
-
-
-if is_sklearn_available():
-    from .data import glue_compute_metrics, xnli_compute_metrics
-
+import sys
+
+from .file_utils import _LazyModule, _sklearn_available, is_tf_available, is_torch_available
+
+
+# The objects of the public API, by submodule. Submodules are only imported when one of their objects is
+# accessed (see `_LazyModule`), so that `import transformers` doesn't import every model, nor PyTorch/TensorFlow.
+_import_structure = {
+    # Benchmarking
+    "benchmark_utils": [
+        "Frame",
+        "Memory",
+        "MemoryState",
+        "MemorySummary",
+        "MemoryTrace",
+        "UsedMemoryState",
+        "bytes_to_human_readable",
+        "start_memory_tracing",
+        "stop_memory_tracing",
+    ],
+    # Configurations
+    "configuration_albert": ["ALBERT_PRETRAINED_CONFIG_ARCHIVE_MAP", "AlbertConfig"],
+    "configuration_auto": ["ALL_PRETRAINED_CONFIG_ARCHIVE_MAP", "CONFIG_MAPPING", "AutoConfig"],
+    "configuration_bart": ["BartConfig"],
+    "configuration_bert": ["BERT_PRETRAINED_CONFIG_ARCHIVE_MAP", "BertConfig"],
+    "configuration_camembert": ["CAMEMBERT_PRETRAINED_CONFIG_ARCHIVE_MAP", "CamembertConfig"],
+    "configuration_ctrl": ["CTRL_PRETRAINED_CONFIG_ARCHIVE_MAP", "CTRLConfig"],
+    "configuration_distilbert": ["DISTILBERT_PRETRAINED_CONFIG_ARCHIVE_MAP", "DistilBertConfig"],
+    "configuration_electra": ["ELECTRA_PRETRAINED_CONFIG_ARCHIVE_MAP", "ElectraConfig"],
+    "configuration_flaubert": ["FLAUBERT_PRETRAINED_CONFIG_ARCHIVE_MAP", "FlaubertConfig"],
+    "configuration_gpt2": ["GPT2_PRETRAINED_CONFIG_ARCHIVE_MAP", "GPT2Config"],
+    "configuration_mmbt": ["MMBTConfig"],
+    "configuration_openai": ["OPENAI_GPT_PRETRAINED_CONFIG_ARCHIVE_MAP", "OpenAIGPTConfig"],
+    "configuration_roberta": ["ROBERTA_PRETRAINED_CONFIG_ARCHIVE_MAP", "RobertaConfig"],
+    "configuration_t5": ["T5_PRETRAINED_CONFIG_ARCHIVE_MAP", "T5Config"],
+    "configuration_transfo_xl": ["TRANSFO_XL_PRETRAINED_CONFIG_ARCHIVE_MAP", "TransfoXLConfig"],
+    "configuration_utils": ["PretrainedConfig"],
+    "configuration_xlm": ["XLM_PRETRAINED_CONFIG_ARCHIVE_MAP", "XLMConfig"],
+    "configuration_xlm_roberta": ["XLM_ROBERTA_PRETRAINED_CONFIG_ARCHIVE_MAP", "XLMRobertaConfig"],
+    "configuration_xlnet": ["XLNET_PRETRAINED_CONFIG_ARCHIVE_MAP", "XLNetConfig"],
+    # Data
+    "data": [
+        "DataProcessor",
+        "InputExample",
+        "InputFeatures",
+        "SingleSentenceClassificationProcessor",
+        "SquadExample",
+        "SquadFeatures",
+        "SquadV1Processor",
+        "SquadV2Processor",
+        "glue_convert_examples_to_features",
+        "glue_output_modes",
+        "glue_processors",
+        "glue_tasks_num_labels",
+        "is_sklearn_available",
+        "squad_convert_examples_to_features",
+        "xnli_output_modes",
+        "xnli_processors",
+        "xnli_tasks_num_labels",
+    ],
+    # Files and general utilities
+    "file_utils": [
+        "CONFIG_NAME",
+        "MMAP_WEIGHTS_NAME",
+        "MODEL_CARD_NAME",
+        "ONNX_WEIGHTS_NAME",
+        "PYTORCH_PRETRAINED_BERT_CACHE",
+        "PYTORCH_TRANSFORMERS_CACHE",
+        "TF2_WEIGHTS_NAME",
+        "TF_WEIGHTS_NAME",
+        "TORCHSCRIPT_CONFIG_NAME",
+        "TRANSFORMERS_CACHE",
+        "WEIGHTS_INDEX_NAME",
+        "WEIGHTS_NAME",
+        "add_end_docstrings",
+        "add_start_docstrings",
+        "cached_path",
+        "cached_paths",
+        "is_onnxruntime_available",
+        "is_pyarrow_available",
+        "is_tf_available",
+        "is_torch_available",
+        "prefetch",
+    ],
+    # Model Cards
+    "modelcard": ["ModelCard"],
+    # TF 2.0 <=> PyTorch conversion utilities
+    "modeling_tf_pytorch_utils": [
+        "convert_tf_weight_name_to_pt_weight_name",
+        "load_pytorch_checkpoint_in_tf2_model",
+        "load_pytorch_model_in_tf2_model",
+        "load_pytorch_weights_in_tf2_model",
+        "load_tf2_checkpoint_in_pytorch_model",
+        "load_tf2_model_in_pytorch_model",
+        "load_tf2_weights_in_pytorch_model",
+    ],
+    # Pipelines
+    "pipelines": [
+        "ArrowPipelineDataFormat",
+        "CsvPipelineDataFormat",
+        "FeatureExtractionPipeline",
+        "FillMaskPipeline",
+        "JsonLinesPipelineDataFormat",
+        "JsonPipelineDataFormat",
+        "NerPipeline",
+        "PipedPipelineDataFormat",
+        "Pipeline",
+        "PipelineDataFormat",
+        "QuestionAnsweringPipeline",
+        "SummarizationPipeline",
+        "TextClassificationPipeline",
+        "TokenClassificationPipeline",
+        "TranslationPipeline",
+        "pipeline",
+    ],
+    # Tokenizers
+    "tokenization_albert": ["AlbertTokenizer"],
+    "tokenization_auto": ["TOKENIZER_MAPPING", "AutoTokenizer"],
+    "tokenization_bart": ["BartTokenizer"],
+    "tokenization_bert": ["BasicTokenizer", "BertTokenizer", "BertTokenizerFast", "WordpieceTokenizer"],
+    "tokenization_bert_japanese": ["BertJapaneseTokenizer", "CharacterTokenizer", "MecabTokenizer"],
+    "tokenization_camembert": ["CamembertTokenizer"],
+    "tokenization_ctrl": ["CTRLTokenizer"],
+    "tokenization_distilbert": ["DistilBertTokenizer", "DistilBertTokenizerFast"],
+    "tokenization_electra": ["ElectraTokenizer", "ElectraTokenizerFast"],
+    "tokenization_flaubert": ["FlaubertTokenizer"],
+    "tokenization_gpt2": ["GPT2Tokenizer", "GPT2TokenizerFast"],
+    "tokenization_openai": ["OpenAIGPTTokenizer", "OpenAIGPTTokenizerFast"],
+    "tokenization_roberta": ["RobertaTokenizer", "RobertaTokenizerFast"],
+    "tokenization_t5": ["T5Tokenizer"],
+    "tokenization_transfo_xl": ["TransfoXLCorpus", "TransfoXLTokenizer", "TransfoXLTokenizerFast"],
+    "tokenization_utils": ["PreTrainedTokenizer"],
+    "tokenization_xlm": ["XLMTokenizer"],
+    "tokenization_xlm_roberta": ["XLMRobertaTokenizer"],
+    "tokenization_xlnet": ["SPIECE_UNDERLINE", "XLNetTokenizer"],
+}
+
+if _sklearn_available:
+    _import_structure["data"].extend(["glue_compute_metrics", "xnli_compute_metrics"])
 
 # Modeling
 if is_torch_available():
-    from .modeling_utils import PreTrainedModel, prune_layer, Conv1D, top_k_top_p_filtering
-    from .modeling_auto import (
-        AutoModel,
-        AutoModelForPreTraining,
-        AutoModelForSequenceClassification,
-        AutoModelForQuestionAnswering,
-        AutoModelWithLMHead,
-        AutoModelForTokenClassification,
-        ALL_PRETRAINED_MODEL_ARCHIVE_MAP,
-        MODEL_MAPPING,
-        MODEL_FOR_PRETRAINING_MAPPING,
-        MODEL_WITH_LM_HEAD_MAPPING,
-        MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING,
-        MODEL_FOR_QUESTION_ANSWERING_MAPPING,
-        MODEL_FOR_TOKEN_CLASSIFICATION_MAPPING,
-    )
-
-    from .modeling_bert import (
-        BertPreTrainedModel,
-        BertModel,
-        BertForPreTraining,
-        BertForMaskedLM,
-        BertForNextSentencePrediction,
-        BertForSequenceClassification,
-        BertForMultipleChoice,
-        BertForTokenClassification,
-        BertForQuestionAnswering,
-        load_tf_weights_in_bert,
-        BERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_openai import (
-        OpenAIGPTPreTrainedModel,
-        OpenAIGPTModel,
-        OpenAIGPTLMHeadModel,
-        OpenAIGPTDoubleHeadsModel,
-        load_tf_weights_in_openai_gpt,
-        OPENAI_GPT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_transfo_xl import (
-        TransfoXLPreTrainedModel,
-        TransfoXLModel,
-        TransfoXLLMHeadModel,
-        AdaptiveEmbedding,
-        load_tf_weights_in_transfo_xl,
-        TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_gpt2 import (
-        GPT2PreTrainedModel,
-        GPT2Model,
-        GPT2LMHeadModel,
-        GPT2DoubleHeadsModel,
-        load_tf_weights_in_gpt2,
-        GPT2_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_ctrl import CTRLPreTrainedModel, CTRLModel, CTRLLMHeadModel, CTRL_PRETRAINED_MODEL_ARCHIVE_MAP
-    from .modeling_xlnet import (
-        XLNetPreTrainedModel,
-        XLNetModel,
-        XLNetLMHeadModel,
-        XLNetForSequenceClassification,
-        XLNetForTokenClassification,
-        XLNetForMultipleChoice,
-        XLNetForQuestionAnsweringSimple,
-        XLNetForQuestionAnswering,
-        load_tf_weights_in_xlnet,
-        XLNET_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_xlm import (
-        XLMPreTrainedModel,
-        XLMModel,
-        XLMWithLMHeadModel,
-        XLMForSequenceClassification,
-        XLMForTokenClassification,
-        XLMForQuestionAnswering,
-        XLMForQuestionAnsweringSimple,
-        XLM_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_bart import (
-        BartForSequenceClassification,
-        BartModel,
-        BartForConditionalGeneration,
-        BART_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_roberta import (
-        RobertaForMaskedLM,
-        RobertaModel,
-        RobertaForSequenceClassification,
-        RobertaForMultipleChoice,
-        RobertaForTokenClassification,
-        RobertaForQuestionAnswering,
-        ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_distilbert import (
-        DistilBertPreTrainedModel,
-        DistilBertForMaskedLM,
-        DistilBertModel,
-        DistilBertForSequenceClassification,
-        DistilBertForQuestionAnswering,
-        DistilBertForTokenClassification,
-        DISTILBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_camembert import (
-        CamembertForMaskedLM,
-        CamembertModel,
-        CamembertForSequenceClassification,
-        CamembertForMultipleChoice,
-        CamembertForTokenClassification,
-        CamembertForQuestionAnswering,
-        CAMEMBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_encoder_decoder import PreTrainedEncoderDecoder
-    from .modeling_t5 import (
-        T5PreTrainedModel,
-        T5Model,
-        T5ForConditionalGeneration,
-        load_tf_weights_in_t5,
-        T5_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_albert import (
-        AlbertPreTrainedModel,
-        AlbertModel,
-        AlbertForMaskedLM,
-        AlbertForSequenceClassification,
-        AlbertForQuestionAnswering,
-        AlbertForTokenClassification,
-        load_tf_weights_in_albert,
-        ALBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_xlm_roberta import (
-        XLMRobertaForMaskedLM,
-        XLMRobertaModel,
-        XLMRobertaForMultipleChoice,
-        XLMRobertaForSequenceClassification,
-        XLMRobertaForTokenClassification,
-        XLM_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-    from .modeling_mmbt import ModalEmbeddings, MMBTModel, MMBTForClassification
-
-    from .modeling_flaubert import (
-        FlaubertModel,
-        FlaubertWithLMHeadModel,
-        FlaubertForSequenceClassification,
-        FlaubertForQuestionAnswering,
-        FlaubertForQuestionAnsweringSimple,
-        FLAUBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_electra import (
-        ElectraForPreTraining,
-        ElectraForMaskedLM,
-        ElectraForTokenClassification,
-        ElectraModel,
-        load_tf_weights_in_electra,
-        ELECTRA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
+    _import_structure["modeling_utils"] = ["PreTrainedModel", "prune_layer", "Conv1D", "top_k_top_p_filtering"]
+    _import_structure["modeling_torchscript"] = ["TorchScriptModel"]
+    _import_structure["modeling_onnx"] = ["OnnxModel"]
+    _import_structure["modeling_auto"] = [
+        "AutoModel",
+        "AutoModelForPreTraining",
+        "AutoModelForSequenceClassification",
+        "AutoModelForQuestionAnswering",
+        "AutoModelWithLMHead",
+        "AutoModelForTokenClassification",
+        "ALL_PRETRAINED_MODEL_ARCHIVE_MAP",
+        "MODEL_MAPPING",
+        "MODEL_FOR_PRETRAINING_MAPPING",
+        "MODEL_WITH_LM_HEAD_MAPPING",
+        "MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING",
+        "MODEL_FOR_QUESTION_ANSWERING_MAPPING",
+        "MODEL_FOR_TOKEN_CLASSIFICATION_MAPPING",
+    ]
+    _import_structure["modeling_bert"] = [
+        "BertPreTrainedModel",
+        "BertModel",
+        "BertForPreTraining",
+        "BertForMaskedLM",
+        "BertForNextSentencePrediction",
+        "BertForSequenceClassification",
+        "BertForMultipleChoice",
+        "BertForTokenClassification",
+        "BertForQuestionAnswering",
+        "load_tf_weights_in_bert",
+        "BERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_openai"] = [
+        "OpenAIGPTPreTrainedModel",
+        "OpenAIGPTModel",
+        "OpenAIGPTLMHeadModel",
+        "OpenAIGPTDoubleHeadsModel",
+        "load_tf_weights_in_openai_gpt",
+        "OPENAI_GPT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_transfo_xl"] = [
+        "TransfoXLPreTrainedModel",
+        "TransfoXLModel",
+        "TransfoXLLMHeadModel",
+        "TransfoXLMems",
+        "AdaptiveEmbedding",
+        "load_tf_weights_in_transfo_xl",
+        "TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_gpt2"] = [
+        "GPT2PreTrainedModel",
+        "GPT2Model",
+        "GPT2LMHeadModel",
+        "GPT2DoubleHeadsModel",
+        "load_tf_weights_in_gpt2",
+        "GPT2_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_ctrl"] = [
+        "CTRLPreTrainedModel",
+        "CTRLModel",
+        "CTRLLMHeadModel",
+        "CTRL_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_xlnet"] = [
+        "XLNetPreTrainedModel",
+        "XLNetModel",
+        "XLNetLMHeadModel",
+        "XLNetForSequenceClassification",
+        "XLNetForTokenClassification",
+        "XLNetForMultipleChoice",
+        "XLNetForQuestionAnsweringSimple",
+        "XLNetForQuestionAnswering",
+        "load_tf_weights_in_xlnet",
+        "XLNET_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_xlm"] = [
+        "XLMPreTrainedModel",
+        "XLMModel",
+        "XLMWithLMHeadModel",
+        "XLMForSequenceClassification",
+        "XLMForTokenClassification",
+        "XLMForQuestionAnswering",
+        "XLMForQuestionAnsweringSimple",
+        "XLM_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_bart"] = [
+        "BartForSequenceClassification",
+        "BartModel",
+        "BartForConditionalGeneration",
+        "BART_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_roberta"] = [
+        "RobertaForMaskedLM",
+        "RobertaModel",
+        "RobertaForSequenceClassification",
+        "RobertaForMultipleChoice",
+        "RobertaForTokenClassification",
+        "RobertaForQuestionAnswering",
+        "ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_distilbert"] = [
+        "DistilBertPreTrainedModel",
+        "DistilBertForMaskedLM",
+        "DistilBertModel",
+        "DistilBertForSequenceClassification",
+        "DistilBertForQuestionAnswering",
+        "DistilBertForTokenClassification",
+        "DISTILBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_camembert"] = [
+        "CamembertForMaskedLM",
+        "CamembertModel",
+        "CamembertForSequenceClassification",
+        "CamembertForMultipleChoice",
+        "CamembertForTokenClassification",
+        "CamembertForQuestionAnswering",
+        "CAMEMBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_encoder_decoder"] = ["PreTrainedEncoderDecoder"]
+    _import_structure["modeling_t5"] = [
+        "T5PreTrainedModel",
+        "T5Model",
+        "T5ForConditionalGeneration",
+        "load_tf_weights_in_t5",
+        "T5_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_albert"] = [
+        "AlbertPreTrainedModel",
+        "AlbertModel",
+        "AlbertForMaskedLM",
+        "AlbertForSequenceClassification",
+        "AlbertForQuestionAnswering",
+        "AlbertForTokenClassification",
+        "load_tf_weights_in_albert",
+        "ALBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_xlm_roberta"] = [
+        "XLMRobertaForMaskedLM",
+        "XLMRobertaModel",
+        "XLMRobertaForMultipleChoice",
+        "XLMRobertaForSequenceClassification",
+        "XLMRobertaForTokenClassification",
+        "XLM_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_mmbt"] = ["ModalEmbeddings", "MMBTModel", "MMBTForClassification"]
+    _import_structure["modeling_flaubert"] = [
+        "FlaubertModel",
+        "FlaubertWithLMHeadModel",
+        "FlaubertForSequenceClassification",
+        "FlaubertForQuestionAnswering",
+        "FlaubertForQuestionAnsweringSimple",
+        "FLAUBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_electra"] = [
+        "ElectraForPreTraining",
+        "ElectraForMaskedLM",
+        "ElectraForTokenClassification",
+        "ElectraModel",
+        "load_tf_weights_in_electra",
+        "ELECTRA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
 
     # Optimization
-    from .optimization import (
-        AdamW,
-        get_constant_schedule,
-        get_constant_schedule_with_warmup,
-        get_cosine_schedule_with_warmup,
-        get_cosine_with_hard_restarts_schedule_with_warmup,
-        get_linear_schedule_with_warmup,
-    )
-
+    _import_structure["optimization"] = [
+        "AdamW",
+        "get_constant_schedule",
+        "get_constant_schedule_with_warmup",
+        "get_cosine_schedule_with_warmup",
+        "get_cosine_with_hard_restarts_schedule_with_warmup",
+        "get_linear_schedule_with_warmup",
+    ]
 
 # TensorFlow
 if is_tf_available():
-    from .modeling_tf_utils import (
-        TFPreTrainedModel,
-        TFSharedEmbeddings,
-        TFSequenceSummary,
-        shape_list,
-        tf_top_k_top_p_filtering,
-    )
-    from .modeling_tf_auto import (
-        TFAutoModel,
-        TFAutoModelForPreTraining,
-        TFAutoModelForSequenceClassification,
-        TFAutoModelForQuestionAnswering,
-        TFAutoModelWithLMHead,
-        TFAutoModelForTokenClassification,
-        TF_ALL_PRETRAINED_MODEL_ARCHIVE_MAP,
-        TF_MODEL_MAPPING,
-        TF_MODEL_FOR_PRETRAINING_MAPPING,
-        TF_MODEL_WITH_LM_HEAD_MAPPING,
-        TF_MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING,
-        TF_MODEL_FOR_QUESTION_ANSWERING_MAPPING,
-        TF_MODEL_FOR_TOKEN_CLASSIFICATION_MAPPING,
-    )
-
-    from .modeling_tf_bert import (
-        TFBertPreTrainedModel,
-        TFBertMainLayer,
-        TFBertEmbeddings,
-        TFBertModel,
-        TFBertForPreTraining,
-        TFBertForMaskedLM,
-        TFBertForNextSentencePrediction,
-        TFBertForSequenceClassification,
-        TFBertForMultipleChoice,
-        TFBertForTokenClassification,
-        TFBertForQuestionAnswering,
-        TF_BERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_gpt2 import (
-        TFGPT2PreTrainedModel,
-        TFGPT2MainLayer,
-        TFGPT2Model,
-        TFGPT2LMHeadModel,
-        TFGPT2DoubleHeadsModel,
-        TF_GPT2_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_openai import (
-        TFOpenAIGPTPreTrainedModel,
-        TFOpenAIGPTMainLayer,
-        TFOpenAIGPTModel,
-        TFOpenAIGPTLMHeadModel,
-        TFOpenAIGPTDoubleHeadsModel,
-        TF_OPENAI_GPT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_transfo_xl import (
-        TFTransfoXLPreTrainedModel,
-        TFTransfoXLMainLayer,
-        TFTransfoXLModel,
-        TFTransfoXLLMHeadModel,
-        TF_TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP,
-        TFAdaptiveEmbedding,
-    )
-
-    from .modeling_tf_xlnet import (
-        TFXLNetPreTrainedModel,
-        TFXLNetMainLayer,
-        TFXLNetModel,
-        TFXLNetLMHeadModel,
-        TFXLNetForSequenceClassification,
-        TFXLNetForTokenClassification,
-        TFXLNetForQuestionAnsweringSimple,
-        TF_XLNET_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_xlm import (
-        TFXLMPreTrainedModel,
-        TFXLMMainLayer,
-        TFXLMModel,
-        TFXLMWithLMHeadModel,
-        TFXLMForSequenceClassification,
-        TFXLMForQuestionAnsweringSimple,
-        TF_XLM_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_xlm_roberta import (
-        TFXLMRobertaForMaskedLM,
-        TFXLMRobertaModel,
-        TFXLMRobertaForSequenceClassification,
-        TFXLMRobertaForTokenClassification,
-        TF_XLM_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_roberta import (
-        TFRobertaPreTrainedModel,
-        TFRobertaMainLayer,
-        TFRobertaModel,
-        TFRobertaForMaskedLM,
-        TFRobertaForSequenceClassification,
-        TFRobertaForTokenClassification,
-        TF_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
+    _import_structure["modeling_tf_utils"] = [
+        "TFPreTrainedModel",
+        "TFSharedEmbeddings",
+        "TFSequenceSummary",
+        "shape_list",
+        "tf_top_k_top_p_filtering",
+    ]
+    _import_structure["modeling_tf_auto"] = [
+        "TFAutoModel",
+        "TFAutoModelForPreTraining",
+        "TFAutoModelForSequenceClassification",
+        "TFAutoModelForQuestionAnswering",
+        "TFAutoModelWithLMHead",
+        "TFAutoModelForTokenClassification",
+        "TF_ALL_PRETRAINED_MODEL_ARCHIVE_MAP",
+        "TF_MODEL_MAPPING",
+        "TF_MODEL_FOR_PRETRAINING_MAPPING",
+        "TF_MODEL_WITH_LM_HEAD_MAPPING",
+        "TF_MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING",
+        "TF_MODEL_FOR_QUESTION_ANSWERING_MAPPING",
+        "TF_MODEL_FOR_TOKEN_CLASSIFICATION_MAPPING",
+    ]
+    _import_structure["modeling_tf_bert"] = [
+        "TFBertPreTrainedModel",
+        "TFBertMainLayer",
+        "TFBertEmbeddings",
+        "TFBertModel",
+        "TFBertForPreTraining",
+        "TFBertForMaskedLM",
+        "TFBertForNextSentencePrediction",
+        "TFBertForSequenceClassification",
+        "TFBertForMultipleChoice",
+        "TFBertForTokenClassification",
+        "TFBertForQuestionAnswering",
+        "TF_BERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_gpt2"] = [
+        "TFGPT2PreTrainedModel",
+        "TFGPT2MainLayer",
+        "TFGPT2Model",
+        "TFGPT2LMHeadModel",
+        "TFGPT2DoubleHeadsModel",
+        "TF_GPT2_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_openai"] = [
+        "TFOpenAIGPTPreTrainedModel",
+        "TFOpenAIGPTMainLayer",
+        "TFOpenAIGPTModel",
+        "TFOpenAIGPTLMHeadModel",
+        "TFOpenAIGPTDoubleHeadsModel",
+        "TF_OPENAI_GPT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_transfo_xl"] = [
+        "TFTransfoXLPreTrainedModel",
+        "TFTransfoXLMainLayer",
+        "TFTransfoXLModel",
+        "TFTransfoXLLMHeadModel",
+        "TF_TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP",
+        "TFAdaptiveEmbedding",
+    ]
+    _import_structure["modeling_tf_xlnet"] = [
+        "TFXLNetPreTrainedModel",
+        "TFXLNetMainLayer",
+        "TFXLNetModel",
+        "TFXLNetLMHeadModel",
+        "TFXLNetForSequenceClassification",
+        "TFXLNetForTokenClassification",
+        "TFXLNetForQuestionAnsweringSimple",
+        "TF_XLNET_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_xlm"] = [
+        "TFXLMPreTrainedModel",
+        "TFXLMMainLayer",
+        "TFXLMModel",
+        "TFXLMWithLMHeadModel",
+        "TFXLMForSequenceClassification",
+        "TFXLMForQuestionAnsweringSimple",
+        "TF_XLM_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_xlm_roberta"] = [
+        "TFXLMRobertaForMaskedLM",
+        "TFXLMRobertaModel",
+        "TFXLMRobertaForSequenceClassification",
+        "TFXLMRobertaForTokenClassification",
+        "TF_XLM_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_roberta"] = [
+        "TFRobertaPreTrainedModel",
+        "TFRobertaMainLayer",
+        "TFRobertaModel",
+        "TFRobertaForMaskedLM",
+        "TFRobertaForSequenceClassification",
+        "TFRobertaForTokenClassification",
+        "TF_ROBERTA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_camembert"] = [
+        "TFCamembertModel",
+        "TFCamembertForMaskedLM",
+        "TFCamembertForSequenceClassification",
+        "TFCamembertForTokenClassification",
+        "TF_CAMEMBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_flaubert"] = [
+        "TFFlaubertModel",
+        "TFFlaubertWithLMHeadModel",
+        "TFFlaubertForSequenceClassification",
+        "TF_FLAUBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_distilbert"] = [
+        "TFDistilBertPreTrainedModel",
+        "TFDistilBertMainLayer",
+        "TFDistilBertModel",
+        "TFDistilBertForMaskedLM",
+        "TFDistilBertForSequenceClassification",
+        "TFDistilBertForTokenClassification",
+        "TFDistilBertForQuestionAnswering",
+        "TF_DISTILBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_ctrl"] = [
+        "TFCTRLPreTrainedModel",
+        "TFCTRLModel",
+        "TFCTRLLMHeadModel",
+        "TF_CTRL_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_albert"] = [
+        "TFAlbertPreTrainedModel",
+        "TFAlbertMainLayer",
+        "TFAlbertModel",
+        "TFAlbertForMaskedLM",
+        "TFAlbertForSequenceClassification",
+        "TF_ALBERT_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_t5"] = [
+        "TFT5PreTrainedModel",
+        "TFT5Model",
+        "TFT5ForConditionalGeneration",
+        "TF_T5_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
+    _import_structure["modeling_tf_electra"] = [
+        "TFElectraPreTrainedModel",
+        "TFElectraModel",
+        "TFElectraForPreTraining",
+        "TFElectraForMaskedLM",
+        "TFElectraForTokenClassification",
+        "TF_ELECTRA_PRETRAINED_MODEL_ARCHIVE_MAP",
+    ]
 
-    from .modeling_tf_camembert import (
-        TFCamembertModel,
-        TFCamembertForMaskedLM,
-        TFCamembertForSequenceClassification,
-        TFCamembertForTokenClassification,
-        TF_CAMEMBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_flaubert import (
-        TFFlaubertModel,
-        TFFlaubertWithLMHeadModel,
-        TFFlaubertForSequenceClassification,
-        TF_FLAUBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_distilbert import (
-        TFDistilBertPreTrainedModel,
-        TFDistilBertMainLayer,
-        TFDistilBertModel,
-        TFDistilBertForMaskedLM,
-        TFDistilBertForSequenceClassification,
-        TFDistilBertForTokenClassification,
-        TFDistilBertForQuestionAnswering,
-        TF_DISTILBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_ctrl import (
-        TFCTRLPreTrainedModel,
-        TFCTRLModel,
-        TFCTRLLMHeadModel,
-        TF_CTRL_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_albert import (
-        TFAlbertPreTrainedModel,
-        TFAlbertMainLayer,
-        TFAlbertModel,
-        TFAlbertForMaskedLM,
-        TFAlbertForSequenceClassification,
-        TF_ALBERT_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
-
-    from .modeling_tf_t5 import (
-        TFT5PreTrainedModel,
-        TFT5Model,
-        TFT5ForConditionalGeneration,
-        TF_T5_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
+    # Optimization
+    _import_structure["optimization_tf"] = ["WarmUp", "create_optimizer", "AdamWeightDecay", "GradientAccumulator"]
 
-    from .modeling_tf_electra import (
-        TFElectraPreTrainedModel,
-        TFElectraModel,
-        TFElectraForPreTraining,
-        TFElectraForMaskedLM,
-        TFElectraForTokenClassification,
-        TF_ELECTRA_PRETRAINED_MODEL_ARCHIVE_MAP,
-    )
 
-    # Optimization
-    from .optimization_tf import WarmUp, create_optimizer, AdamWeightDecay, GradientAccumulator
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
 if not is_tf_available() and not is_torch_available():
@@ -493,3 +493,6 @@ if not is_tf_available() and not is_torch_available():
         "Models won't be available and only tokenizers, configuration"
         "and file/data utilities can be used."
     )
+
+
+sys.modules[__name__] = _LazyModule(__name__, globals(), _import_structure)
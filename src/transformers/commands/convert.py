@@ -9,6 +9,12 @@ def convert_command_factory(args: Namespace):
     Factory function used to convert a model TF 1.0 checkpoint in a PyTorch checkpoint.
     :return: ServeCommand
     """
+    if args.to == "onnx":
+        if args.model is None or args.output is None:
+            raise ValueError("--model and --output are required to convert a model to ONNX")
+        return ConvertToOnnxCommand(args.model, args.output, args.pipeline, args.opset, args.use_past)
+    if args.model_type is None or args.tf_checkpoint is None or args.pytorch_dump_output is None:
+        raise ValueError("--model_type, --tf_checkpoint and --pytorch_dump_output are required to convert to PyTorch")
     return ConvertCommand(
         args.model_type, args.tf_checkpoint, args.pytorch_dump_output, args.config, args.finetuning_task_name
     )
@@ -25,15 +31,14 @@ class ConvertCommand(BaseTransformersCLICommand):
         train_parser = parser.add_parser(
             "convert",
             help="CLI tool to run convert model from original "
-            "author checkpoints to Transformers PyTorch checkpoints.",
+            "author checkpoints to Transformers PyTorch checkpoints, or from PyTorch to ONNX.",
         )
-        train_parser.add_argument("--model_type", type=str, required=True, help="Model's type.")
         train_parser.add_argument(
-            "--tf_checkpoint", type=str, required=True, help="TensorFlow checkpoint path or folder."
-        )
-        train_parser.add_argument(
-            "--pytorch_dump_output", type=str, required=True, help="Path to the PyTorch savd model output."
+            "--to", type=str, default="pytorch", choices=["pytorch", "onnx"], help="Format of the converted model."
         )
+        train_parser.add_argument("--model_type", type=str, help="Model's type.")
+        train_parser.add_argument("--tf_checkpoint", type=str, help="TensorFlow checkpoint path or folder.")
+        train_parser.add_argument("--pytorch_dump_output", type=str, help="Path to the PyTorch savd model output.")
         train_parser.add_argument("--config", type=str, default="", help="Configuration file path or folder.")
         train_parser.add_argument(
             "--finetuning_task_name",
@@ -41,6 +46,14 @@ class ConvertCommand(BaseTransformersCLICommand):
             default=None,
             help="Optional fine-tuning task name if the TF model was a finetuned model.",
         )
+        # Conversion to ONNX
+        train_parser.add_argument("--model", type=str, help="Model shortcut name or path to convert to ONNX.")
+        train_parser.add_argument("--output", type=str, help="Directory in which the ONNX graph is saved.")
+        train_parser.add_argument(
+            "--pipeline", type=str, default="feature-extraction", help="Pipeline whose model head is exported."
+        )
+        train_parser.add_argument("--opset", type=int, default=11, help="ONNX operator set version.")
+        train_parser.add_argument("--use_past", action="store_true", help="Export a decoder (GPT-2) with past.")
         train_parser.set_defaults(func=convert_command_factory)
 
     def __init__(
@@ -142,3 +155,19 @@ class ConvertCommand(BaseTransformersCLICommand):
             convert_xlm_checkpoint_to_pytorch(self._tf_checkpoint, self._pytorch_dump_output)
         else:
             raise ValueError("--model_type should be selected in the list [bert, gpt, gpt2, transfo_xl, xlnet, xlm]")
+
+
+class ConvertToOnnxCommand(ConvertCommand):
+    def __init__(self, model: str, output: str, pipeline: str, opset: int, use_past: bool):
+        self._logger = getLogger("transformers-cli/converting")
+        self._model = model
+        self._output = output
+        self._pipeline = pipeline
+        self._opset = opset
+        self._use_past = use_past
+
+    def run(self):
+        from transformers.convert_graph_to_onnx import convert
+
+        output_file = convert(self._model, self._output, self._pipeline, opset=self._opset, use_past=self._use_past)
+        self._logger.info("ONNX graph of {} saved in {}".format(self._model, output_file))
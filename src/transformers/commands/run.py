@@ -1,5 +1,9 @@
+import itertools
 import logging
+import time
 from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from transformers.commands import BaseTransformersCLICommand
 from transformers.pipelines import SUPPORTED_TASKS, Pipeline, PipelineDataFormat, pipeline
@@ -38,13 +42,17 @@ def run_command_factory(args):
         column=args.column if args.column else nlp.default_input_names,
         overwrite=args.overwrite,
     )
-    return RunCommand(nlp, reader)
+    return RunCommand(nlp, reader, batch_size=args.batch_size, num_workers=args.num_workers)
 
 
 class RunCommand(BaseTransformersCLICommand):
-    def __init__(self, nlp: Pipeline, reader: PipelineDataFormat):
+    def __init__(self, nlp: Pipeline, reader: PipelineDataFormat, batch_size: int = 1, num_workers: int = 0):
+        if batch_size < 1 or num_workers < 0:
+            raise ValueError("--batch-size should be at least 1 and --num-workers at least 0")
         self._nlp = nlp
         self._reader = reader
+        self._batch_size = batch_size
+        self._num_workers = num_workers
 
     @staticmethod
     def register_subcommand(parser: ArgumentParser):
@@ -75,22 +83,70 @@ class RunCommand(BaseTransformersCLICommand):
             default=-1,
             help="Indicate the device to run onto, -1 indicates CPU, >= 0 indicates GPU (default: -1)",
         )
+        run_parser.add_argument(
+            "--batch-size", type=int, default=1, help="Number of rows given to each call of the pipeline. (default: 1)"
+        )
+        run_parser.add_argument(
+            "--num-workers",
+            type=int,
+            default=0,
+            help="Number of threads running the batches, so that the tokenization of the next batches overlaps the "
+            "forward pass of the current one. The outputs are written in order. (default: 0, no thread)",
+        )
         run_parser.add_argument("--overwrite", action="store_true", help="Allow overwriting the output file.")
         run_parser.set_defaults(func=run_command_factory)
 
-    def run(self):
-        nlp, outputs = self._nlp, []
+    def _batches(self):
+        rows = iter(self._reader)
+        batch = list(itertools.islice(rows, self._batch_size))
+        while batch:
+            yield batch
+            batch = list(itertools.islice(rows, self._batch_size))
 
-        for entry in self._reader:
-            output = nlp(**entry) if self._reader.is_multi_columns else nlp(entry)
-            if isinstance(output, dict):
-                outputs.append(output)
-            else:
-                outputs += output
+    def _run_batch(self, batch):
+        """ Outputs of each row of `batch`. """
+        return self._nlp.outputs_per_input(batch)
+
+    def _outputs(self):
+        """ Outputs of each batch of rows, in the order of the rows. """
+        if self._num_workers == 0:
+            for batch in self._batches():
+                yield len(batch), self._run_batch(batch)
+            return
+
+        # Each worker runs a batch while the next ones are submitted: while a batch is in the model, which releases
+        # the GIL, the next one is tokenized. At most two batches per worker are in flight.
+        with ThreadPoolExecutor(self._num_workers) as executor:
+            pending = deque()
+            for batch in self._batches():
+                pending.append((len(batch), executor.submit(self._run_batch, batch)))
+                if len(pending) >= 2 * self._num_workers:
+                    num_rows, outputs = pending.popleft()
+                    yield num_rows, outputs.result()
+            while pending:
+                num_rows, outputs = pending.popleft()
+                yield num_rows, outputs.result()
+
+    def run(self):
+        start, total_rows = time.time(), 0
 
-        # Saving data
         if self._nlp.binary_output:
+            # Binary outputs are pickled all at once, one output per row
+            outputs = []
+            for num_rows, batch_outputs in self._outputs():
+                total_rows += num_rows
+                outputs += batch_outputs
             binary_path = self._reader.save_binary(outputs)
             logger.warning("Current pipeline requires output to be in binary format, saving at {}".format(binary_path))
         else:
-            self._reader.save(outputs)
+            # The outputs are written as they are produced, a list output (e.g. the entities of a row) as several rows
+            with self._reader:
+                for num_rows, batch_outputs in self._outputs():
+                    total_rows += num_rows
+                    for output in batch_outputs:
+                        self._reader.write([output] if isinstance(output, dict) else output)
+
+        elapsed = time.time() - start
+        logger.warning(
+            "Processed {} rows in {:.1f}s ({:.1f} rows/s)".format(total_rows, elapsed, total_rows / max(elapsed, 1e-9))
+        )
@@ -1,6 +1,16 @@
+import asyncio
 import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
 from argparse import ArgumentParser, Namespace
-from typing import Any, List, Optional
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
 
 from transformers import Pipeline
 from transformers.commands import BaseTransformersCLICommand
@@ -8,7 +18,7 @@ from transformers.pipelines import SUPPORTED_TASKS, pipeline
 
 
 try:
-    from uvicorn import run
+    from uvicorn import Config, Server, run
     from fastapi import FastAPI, HTTPException, Body
     from fastapi.routing import APIRoute
     from pydantic import BaseModel
@@ -26,6 +36,9 @@ except (ImportError, AttributeError):
 
 logger = logging.getLogger("transformers-cli/serving")
 
+# Marks that DynamicBatcher has no request to run with the next batch (None being the stop sentinel)
+_NO_REQUEST = object()
+
 
 def serve_command_factory(args: Namespace):
     """
@@ -39,15 +52,158 @@ def serve_command_factory(args: Namespace):
         tokenizer=args.tokenizer,
         device=args.device,
     )
-    return ServeCommand(nlp, args.host, args.port, args.workers)
+    return ServeCommand(
+        nlp, args.host, args.port, args.workers, batch_size=args.batch_size, batch_timeout_ms=args.batch_timeout_ms
+    )
+
+
+def process_memory(pid: int) -> Optional[dict]:
+    """
+    Memory of the process `pid` in MB, read from ``/proc`` (None on systems without it): resident set size (rss),
+    split in anonymous memory (anon, private to the process), file-backed memory (file, e.g. memory-mapped
+    checkpoints) and shared memory (shmem, e.g. weights shared between the server workers).
+    """
+    fields = {"VmRSS": "rss", "RssAnon": "anon", "RssFile": "file", "RssShmem": "shmem"}
+    try:
+        with open("/proc/{}/status".format(pid), "r") as status:
+            lines = status.readlines()
+    except OSError:
+        return None
+    memory = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in fields:
+            memory[fields[name]] = int(value.split()[0]) / 1024
+    return memory
+
+
+class DynamicBatcher:
+    """
+    Groups the inputs of concurrent requests in batches: the inputs submitted are queued, and a dedicated thread
+    runs `process` on batches of up to `max_batch_size` inputs, waiting at most `max_wait_ms` milliseconds after the
+    first input of a batch for other ones. Each request's future is resolved with the outputs of its inputs.
+
+    `process` takes a list of inputs and returns the list of their outputs, in the same order. The thread is started
+    by the first submission, so that a batcher created before the server's worker processes are forked runs in each
+    of them.
+    """
+
+    def __init__(self, process: Callable[[List[Any]], List[Any]], max_batch_size: int = 8, max_wait_ms: float = 5):
+        if max_batch_size < 1 or max_wait_ms < 0:
+            raise ValueError("max_batch_size should be at least 1 and max_wait_ms at least 0")
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._queue = queue.Queue()
+        self._queued_inputs = 0
+        self._batch_sizes = Counter()
+        self._latencies = deque(maxlen=1000)
+
+    def submit(self, inputs: List[Any]) -> Future:
+        """ Queues `inputs`, the returned future is resolved with the list of their outputs. """
+        future = Future()
+        if len(inputs) == 0:
+            future.set_result([])
+            return future
+
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._queued_inputs = 0
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            self._queued_inputs += len(inputs)
+            self._queue.put((inputs, future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """ Stops the thread once the queued inputs are processed. """
+        thread = None
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                thread = self._thread
+            self._thread = None
+        # Joined without the lock, which the thread takes to run the queued batches
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self, requests_queue, pending):
+        """
+        Requests of the next batch, starting with the `pending` one unless it is `_NO_REQUEST`, and the request to
+        start the batch after with. The requests are None when closing.
+        """
+        request = pending if pending is not _NO_REQUEST else requests_queue.get()
+        if request is None:
+            return None, None
+        requests, num_inputs = [request], len(request[0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while num_inputs < self.max_batch_size:
+            try:
+                request = requests_queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if request is None or num_inputs + len(request[0]) > self.max_batch_size:
+                # Run with the next batch (a request isn't split across batches)
+                return requests, request
+            requests.append(request)
+            num_inputs += len(request[0])
+        return requests, _NO_REQUEST
+
+    def _run(self, requests_queue):
+        pending = _NO_REQUEST
+        while True:
+            requests, pending = self._next_batch(requests_queue, pending)
+            if requests is None:
+                return
+            inputs = [x for request_inputs, _, _ in requests for x in request_inputs]
+            with self._lock:
+                self._queued_inputs -= len(inputs)
+                self._batch_sizes[len(inputs)] += 1
+
+            try:
+                outputs = self.process(inputs)
+                if len(outputs) != len(inputs):
+                    raise ValueError("Got {} outputs for {} inputs".format(len(outputs), len(inputs)))
+            except Exception as e:
+                for _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request_inputs, future, submitted in requests:
+                with self._lock:
+                    self._latencies.append(time.perf_counter() - submitted)
+                future.set_result(outputs[start : start + len(request_inputs)])
+                start += len(request_inputs)
+
+    def metrics(self) -> dict:
+        """
+        Number of queued inputs, histogram of the batch sizes (batch size -> number of batches) and percentiles of
+        the latencies of the last 1000 requests, from their submission to their outputs, in milliseconds.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = {"queue_depth": self._queued_inputs, "batch_sizes": dict(sorted(self._batch_sizes.items()))}
+        metrics["requests"] = len(latencies)
+        for percentile in (50, 90, 99):
+            index = min(int(len(latencies) * percentile / 100), len(latencies) - 1)
+            metrics["latency_p{}_ms".format(percentile)] = 1000 * latencies[index] if latencies else None
+        return metrics
 
 
 class ServeModelInfoResult(BaseModel):
     """
-    Expose model information
+    Expose model information, and the memory of the server workers
     """
 
     infos: dict
+    memory: Optional[dict]
 
 
 class ServeTokenizeResult(BaseModel):
@@ -75,6 +231,14 @@ class ServeForwardResult(BaseModel):
     output: Any
 
 
+class ServeMetricsResult(BaseModel):
+    """
+    Expose the metrics of the batching of the forward requests
+    """
+
+    metrics: dict
+
+
 class ServeCommand(BaseTransformersCLICommand):
     @staticmethod
     def register_subcommand(parser: ArgumentParser):
@@ -91,10 +255,24 @@ class ServeCommand(BaseTransformersCLICommand):
         )
         serve_parser.add_argument("--host", type=str, default="localhost", help="Interface the server will listen on.")
         serve_parser.add_argument("--port", type=int, default=8888, help="Port the serving will listen to.")
-        serve_parser.add_argument("--workers", type=int, default=1, help="Number of http workers")
+        serve_parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of http workers, forked after loading the model so that they share its weights",
+        )
         serve_parser.add_argument("--model", type=str, help="Model's name or path to stored model.")
         serve_parser.add_argument("--config", type=str, help="Model's config name or path to stored model.")
         serve_parser.add_argument("--tokenizer", type=str, help="Tokenizer name to use.")
+        serve_parser.add_argument(
+            "--batch-size", type=int, default=8, help="Maximum number of inputs of concurrent requests run together."
+        )
+        serve_parser.add_argument(
+            "--batch-timeout-ms",
+            type=float,
+            default=5,
+            help="Maximum time (in milliseconds) a request waits for other ones to be batched with (default: 5).",
+        )
         serve_parser.add_argument(
             "--device",
             type=int,
@@ -103,9 +281,14 @@ class ServeCommand(BaseTransformersCLICommand):
         )
         serve_parser.set_defaults(func=serve_command_factory)
 
-    def __init__(self, pipeline: Pipeline, host: str, port: int, workers: int):
+    def __init__(
+        self, pipeline: Pipeline, host: str, port: int, workers: int, batch_size: int = 8, batch_timeout_ms: float = 5
+    ):
 
         self._pipeline = pipeline
+        self._batcher = DynamicBatcher(self._process, max_batch_size=batch_size, max_wait_ms=batch_timeout_ms)
+        # Process ids of the forked workers, in memory shared with them
+        self._worker_pids = None
 
         self.host = host
         self.port = port
@@ -149,15 +332,83 @@ class ServeCommand(BaseTransformersCLICommand):
                         response_class=JSONResponse,
                         methods=["POST"],
                     ),
+                    APIRoute(
+                        "/metrics",
+                        self.metrics,
+                        response_model=ServeMetricsResult,
+                        response_class=JSONResponse,
+                        methods=["GET"],
+                    ),
                 ],
                 timeout=600,
             )
 
     def run(self):
-        run(self._app, host=self.host, port=self.port, workers=self.workers)
+        if self.workers <= 1:
+            run(self._app, host=self.host, port=self.port)
+        else:
+            self._run_forked_workers()
+
+    def _run_forked_workers(self):
+        """
+        Serves with `workers` processes forked from this one, which has loaded the pipeline: the weights of the
+        model are moved to shared memory first, so that the workers all read the same copy instead of each holding
+        its own. The workers accept the connections of a socket bound before forking.
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Serving with several workers requires os.fork, which isn't available on this system")
+        if self._pipeline.framework == "pt" and hasattr(self._pipeline.model, "share_memory"):
+            self._pipeline.model.eval()
+            self._pipeline.model.share_memory()
+        else:
+            logger.warning("The weights of the model can't be shared, each worker may hold its own copy of them")
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+
+        self._worker_pids = multiprocessing.Array("i", self.workers, lock=False)
+        for i in range(self.workers):
+            pid = os.fork()
+            if pid == 0:
+                exit_code = 0
+                try:
+                    Server(Config(self._app, host=self.host, port=self.port)).run(sockets=[sock])
+                except BaseException:
+                    logger.exception("Worker {} failed".format(os.getpid()))
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            self._worker_pids[i] = pid
+        logger.info("Serving model over {}:{} with workers {}".format(self.host, self.port, list(self._worker_pids)))
+
+        try:
+            for pid in self._worker_pids:
+                os.waitpid(pid, 0)
+        except KeyboardInterrupt:
+            for pid in self._worker_pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in self._worker_pids:
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+        finally:
+            sock.close()
 
     def model_info(self):
-        return ServeModelInfoResult(infos=vars(self._pipeline.model.config))
+        """
+        The configuration of the model, and the memory (see :func:`process_memory`) of the server workers, by process
+        id, with the id of the worker answering.
+        """
+        pids = list(self._worker_pids) if self._worker_pids is not None else [os.getpid()]
+        memory = {"pid": os.getpid(), "workers": {str(pid): process_memory(pid) for pid in pids}}
+        return ServeModelInfoResult(infos=vars(self._pipeline.model.config), memory=memory)
 
     def tokenize(self, text_input: str = Body(None, embed=True), return_ids: bool = Body(False, embed=True)):
         """
@@ -195,11 +446,14 @@ class ServeCommand(BaseTransformersCLICommand):
         except Exception as e:
             raise HTTPException(status_code=500, detail={"model": "", "error": str(e)})
 
+    def _process(self, inputs: List[Any]) -> List[Any]:
+        """ Outputs of each of the batched `inputs`. """
+        return self._pipeline.outputs_per_input(inputs)
+
     async def forward(self, inputs=Body(None, embed=True)):
         """
-        **inputs**:
-        **attention_mask**:
-        **tokens_type_ids**:
+        **inputs**: an input of the pipeline, or a list of inputs. The inputs of concurrent requests are batched
+        together, the output is the output of the input, or the list of the outputs of the inputs.
         """
 
         # Check we don't have empty string
@@ -207,8 +461,16 @@ class ServeCommand(BaseTransformersCLICommand):
             return ServeForwardResult(output=[], attention=[])
 
         try:
-            # Forward through the model
-            output = self._pipeline(inputs)
-            return ServeForwardResult(output=output)
+            # Forward through the model, in the thread of the batcher so that the event loop isn't blocked
+            single_input = not isinstance(inputs, list)
+            outputs = await asyncio.wrap_future(self._batcher.submit([inputs] if single_input else inputs))
+            return ServeForwardResult(output=outputs[0] if single_input else outputs)
         except Exception as e:
             raise HTTPException(500, {"error": str(e)})
+
+    def metrics(self):
+        """
+        Metrics of the batching of the forward requests: number of queued inputs, histogram of the batch sizes and
+        percentiles of the latencies of the requests.
+        """
+        return ServeMetricsResult(metrics=self._batcher.metrics())
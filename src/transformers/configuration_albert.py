@@ -78,6 +78,10 @@ class AlbertConfig(PretrainedConfig):
                 The epsilon used by the layer normalization layers.
             classifier_dropout_prob (:obj:`float`, optional, defaults to 0.1):
                 The dropout ratio for attached classifiers.
+            early_exit_threshold (:obj:`float`, optional, defaults to None):
+                If set, :class:`~transformers.AlbertForSequenceClassification` evaluates its classification head after
+                each layer in inference, and the examples whose highest class probability reaches this threshold
+                stop there (see :func:`~transformers.AlbertForSequenceClassification.early_exit_forward`).
 
         Example::
 
@@ -124,6 +128,7 @@ class AlbertConfig(PretrainedConfig):
         initializer_range=0.02,
         layer_norm_eps=1e-12,
         classifier_dropout_prob=0.1,
+        early_exit_threshold=None,
         pad_token_id=0,
         bos_token_id=2,
         eos_token_id=3,
@@ -147,3 +152,4 @@ class AlbertConfig(PretrainedConfig):
         self.initializer_range = initializer_range
         self.layer_norm_eps = layer_norm_eps
         self.classifier_dropout_prob = classifier_dropout_prob
+        self.early_exit_threshold = early_exit_threshold
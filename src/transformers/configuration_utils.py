@@ -51,6 +51,21 @@ class PretrainedConfig(object):
                 Should the model returns all hidden-states.
             torchscript (:obj:`bool`, `optional`, defaults to :obj:`False`):
                 Is the model used with Torchscript (for PyTorch models).
+            fused_qkv (:obj:`bool`, `optional`, defaults to :obj:`False`):
+                In evaluation mode and without gradients, compute the query, key and value projections of
+                BERT-like PyTorch models (BERT, RoBERTa, ALBERT, ELECTRA...) with a single matrix multiplication
+                on weights packed on first use.
+            unpad_inputs (:obj:`bool`, `optional`, defaults to :obj:`False`):
+                Run the encoder of BERT, RoBERTa and DistilBERT PyTorch models on the real (non-padding) tokens only,
+                packed in a single (total_tokens, hidden_size) tensor, when an attention mask is given. Outputs are
+                padded back to the input shape.
+            attention_chunk_size (:obj:`int`, `optional`, defaults to :obj:`None`):
+                If set, BERT-like, DistilBERT, T5 and BART PyTorch models compute attention by blocks of this many
+                queries and keys with an online softmax, without materializing the full attention matrix. Ignored
+                when the attention weights are returned (``output_attentions=True``).
+            quantization (:obj:`dict`, `optional`, defaults to :obj:`None`):
+                Dynamic quantization applied to a PyTorch model by :func:`~transformers.PreTrainedModel.quantize`
+                (arguments of that method), so that the quantized checkpoint can be re-loaded.
     """
     pretrained_config_archive_map = {}  # type: Dict[str, str]
     model_type = ""  # type: str
@@ -61,6 +76,10 @@ class PretrainedConfig(object):
         self.output_hidden_states = kwargs.pop("output_hidden_states", False)
         self.output_past = kwargs.pop("output_past", True)  # Not used by all models
         self.torchscript = kwargs.pop("torchscript", False)  # Only used by PyTorch models
+        self.fused_qkv = kwargs.pop("fused_qkv", False)  # Only used by BERT-like PyTorch models
+        self.unpad_inputs = kwargs.pop("unpad_inputs", False)  # Only used by BERT-like and DistilBERT PyTorch models
+        self.attention_chunk_size = kwargs.pop("attention_chunk_size", None)  # Only used by some PyTorch models
+        self.quantization = kwargs.pop("quantization", None)  # Set by PreTrainedModel.quantize
         self.use_bfloat16 = kwargs.pop("use_bfloat16", False)
         self.pruned_heads = kwargs.pop("pruned_heads", {})
 
@@ -0,0 +1,209 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+""" Convert PyTorch models to ONNX graphs, to be run with ONNX Runtime (see `OnnxModel`) """
+
+
+import argparse
+import inspect
+import logging
+import os
+from contextlib import contextmanager
+
+import torch
+from torch import nn
+
+from transformers import AutoModelWithLMHead, AutoTokenizer
+from transformers.file_utils import ONNX_WEIGHTS_NAME
+from transformers.modeling_torchscript import _flatten, _TracingWrapper
+from transformers.pipelines import SUPPORTED_TASKS
+
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 11
+
+
+@contextmanager
+def shape_dependent_paths_disabled(model):
+    """ Disables the execution paths of `model` whose operations depend on the input shapes or values (unpadded
+        inputs, attention computed by chunks), which would be recorded for the example inputs only.
+    """
+    chunked_modules = [module for module in model.modules() if getattr(module, "attention_chunk_size", None)]
+    chunk_sizes = [module.attention_chunk_size for module in chunked_modules]
+    unpad_inputs, model.config.unpad_inputs = model.config.unpad_inputs, False
+    for module in chunked_modules:
+        module.attention_chunk_size = None
+    try:
+        yield model
+    finally:
+        model.config.unpad_inputs = unpad_inputs
+        for module, chunk_size in zip(chunked_modules, chunk_sizes):
+            module.attention_chunk_size = chunk_size
+
+
+class _PastWrapper(nn.Module):
+    """ Calls a decoder with past (GPT-2) with its past key/values given as separate inputs, and returns the hidden
+        states or logits followed by the presents.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, *past):
+        outputs = self.model(input_ids, past=list(past), attention_mask=attention_mask)
+        return (outputs[0],) + tuple(outputs[1])
+
+
+def _dummy_inputs(model, input_names, batch_size, seq_length):
+    device = next(model.parameters()).device
+    input_ids = torch.arange(batch_size * seq_length, device=device).view(batch_size, seq_length)
+    inputs = {
+        "input_ids": input_ids % model.config.vocab_size,
+        "attention_mask": torch.ones_like(input_ids),
+        "token_type_ids": torch.zeros_like(input_ids),
+    }
+    return tuple(inputs[name] for name in input_names)
+
+
+def _encoder_graph(model):
+    """ Module to export, example inputs, input and output names and dynamic axes of an encoder. """
+    forward_parameters = inspect.signature(model.forward).parameters
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in forward_parameters]
+    wrapper = _TracingWrapper(model, input_names)
+
+    # The dynamic axes of the outputs are the ones whose size follows the batch size or the sequence length
+    small_inputs, inputs = _dummy_inputs(model, input_names, 2, 8), _dummy_inputs(model, input_names, 3, 9)
+    small_outputs, outputs = _flatten(wrapper(*small_inputs)), _flatten(wrapper(*inputs))
+    output_names = ["output_{}".format(i) for i in range(len(outputs))]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    for name, small_output, output in zip(output_names, small_outputs, outputs):
+        dynamic_axes[name] = {}
+        for axis, sizes in enumerate(zip(small_output.shape, output.shape)):
+            if sizes == (2, 3):
+                dynamic_axes[name][axis] = "batch"
+            elif sizes == (8, 9):
+                dynamic_axes[name][axis] = "sequence"
+    return wrapper, inputs, input_names, output_names, dynamic_axes
+
+
+def _past_graph(model):
+    """ Module to export, example inputs, input and output names and dynamic axes of a decoder with past. """
+    config = model.config
+    batch_size, seq_length, past_length = 2, 3, 4
+    input_ids, attention_mask = _dummy_inputs(model, ["input_ids", "attention_mask"], batch_size, seq_length)
+    attention_mask = torch.ones(batch_size, past_length + seq_length, dtype=torch.long, device=input_ids.device)
+    past_shape = (2, batch_size, config.n_head, past_length, config.n_embd // config.n_head)
+    past = [torch.zeros(past_shape, device=input_ids.device) for _ in range(config.n_layer)]
+
+    past_names = ["past_{}".format(i) for i in range(config.n_layer)]
+    present_names = ["present_{}".format(i) for i in range(config.n_layer)]
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "total_sequence"},
+        "output_0": {0: "batch", 1: "sequence"},
+    }
+    dynamic_axes.update({name: {1: "batch", 3: "past_sequence"} for name in past_names})
+    dynamic_axes.update({name: {1: "batch", 3: "total_sequence"} for name in present_names})
+    inputs = (input_ids, attention_mask) + tuple(past)
+    input_names = ["input_ids", "attention_mask"] + past_names
+    return _PastWrapper(model), inputs, input_names, ["output_0"] + present_names, dynamic_axes
+
+
+def export_onnx(model, output, opset=ONNX_OPSET, use_past=False):
+    """ Exports the PyTorch `model` to an ONNX graph with dynamic batch and sequence axes.
+
+        Arguments:
+
+            model: the :class:`~transformers.PreTrainedModel` to export.
+
+            output: file name or file object in which the graph is written.
+
+            opset: (`optional`) int, default ONNX_OPSET:
+                Version of the ONNX operator set used.
+
+            use_past: (`optional`) boolean, default False:
+                Export a decoder with past (GPT-2) for incremental decoding: the graph takes the past key/values as
+                inputs ``past_0``, ``past_1``, ... (and the ``attention_mask`` of the past and current tokens) and
+                returns the presents ``present_0``, ``present_1``, ... after the logits ``output_0``.
+                Otherwise the graph takes ``input_ids``, ``attention_mask`` (and ``token_type_ids`` when the model
+                accepts it) and returns the flattened outputs of the model ``output_0``, ``output_1``, ...
+    """
+    if model.config.quantization is not None:
+        raise ValueError("Quantized models can't be exported to ONNX, export the model before quantizing it")
+    if use_past and "past" not in inspect.signature(model.forward).parameters:
+        raise ValueError("{} doesn't take past key/values".format(model.__class__.__name__))
+
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad(), shape_dependent_paths_disabled(model):
+            module, inputs, input_names, output_names, dynamic_axes = (
+                _past_graph(model) if use_past else _encoder_graph(model)
+            )
+            torch.onnx.export(
+                module,
+                inputs,
+                output,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=opset,
+                do_constant_folding=True,
+            )
+    finally:
+        model.train(was_training)
+    return output
+
+
+def convert(model_name_or_path, output_dir, pipeline_name="feature-extraction", opset=ONNX_OPSET, use_past=False):
+    """ Exports a pretrained model to ``ONNX_WEIGHTS_NAME`` in `output_dir`, with its configuration and tokenizer, so
+        that `output_dir` can be given to ``pipeline(task, model=output_dir, tokenizer=output_dir, backend="onnx")``.
+
+        The head of the model is the one of the pipeline `pipeline_name`. Decoders with past are exported with their
+        language modeling head.
+    """
+    if pipeline_name not in SUPPORTED_TASKS:
+        raise ValueError(
+            "Unknown pipeline {}, available pipelines are {}".format(pipeline_name, list(SUPPORTED_TASKS.keys()))
+        )
+    model_class = AutoModelWithLMHead if use_past else SUPPORTED_TASKS[pipeline_name]["pt"]
+    model = model_class.from_pretrained(model_name_or_path)
+    tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, ONNX_WEIGHTS_NAME)
+    logger.info("Exporting {} to {}".format(model.__class__.__name__, output_file))
+    export_onnx(model, output_file, opset=opset, use_past=use_past)
+    model.config.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    # Required parameters
+    parser.add_argument("--model", type=str, required=True, help="Model shortcut name or path to convert.")
+    parser.add_argument("--output", type=str, required=True, help="Directory in which the ONNX graph is saved.")
+    # Other parameters
+    parser.add_argument(
+        "--pipeline", type=str, default="feature-extraction", help="Pipeline whose model head is exported."
+    )
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET, help="ONNX operator set version.")
+    parser.add_argument("--use_past", action="store_true", help="Export a decoder (GPT-2) with past key/values.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    convert(args.model, args.output, args.pipeline, args.opset, args.use_past)
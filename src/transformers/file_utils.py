@@ -5,25 +5,30 @@ Copyright by the AllenNLP authors.
 """
 
 import fnmatch
+import importlib
+import importlib.util
 import json
 import logging
 import os
+import re
 import shutil
 import sys
 import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from functools import partial, wraps
-from hashlib import sha256
-from typing import Optional
+from hashlib import md5, sha256
+from types import ModuleType
+from typing import Dict, List, Optional
 from urllib.parse import urlparse
 from zipfile import ZipFile, is_zipfile
 
-import boto3
 import requests
-from botocore.config import Config
-from botocore.exceptions import ClientError
 from filelock import FileLock
+from requests.adapters import HTTPAdapter
 from tqdm.auto import tqdm
 
 from . import __version__
@@ -31,44 +36,71 @@ from . import __version__
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
-try:
-    USE_TF = os.environ.get("USE_TF", "AUTO").upper()
-    USE_TORCH = os.environ.get("USE_TORCH", "AUTO").upper()
-    if USE_TORCH in ("1", "ON", "YES", "AUTO") and USE_TF not in ("1", "ON", "YES"):
-        import torch
 
-        _torch_available = True  # pylint: disable=invalid-name
-        logger.info("PyTorch version {} available.".format(torch.__version__))
-    else:
-        logger.info("Disabling PyTorch because USE_TF is set")
-        _torch_available = False
-except ImportError:
-    _torch_available = False  # pylint: disable=invalid-name
+def _get_version(module_name, distribution_names):
+    """
+    Version of an installed package, read from its distribution metadata so that the (possibly slow to import)
+    package itself is not imported. Fall back to importing it when no metadata can be found.
+    """
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        # Python < 3.8
+        from pkg_resources import DistributionNotFound as PackageNotFoundError
+        from pkg_resources import get_distribution
 
-try:
-    USE_TF = os.environ.get("USE_TF", "AUTO").upper()
-    USE_TORCH = os.environ.get("USE_TORCH", "AUTO").upper()
+        def version(distribution_name):
+            return get_distribution(distribution_name).version
+
+    for distribution_name in distribution_names:
+        try:
+            return version(distribution_name)
+        except PackageNotFoundError:
+            continue
+    return importlib.import_module(module_name).__version__
+
+
+# PyTorch and TensorFlow are only detected here, not imported: they are imported by the modules that use them.
+USE_TF = os.environ.get("USE_TF", "AUTO").upper()
+USE_TORCH = os.environ.get("USE_TORCH", "AUTO").upper()
+
+_torch_version = None  # pylint: disable=invalid-name
+if USE_TORCH in ("1", "ON", "YES", "AUTO") and USE_TF not in ("1", "ON", "YES"):
+    _torch_available = importlib.util.find_spec("torch") is not None  # pylint: disable=invalid-name
+    if _torch_available:
+        _torch_version = _get_version("torch", ["torch"])
+        logger.info("PyTorch version {} available.".format(_torch_version))
+else:
+    logger.info("Disabling PyTorch because USE_TF is set")
+    _torch_available = False
+
+_tf_version = None  # pylint: disable=invalid-name
+if USE_TF in ("1", "ON", "YES", "AUTO") and USE_TORCH not in ("1", "ON", "YES"):
+    _tf_available = importlib.util.find_spec("tensorflow") is not None  # pylint: disable=invalid-name
+    if _tf_available:
+        _tf_version = _get_version(
+            "tensorflow",
+            ["tensorflow", "tensorflow-cpu", "tensorflow-gpu", "tf-nightly", "tf-nightly-cpu", "tf-nightly-gpu"],
+        )
+        _tf_available = int(_tf_version.split(".")[0]) >= 2
+        if _tf_available:
+            logger.info("TensorFlow version {} available.".format(_tf_version))
+else:
+    logger.info("Disabling Tensorflow because USE_TORCH is set")
+    _tf_available = False
 
-    if USE_TF in ("1", "ON", "YES", "AUTO") and USE_TORCH not in ("1", "ON", "YES"):
-        import tensorflow as tf
+_sklearn_available = (  # pylint: disable=invalid-name
+    importlib.util.find_spec("sklearn") is not None and importlib.util.find_spec("scipy") is not None
+)
 
-        assert hasattr(tf, "__version__") and int(tf.__version__[0]) >= 2
-        _tf_available = True  # pylint: disable=invalid-name
-        logger.info("TensorFlow version {} available.".format(tf.__version__))
-    else:
-        logger.info("Disabling Tensorflow because USE_TORCH is set")
-        _tf_available = False
-except (ImportError, AssertionError):
-    _tf_available = False  # pylint: disable=invalid-name
+_onnxruntime_available = importlib.util.find_spec("onnxruntime") is not None  # pylint: disable=invalid-name
 
-try:
-    from torch.hub import _get_torch_home
+_pyarrow_available = importlib.util.find_spec("pyarrow") is not None  # pylint: disable=invalid-name
 
-    torch_cache_home = _get_torch_home()
-except ImportError:
-    torch_cache_home = os.path.expanduser(
-        os.getenv("TORCH_HOME", os.path.join(os.getenv("XDG_CACHE_HOME", "~/.cache"), "torch"))
-    )
+# Same as `torch.hub._get_torch_home()`, without importing torch
+torch_cache_home = os.path.expanduser(
+    os.getenv("TORCH_HOME", os.path.join(os.getenv("XDG_CACHE_HOME", "~/.cache"), "torch"))
+)
 default_cache_path = os.path.join(torch_cache_home, "transformers")
 
 try:
@@ -86,10 +118,14 @@ PYTORCH_TRANSFORMERS_CACHE = PYTORCH_PRETRAINED_BERT_CACHE  # Kept for backward
 TRANSFORMERS_CACHE = PYTORCH_PRETRAINED_BERT_CACHE  # Kept for backward compatibility
 
 WEIGHTS_NAME = "pytorch_model.bin"
+MMAP_WEIGHTS_NAME = "pytorch_model.mmap"
+WEIGHTS_INDEX_NAME = "pytorch_model.bin.index.json"
 TF2_WEIGHTS_NAME = "tf_model.h5"
 TF_WEIGHTS_NAME = "model.ckpt"
 CONFIG_NAME = "config.json"
 MODEL_CARD_NAME = "modelcard.json"
+TORCHSCRIPT_CONFIG_NAME = "torchscript_config.json"
+ONNX_WEIGHTS_NAME = "model.onnx"
 
 
 MULTIPLE_CHOICE_DUMMY_INPUTS = [[[0], [1]], [[0], [1]]]
@@ -99,6 +135,16 @@ DUMMY_MASK = [[1, 1, 1, 1, 1], [1, 1, 1, 0, 0], [0, 0, 0, 1, 1]]
 S3_BUCKET_PREFIX = "https://s3.amazonaws.com/models.huggingface.co/bert"
 CLOUDFRONT_DISTRIB_PREFIX = "https://d2ws9o8vfrpkyk.cloudfront.net"
 
+# Name of the manifest of the files downloaded in a cache directory, see `read_cache_index`
+CACHE_INDEX_NAME = "cache_index.jsonl"
+# Number of seconds during which a cached file is used without checking its ETag on the server
+CACHE_TTL = int(os.getenv("TRANSFORMERS_CACHE_TTL", 0))
+
+# Files larger than this are downloaded with several concurrent HTTP range requests of PARALLEL_DOWNLOAD_CHUNK_SIZE
+PARALLEL_DOWNLOAD_THRESHOLD = 50 * 1024 * 1024
+PARALLEL_DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+PARALLEL_DOWNLOAD_WORKERS = 8
+
 
 def is_torch_available():
     return _torch_available
@@ -108,6 +154,47 @@ def is_tf_available():
     return _tf_available
 
 
+def is_onnxruntime_available():
+    return _onnxruntime_available
+
+
+def is_pyarrow_available():
+    return _pyarrow_available
+
+
+class _LazyModule(ModuleType):
+    """
+    Module whose objects listed in `import_structure` (a dict mapping the name of each submodule to the names
+    of the objects it exports) are only imported from their submodule when they are first accessed.
+    """
+
+    def __init__(self, name, module_globals, import_structure):
+        super().__init__(name)
+        self.__dict__.update(module_globals)
+        self._import_structure = import_structure
+        self._object_to_module = {
+            object_name: module_name for module_name, objects in import_structure.items() for object_name in objects
+        }
+        self.__all__ = list(import_structure.keys()) + list(self._object_to_module.keys())
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.__all__))
+
+    def __getattr__(self, name):
+        if name in self._import_structure:
+            value = importlib.import_module("." + name, self.__name__)
+        elif name in self._object_to_module:
+            module = importlib.import_module("." + self._object_to_module[name], self.__name__)
+            value = getattr(module, name)
+        else:
+            raise AttributeError("module {} has no attribute {}".format(self.__name__, name))
+        setattr(self, name, value)
+        return value
+
+    def __reduce__(self):
+        return (importlib.import_module, (self.__name__,))
+
+
 def add_start_docstrings(*docstr):
     def docstring_decorator(fn):
         fn.__doc__ = "".join(docstr) + (fn.__doc__ if fn.__doc__ is not None else "")
@@ -215,6 +302,7 @@ def cached_path(
     extract_compressed_file=False,
     force_extract=False,
     local_files_only=False,
+    cache_ttl=None,
 ) -> Optional[str]:
     """
     Given something that might be a URL (or might be a local path),
@@ -230,6 +318,8 @@ def cached_path(
             file in a folder along the archive.
         force_extract: if True when extract_compressed_file is True and the archive was already extracted,
             re-extract the archive and overide the folder where it was extracted.
+        cache_ttl: number of seconds during which a cached file is used without revalidating its ETag on the server.
+            Defaults to the TRANSFORMERS_CACHE_TTL environment variable (0, i.e. always revalidate, if unset).
 
     Return:
         None in case of non-recoverable file (non-existent or inaccessible url + no cache on disk).
@@ -252,6 +342,7 @@ def cached_path(
             resume_download=resume_download,
             user_agent=user_agent,
             local_files_only=local_files_only,
+            cache_ttl=cache_ttl,
         )
     elif os.path.exists(url_or_filename):
         # File, and it exists.
@@ -297,6 +388,57 @@ def cached_path(
     return output_path
 
 
+def cached_paths(urls_or_filenames, max_workers=8, **kwargs) -> List[Optional[str]]:
+    """
+    Resolve several urls or local paths with :func:`cached_path`, downloading the remote files in parallel.
+    Args:
+        max_workers: maximum number of files downloaded at the same time.
+        kwargs: passed to :func:`cached_path`.
+
+    Return:
+        The list of the outputs of :func:`cached_path`, in the order of `urls_or_filenames`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(cached_path, **kwargs), urls_or_filenames))
+
+
+def prefetch(
+    model_ids, filenames=(CONFIG_NAME, WEIGHTS_NAME), max_workers=PARALLEL_DOWNLOAD_WORKERS, **kwargs
+) -> Dict[str, List[Optional[str]]]:
+    """
+    Warm the cache for several models at once, downloading all their files concurrently.
+    Args:
+        model_ids: identifiers of models uploaded on S3 (e.g. ``dbmdz/bert-base-german-cased``) or urls of
+            model folders. The files of the shortcut names of the library are listed in the archive maps of
+            the models and configurations, their urls can be given directly to :func:`cached_paths`.
+        filenames: names of the files to download for each model.
+        max_workers: maximum number of files downloaded at the same time.
+        kwargs: passed to :func:`cached_path`.
+
+    Return:
+        A dict mapping each model identifier to the local paths of its files (None for files that couldn't be found).
+    """
+    model_ids = list(model_ids)
+    urls = [
+        model_id.rstrip("/") + "/" + filename if is_remote_url(model_id) else hf_bucket_url(model_id, postfix=filename)
+        for model_id in model_ids
+        for filename in filenames
+    ]
+
+    def resolve(url):
+        try:
+            return cached_path(url, **kwargs)
+        except EnvironmentError:
+            logger.warning("Couldn't prefetch {}".format(url))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        paths = list(executor.map(resolve, urls))
+
+    num_files = len(filenames)
+    return {model_id: paths[i * num_files : (i + 1) * num_files] for i, model_id in enumerate(model_ids)}
+
+
 def split_s3_path(url):
     """Split a full s3 path into the bucket name and path."""
     parsed = urlparse(url)
@@ -318,6 +460,8 @@ def s3_request(func):
 
     @wraps(func)
     def wrapper(url, *args, **kwargs):
+        from botocore.exceptions import ClientError
+
         try:
             return func(url, *args, **kwargs)
         except ClientError as exc:
@@ -332,6 +476,9 @@ def s3_request(func):
 @s3_request
 def s3_etag(url, proxies=None):
     """Check ETag on S3 object."""
+    import boto3
+    from botocore.config import Config
+
     s3_resource = boto3.resource("s3", config=Config(proxies=proxies))
     bucket_name, s3_path = split_s3_path(url)
     s3_object = s3_resource.Object(bucket_name, s3_path)
@@ -341,25 +488,55 @@ def s3_etag(url, proxies=None):
 @s3_request
 def s3_get(url, temp_file, proxies=None):
     """Pull a file directly from S3."""
+    import boto3
+    from botocore.config import Config
+
     s3_resource = boto3.resource("s3", config=Config(proxies=proxies))
     bucket_name, s3_path = split_s3_path(url)
     s3_resource.Bucket(bucket_name).download_fileobj(s3_path, temp_file)
 
 
-def http_get(url, temp_file, proxies=None, resume_size=0, user_agent=None):
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the `requests.Session` shared by all the downloads, so that HTTP connections
+    are pooled and reused across calls (and threads) instead of being opened for every request.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=PARALLEL_DOWNLOAD_WORKERS, pool_maxsize=PARALLEL_DOWNLOAD_WORKERS * 2
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+    return _http_session
+
+
+def http_user_agent(user_agent=None) -> str:
+    """Format a user-agent string with basic info about a request."""
     ua = "transformers/{}; python/{}".format(__version__, sys.version.split()[0])
     if is_torch_available():
-        ua += "; torch/{}".format(torch.__version__)
+        ua += "; torch/{}".format(_torch_version)
     if is_tf_available():
-        ua += "; tensorflow/{}".format(tf.__version__)
+        ua += "; tensorflow/{}".format(_tf_version)
     if isinstance(user_agent, dict):
         ua += "; " + "; ".join("{}/{}".format(k, v) for k, v in user_agent.items())
     elif isinstance(user_agent, str):
         ua += "; " + user_agent
-    headers = {"user-agent": ua}
+    return ua
+
+
+def http_get(url, temp_file, proxies=None, resume_size=0, user_agent=None):
+    headers = {"user-agent": http_user_agent(user_agent)}
     if resume_size > 0:
         headers["Range"] = "bytes=%d-" % (resume_size,)
-    response = requests.get(url, stream=True, proxies=proxies, headers=headers)
+    response = get_http_session().get(url, stream=True, proxies=proxies, headers=headers)
     if response.status_code == 416:  # Range not satisfiable
         return
     content_length = response.headers.get("Content-Length")
@@ -379,6 +556,88 @@ def http_get(url, temp_file, proxies=None, resume_size=0, user_agent=None):
     progress.close()
 
 
+def http_get_parallel(
+    url, temp_file, total_size, proxies=None, user_agent=None, chunk_size=None, max_workers=None,
+):
+    """
+    Download `url` in `temp_file` with concurrent HTTP range requests of `chunk_size` bytes.
+    The server must support range requests and `total_size` must be the size of the file.
+    """
+    chunk_size = chunk_size if chunk_size is not None else PARALLEL_DOWNLOAD_CHUNK_SIZE
+    max_workers = max_workers if max_workers is not None else PARALLEL_DOWNLOAD_WORKERS
+    headers = {"user-agent": http_user_agent(user_agent)}
+    session = get_http_session()
+
+    # Allocate the whole file so that each chunk can be written at its offset
+    temp_file.truncate(total_size)
+    temp_file.flush()
+
+    progress = tqdm(
+        unit="B",
+        unit_scale=True,
+        total=total_size,
+        desc="Downloading",
+        disable=bool(logger.getEffectiveLevel() == logging.NOTSET),
+    )
+    progress_lock = threading.Lock()
+
+    def download_range(start):
+        end = min(start + chunk_size, total_size) - 1
+        range_headers = dict(headers, Range="bytes=%d-%d" % (start, end))
+        response = session.get(url, stream=True, proxies=proxies, headers=range_headers)
+        if response.status_code != 206:
+            raise EnvironmentError("Range request on {} failed with status code {}".format(url, response.status_code))
+        with open(temp_file.name, "r+b") as chunk_file:
+            chunk_file.seek(start)
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                if chunk:  # filter out keep-alive new chunks
+                    chunk_file.write(chunk)
+                    with progress_lock:
+                        progress.update(len(chunk))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(download_range, range(0, total_size, chunk_size)))
+    finally:
+        progress.close()
+
+
+def etag_to_md5(etag) -> Optional[str]:
+    """
+    Return the MD5 hex digest an ETag stands for, if any.
+    S3 ETags of objects uploaded in one part are the MD5 of their content. Multipart
+    uploads (with a `-` in the ETag) and other servers' ETags can't be checked.
+    """
+    if etag is None:
+        return None
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        return None
+    etag = etag.strip('"').lower()
+    return etag if re.fullmatch(r"[0-9a-f]{32}", etag) else None
+
+
+def verify_download(path, etag=None, expected_size=None):
+    """
+    Check the integrity of a downloaded file against the size and ETag announced by the server.
+    Raise ``EnvironmentError`` if the file doesn't match.
+    """
+    if expected_size is not None:
+        size = os.path.getsize(path)
+        if size != expected_size:
+            raise EnvironmentError(
+                "Downloaded file {} has size {} instead of the expected {}".format(path, size, expected_size)
+            )
+    expected_md5 = etag_to_md5(etag)
+    if expected_md5 is not None:
+        file_hash = md5()
+        with open(path, "rb") as f:
+            for block in iter(partial(f.read, 1024 * 1024), b""):
+                file_hash.update(block)
+        if file_hash.hexdigest() != expected_md5:
+            raise EnvironmentError("Downloaded file {} doesn't match its ETag {}".format(path, etag))
+
+
 def get_from_cache(
     url,
     cache_dir=None,
@@ -388,11 +647,16 @@ def get_from_cache(
     resume_download=False,
     user_agent=None,
     local_files_only=False,
+    cache_ttl=None,
 ) -> Optional[str]:
     """
     Given a URL, look for the corresponding file in the local cache.
     If it's not there, download it. Then return the path to the cached file.
 
+    The files of the cache are recorded in its index (see :func:`read_cache_index`): a file checked
+    on the server less than `cache_ttl` seconds ago is returned without any network access and, offline,
+    the last downloaded version of a file is found without scanning the cache directory.
+
     Return:
         None in case of non-recoverable file (non-existent or inaccessible url + no cache on disk).
         Local path (string) otherwise
@@ -401,19 +665,40 @@ def get_from_cache(
         cache_dir = TRANSFORMERS_CACHE
     if isinstance(cache_dir, Path):
         cache_dir = str(cache_dir)
+    if cache_ttl is None:
+        cache_ttl = CACHE_TTL
 
     os.makedirs(cache_dir, exist_ok=True)
 
+    # Last downloaded version of the file, if any
+    index_entry = read_cache_index(cache_dir).get(url)
+    if index_entry is not None and not os.path.exists(os.path.join(cache_dir, index_entry["filename"])):
+        index_entry = None
+    if index_entry is not None and not force_download:
+        if local_files_only or time.time() - index_entry["checked"] < cache_ttl:
+            return os.path.join(cache_dir, index_entry["filename"])
+
     etag = None
+    content_length = None
+    accept_ranges = False
     if not local_files_only:
         # Get eTag to add to filename, if it exists.
         if url.startswith("s3://"):
             etag = s3_etag(url, proxies=proxies)
         else:
             try:
-                response = requests.head(url, allow_redirects=True, proxies=proxies, timeout=etag_timeout)
+                response = get_http_session().head(
+                    url,
+                    allow_redirects=True,
+                    proxies=proxies,
+                    timeout=etag_timeout,
+                    headers={"user-agent": http_user_agent(user_agent)},
+                )
                 if response.status_code == 200:
                     etag = response.headers.get("ETag")
+                    if "Content-Length" in response.headers and "Content-Encoding" not in response.headers:
+                        content_length = int(response.headers["Content-Length"])
+                    accept_ranges = response.headers.get("Accept-Ranges") == "bytes"
             except (EnvironmentError, requests.exceptions.Timeout):
                 # etag is already None
                 pass
@@ -428,7 +713,10 @@ def get_from_cache(
     if etag is None:
         if os.path.exists(cache_path):
             return cache_path
+        elif index_entry is not None:
+            return os.path.join(cache_dir, index_entry["filename"])
         else:
+            # Caches populated before the index was introduced
             matching_files = [
                 file
                 for file in fnmatch.filter(os.listdir(cache_dir), filename + ".*")
@@ -450,14 +738,25 @@ def get_from_cache(
 
     # From now on, etag is not None.
     if os.path.exists(cache_path) and not force_download:
+        update_cache_index(cache_dir, url, etag, filename)
         return cache_path
 
     # Prevent parallel downloads of the same file with a lock.
     lock_path = cache_path + ".lock"
     with FileLock(lock_path):
 
-        if resume_download:
-            incomplete_path = cache_path + ".incomplete"
+        # Files of at least PARALLEL_DOWNLOAD_THRESHOLD bytes are downloaded with concurrent range requests when the
+        # server supports them (and no partial download is to be resumed)
+        incomplete_path = cache_path + ".incomplete"
+        parallel = (
+            not url.startswith("s3://")
+            and accept_ranges
+            and content_length is not None
+            and content_length >= PARALLEL_DOWNLOAD_THRESHOLD
+            and not (resume_download and os.path.exists(incomplete_path))
+        )
+
+        if resume_download and not parallel:
 
             @contextmanager
             def _resumable_file_manager():
@@ -470,6 +769,8 @@ def get_from_cache(
             else:
                 resume_size = 0
         else:
+            # A parallel download is written at the offsets of its ranges in a file allocated to the full size: it
+            # can't be resumed from its size, so it always goes to a temporary file
             temp_file_manager = partial(tempfile.NamedTemporaryFile, dir=cache_dir, delete=False)
             resume_size = 0
 
@@ -483,9 +784,24 @@ def get_from_cache(
                 if resume_download:
                     logger.warn('Warning: resumable downloads are not implemented for "s3://" urls')
                 s3_get(url, temp_file, proxies=proxies)
+            elif parallel:
+                try:
+                    http_get_parallel(url, temp_file, content_length, proxies=proxies, user_agent=user_agent)
+                except Exception:
+                    # The file has holes where the ranges weren't downloaded: don't leave it behind
+                    temp_file.close()
+                    os.remove(temp_file.name)
+                    raise
             else:
                 http_get(url, temp_file, proxies=proxies, resume_size=resume_size, user_agent=user_agent)
 
+        try:
+            verify_download(temp_file.name, etag=etag, expected_size=content_length)
+        except EnvironmentError:
+            # Don't leave a corrupt file behind, it would be resumed or picked up later on
+            os.remove(temp_file.name)
+            raise
+
         logger.info("storing %s in cache at %s", url, cache_path)
         os.rename(temp_file.name, cache_path)
 
@@ -495,4 +811,69 @@ def get_from_cache(
         with open(meta_path, "w") as meta_file:
             json.dump(meta, meta_file)
 
+    update_cache_index(cache_dir, url, etag, filename)
+
     return cache_path
+
+
+# Parsed cache indexes by path: ((mtime, size) of the file, entries by url, number of lines)
+_cache_indexes = {}
+
+
+def _load_cache_index(index_path):
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        return {}, 0
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache_indexes.get(index_path)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    entries = {}
+    num_lines = 0
+    with open(index_path, "r", encoding="utf-8") as index_file:
+        for line in index_file:
+            num_lines += 1
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Line truncated by an interrupted write
+                continue
+            entries[entry["url"]] = entry
+    _cache_indexes[index_path] = (version, entries, num_lines)
+    return entries, num_lines
+
+
+def read_cache_index(cache_dir) -> Dict[str, dict]:
+    """
+    Read the index of the files downloaded in `cache_dir`.
+
+    The index is a JSON-lines file (CACHE_INDEX_NAME) with one entry per download or revalidation:
+    ``{"url": ..., "etag": ..., "filename": ..., "checked": <timestamp of the last ETag check>}``.
+    The last entry of a url wins. The parsed index is kept in memory until the file changes.
+
+    Return:
+        A dict mapping each url to its last entry.
+    """
+    entries, _ = _load_cache_index(os.path.join(str(cache_dir), CACHE_INDEX_NAME))
+    return entries
+
+
+def update_cache_index(cache_dir, url, etag, filename):
+    """ Record in the index of `cache_dir` that `url` (with `etag`) is cached in `filename` and was just checked. """
+    index_path = os.path.join(str(cache_dir), CACHE_INDEX_NAME)
+    entry = {"url": url, "etag": etag, "filename": filename, "checked": time.time()}
+    with FileLock(index_path + ".lock"):
+        entries, num_lines = _load_cache_index(index_path)
+        if num_lines > 2 * len(entries) + 100:
+            # Compact the index: only keep the last entry of each url
+            entries = dict(entries)
+            entries[url] = entry
+            with open(index_path + ".tmp", "w", encoding="utf-8") as index_file:
+                for index_entry in entries.values():
+                    index_file.write(json.dumps(index_entry) + "\n")
+            os.replace(index_path + ".tmp", index_path)
+        else:
+            with open(index_path, "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps(entry) + "\n")
@@ -193,6 +193,7 @@ class AlbertAttention(BertSelfAttention):
         self.dense = nn.Linear(config.hidden_size, config.hidden_size)
         self.LayerNorm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
         self.pruned_heads = set()
+        self._packed_dense = None
 
     def prune_heads(self, heads):
         if len(heads) == 0:
@@ -210,21 +211,29 @@ class AlbertAttention(BertSelfAttention):
         self.query = prune_linear_layer(self.query, index)
         self.key = prune_linear_layer(self.key, index)
         self.value = prune_linear_layer(self.value, index)
+        self._packed_qkv = None
         self.dense = prune_linear_layer(self.dense, index, dim=1)
+        self._packed_dense = None
 
         # Update hyper params and store pruned heads
         self.num_attention_heads = self.num_attention_heads - len(heads)
         self.all_head_size = self.attention_head_size * self.num_attention_heads
         self.pruned_heads = self.pruned_heads.union(heads)
 
-    def forward(self, input_ids, attention_mask=None, head_mask=None):
-        mixed_query_layer = self.query(input_ids)
-        mixed_key_layer = self.key(input_ids)
-        mixed_value_layer = self.value(input_ids)
+    def packed_dense(self):
+        """ Returns the output projection as a contiguous (num_heads, head_size, hidden_size) weight. It is packed once
+            and reused by all the layers sharing this module, and packed again if the projection was modified.
+        """
+        weight = self.dense.weight
+        if self._packed_dense is None or self._packed_dense[1] != (weight.data_ptr(), weight._version):
+            packed_weight = (
+                weight.detach().t().reshape(self.num_attention_heads, self.attention_head_size, self.hidden_size)
+            )
+            self._packed_dense = (packed_weight.contiguous(), (weight.data_ptr(), weight._version))
+        return self._packed_dense[0]
 
-        query_layer = self.transpose_for_scores(mixed_query_layer)
-        key_layer = self.transpose_for_scores(mixed_key_layer)
-        value_layer = self.transpose_for_scores(mixed_value_layer)
+    def forward(self, input_ids, attention_mask=None, head_mask=None):
+        query_layer, key_layer, value_layer = self.project_qkv(input_ids)
 
         # Take the dot product between "query" and "key" to get the raw attention scores.
         attention_scores = torch.matmul(query_layer, key_layer.transpose(-1, -2))
@@ -246,17 +255,18 @@ class AlbertAttention(BertSelfAttention):
 
         context_layer = torch.matmul(attention_probs, value_layer)
 
-        context_layer = context_layer.permute(0, 2, 1, 3).contiguous()
-
-        # Should find a better way to do this
-        w = (
-            self.dense.weight.t()
-            .view(self.num_attention_heads, self.attention_head_size, self.hidden_size)
-            .to(context_layer.dtype)
-        )
+        # Project the (batch_size, num_heads, seq_length, head_size) context directly, without merging the heads first
+        if self.fused_qkv and not self.training and not torch.is_grad_enabled() and isinstance(self.dense, nn.Linear):
+            w = self.packed_dense().to(context_layer.dtype)
+        else:
+            w = (
+                self.dense.weight.t()
+                .view(self.num_attention_heads, self.attention_head_size, self.hidden_size)
+                .to(context_layer.dtype)
+            )
         b = self.dense.bias.to(context_layer.dtype)
 
-        projected_context_layer = torch.einsum("bfnd,ndh->bfh", context_layer, w) + b
+        projected_context_layer = torch.einsum("bnfd,ndh->bfh", context_layer, w) + b
         projected_context_layer_dropout = self.dropout(projected_context_layer)
         layernormed_context_layer = self.LayerNorm(input_ids + projected_context_layer_dropout)
         return (layernormed_context_layer, attention_probs) if self.output_attentions else (layernormed_context_layer,)
@@ -323,6 +333,21 @@ class AlbertTransformer(nn.Module):
         self.embedding_hidden_mapping_in = nn.Linear(config.embedding_size, config.hidden_size)
         self.albert_layer_groups = nn.ModuleList([AlbertLayerGroup(config) for _ in range(config.num_hidden_groups)])
 
+        # Number of layers in a hidden group, and index of the hidden group (whose weights are shared) of each layer
+        self.layers_per_group = config.num_hidden_layers // config.num_hidden_groups
+        self.layer_groups = [
+            i * config.num_hidden_groups // config.num_hidden_layers for i in range(config.num_hidden_layers)
+        ]
+
+    def forward_layer(self, layer_index, hidden_states, attention_mask=None, head_mask=None):
+        """ Runs the hidden group of the `layer_index`-th layer. """
+        group_idx = self.layer_groups[layer_index]
+        if head_mask is None:
+            group_head_mask = [None] * self.config.inner_group_num
+        else:
+            group_head_mask = head_mask[group_idx * self.layers_per_group : (group_idx + 1) * self.layers_per_group]
+        return self.albert_layer_groups[group_idx](hidden_states, attention_mask, group_head_mask)
+
     def forward(self, hidden_states, attention_mask=None, head_mask=None):
         hidden_states = self.embedding_hidden_mapping_in(hidden_states)
 
@@ -332,17 +357,7 @@ class AlbertTransformer(nn.Module):
             all_hidden_states = (hidden_states,)
 
         for i in range(self.config.num_hidden_layers):
-            # Number of layers in a hidden group
-            layers_per_group = int(self.config.num_hidden_layers / self.config.num_hidden_groups)
-
-            # Index of the hidden group
-            group_idx = int(i / (self.config.num_hidden_layers / self.config.num_hidden_groups))
-
-            layer_group_output = self.albert_layer_groups[group_idx](
-                hidden_states,
-                attention_mask,
-                head_mask[group_idx * layers_per_group : (group_idx + 1) * layers_per_group],
-            )
+            layer_group_output = self.forward_layer(i, hidden_states, attention_mask, head_mask)
             hidden_states = layer_group_output[0]
 
             if self.output_attentions:
@@ -381,6 +396,20 @@ class AlbertPreTrainedModel(PreTrainedModel):
             module.bias.data.zero_()
             module.weight.data.fill_(1.0)
 
+    def prepare_for_inference(self):
+        """ Puts the model in inference mode, with the fused attention path (see ``config.fused_qkv``), and packs the
+            weights of each distinct shared layer once: the ``num_hidden_groups * inner_group_num`` layers are reused
+            by all the ``num_hidden_layers`` layers, which then run with the packed query/key/value and output
+            projections without repacking. The weights are packed again if they are modified later.
+        """
+        self.eval()
+        for module in self.modules():
+            if isinstance(module, AlbertAttention):
+                module.fused_qkv = True
+                module.packed_qkv()
+                module.packed_dense()
+        return self
+
 
 ALBERT_START_DOCSTRING = r"""
 
@@ -466,6 +495,35 @@ class AlbertModel(AlbertPreTrainedModel):
         self.embeddings.word_embeddings = new_embeddings
         return self.embeddings.word_embeddings
 
+    def embed(self, input_ids=None, attention_mask=None, token_type_ids=None, position_ids=None, inputs_embeds=None):
+        """ Returns the embeddings of the inputs and the attention mask broadcastable to the attention scores (with
+            -10000.0 at the masked positions), i.e. the inputs of the encoder.
+        """
+        if input_ids is not None and inputs_embeds is not None:
+            raise ValueError("You cannot specify both input_ids and inputs_embeds at the same time")
+        elif input_ids is not None:
+            input_shape = input_ids.size()
+        elif inputs_embeds is not None:
+            input_shape = inputs_embeds.size()[:-1]
+        else:
+            raise ValueError("You have to specify either input_ids or inputs_embeds")
+
+        device = input_ids.device if input_ids is not None else inputs_embeds.device
+
+        if attention_mask is None:
+            attention_mask = torch.ones(input_shape, device=device)
+        if token_type_ids is None:
+            token_type_ids = torch.zeros(input_shape, dtype=torch.long, device=device)
+
+        extended_attention_mask = attention_mask.unsqueeze(1).unsqueeze(2)
+        extended_attention_mask = extended_attention_mask.to(dtype=next(self.parameters()).dtype)  # fp16 compatibility
+        extended_attention_mask = (1.0 - extended_attention_mask) * -10000.0
+
+        embedding_output = self.embeddings(
+            input_ids, position_ids=position_ids, token_type_ids=token_type_ids, inputs_embeds=inputs_embeds
+        )
+        return embedding_output, extended_attention_mask
+
     def _prune_heads(self, heads_to_prune):
         """ Prunes heads of the model.
             heads_to_prune: dict of {layer_num: list of heads to prune in this layer}
@@ -533,25 +591,9 @@ class AlbertModel(AlbertPreTrainedModel):
 
         """
 
-        if input_ids is not None and inputs_embeds is not None:
-            raise ValueError("You cannot specify both input_ids and inputs_embeds at the same time")
-        elif input_ids is not None:
-            input_shape = input_ids.size()
-        elif inputs_embeds is not None:
-            input_shape = inputs_embeds.size()[:-1]
-        else:
-            raise ValueError("You have to specify either input_ids or inputs_embeds")
-
-        device = input_ids.device if input_ids is not None else inputs_embeds.device
-
-        if attention_mask is None:
-            attention_mask = torch.ones(input_shape, device=device)
-        if token_type_ids is None:
-            token_type_ids = torch.zeros(input_shape, dtype=torch.long, device=device)
-
-        extended_attention_mask = attention_mask.unsqueeze(1).unsqueeze(2)
-        extended_attention_mask = extended_attention_mask.to(dtype=next(self.parameters()).dtype)  # fp16 compatibility
-        extended_attention_mask = (1.0 - extended_attention_mask) * -10000.0
+        embedding_output, extended_attention_mask = self.embed(
+            input_ids, attention_mask, token_type_ids, position_ids, inputs_embeds
+        )
         if head_mask is not None:
             if head_mask.dim() == 1:
                 head_mask = head_mask.unsqueeze(0).unsqueeze(0).unsqueeze(-1).unsqueeze(-1)
@@ -566,9 +608,6 @@ class AlbertModel(AlbertPreTrainedModel):
         else:
             head_mask = [None] * self.config.num_hidden_layers
 
-        embedding_output = self.embeddings(
-            input_ids, position_ids=position_ids, token_type_ids=token_type_ids, inputs_embeds=inputs_embeds
-        )
         encoder_outputs = self.encoder(embedding_output, extended_attention_mask, head_mask=head_mask)
 
         sequence_output = encoder_outputs[0]
@@ -709,6 +748,63 @@ class AlbertForSequenceClassification(AlbertPreTrainedModel):
 
         self.init_weights()
 
+    def early_exit_forward(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        token_type_ids=None,
+        position_ids=None,
+        inputs_embeds=None,
+        threshold=None,
+    ):
+        r""" Inference with confidence-based early exit. The layers of ALBERT share their weights, so the
+        classification head can be evaluated on the output of every layer: after each layer, the examples whose
+        highest class probability reaches `threshold` (``config.early_exit_threshold`` by default) keep the logits of
+        this layer and are removed from the batch, the other ones go through the next layer.
+
+        The head should have been fine-tuned on the outputs of the intermediate layers for the early predictions to be
+        accurate. With a threshold above 1, all the examples go through all the layers.
+
+    Returns:
+        :obj:`tuple(torch.FloatTensor, torch.LongTensor)`:
+        logits ``torch.FloatTensor`` of shape ``(batch_size, config.num_labels)``
+            Classification scores (before SoftMax) of each example at the layer where it exited.
+        exit_layers ``torch.LongTensor`` of shape ``(batch_size,)``
+            Number of layers each example went through.
+        """
+        if threshold is None:
+            threshold = self.config.early_exit_threshold
+        albert = self.albert
+        hidden_states, extended_attention_mask = albert.embed(
+            input_ids, attention_mask, token_type_ids, position_ids, inputs_embeds
+        )
+        hidden_states = albert.encoder.embedding_hidden_mapping_in(hidden_states)
+
+        batch_size = hidden_states.size(0)
+        logits = hidden_states.new_zeros(batch_size, self.num_labels)
+        exit_layers = torch.full((batch_size,), self.config.num_hidden_layers, dtype=torch.long, device=logits.device)
+        # Indices in the batch of the examples which didn't exit yet
+        active = torch.arange(batch_size, device=logits.device)
+        for i in range(self.config.num_hidden_layers):
+            hidden_states = albert.encoder.forward_layer(i, hidden_states, extended_attention_mask)[0]
+            pooled_output = albert.pooler_activation(albert.pooler(hidden_states[:, 0]))
+            layer_logits = self.classifier(self.dropout(pooled_output))
+            logits[active] = layer_logits
+            if i == self.config.num_hidden_layers - 1:
+                break
+
+            exiting = layer_logits.softmax(dim=-1).max(dim=-1)[0] >= threshold
+            if exiting.any():
+                exit_layers[active[exiting]] = i + 1
+                remaining = ~exiting
+                if not remaining.any():
+                    break
+                active = active[remaining]
+                hidden_states = hidden_states[remaining]
+                extended_attention_mask = extended_attention_mask[remaining]
+
+        return logits, exit_layers
+
     @add_start_docstrings_to_callable(ALBERT_INPUTS_DOCSTRING)
     def forward(
         self,
@@ -759,6 +855,17 @@ class AlbertForSequenceClassification(AlbertPreTrainedModel):
 
         """
 
+        if (
+            self.config.early_exit_threshold is not None
+            and not self.training
+            and labels is None
+            and head_mask is None
+            and self.num_labels > 1
+            and not self.config.output_attentions
+            and not self.config.output_hidden_states
+        ):
+            return self.early_exit_forward(input_ids, attention_mask, token_type_ids, position_ids, inputs_embeds)[:1]
+
         outputs = self.albert(
             input_ids=input_ids,
             attention_mask=attention_mask,
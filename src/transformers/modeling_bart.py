@@ -24,7 +24,7 @@ from torch import Tensor, nn
 from .activations import ACT2FN
 from .configuration_bart import BartConfig
 from .file_utils import add_start_docstrings, add_start_docstrings_to_callable
-from .modeling_utils import PreTrainedModel, create_position_ids_from_input_ids
+from .modeling_utils import PreTrainedModel, chunked_attention, create_position_ids_from_input_ids
 
 
 logger = logging.getLogger(__name__)
@@ -178,7 +178,10 @@ class EncoderLayer(nn.Module):
         self.embed_dim = config.d_model
         self.output_attentions = config.output_attentions
         self.self_attn = SelfAttention(
-            self.embed_dim, config.encoder_attention_heads, dropout=config.attention_dropout,
+            self.embed_dim,
+            config.encoder_attention_heads,
+            dropout=config.attention_dropout,
+            attention_chunk_size=config.attention_chunk_size,
         )
         self.self_attn_layer_norm = LayerNorm(self.embed_dim)
         self.dropout = config.dropout
@@ -306,7 +309,10 @@ class DecoderLayer(nn.Module):
         self.embed_dim = config.d_model
         self.output_attentions = config.output_attentions
         self.self_attn = SelfAttention(
-            embed_dim=self.embed_dim, num_heads=config.decoder_attention_heads, dropout=config.attention_dropout,
+            embed_dim=self.embed_dim,
+            num_heads=config.decoder_attention_heads,
+            dropout=config.attention_dropout,
+            attention_chunk_size=config.attention_chunk_size,
         )
         self.dropout = config.dropout
         self.activation_fn = ACT2FN[config.activation_function]
@@ -318,6 +324,7 @@ class DecoderLayer(nn.Module):
             config.decoder_attention_heads,
             dropout=config.attention_dropout,
             encoder_decoder_attention=True,
+            attention_chunk_size=config.attention_chunk_size,
         )
         self.encoder_attn_layer_norm = LayerNorm(self.embed_dim)
         self.fc1 = nn.Linear(self.embed_dim, config.decoder_ffn_dim)
@@ -512,11 +519,13 @@ class SelfAttention(nn.Module):
         dropout=0.0,
         bias=True,
         encoder_decoder_attention=False,  # otherwise self_attention
+        attention_chunk_size=None,
     ):
         super().__init__()
         self.embed_dim = embed_dim
         self.num_heads = num_heads
         self.dropout = dropout
+        self.attention_chunk_size = attention_chunk_size
         self.head_dim = embed_dim // num_heads
         assert self.head_dim * num_heads == self.embed_dim, "embed_dim must be divisible by num_heads"
         self.scaling = self.head_dim ** -0.5
@@ -585,6 +594,30 @@ class SelfAttention(nn.Module):
 
         assert k is not None
         src_len = k.size(1)
+        # This is part of a workaround to get around fork/join parallelism not supporting Optional types.
+        if key_padding_mask is not None and key_padding_mask.dim() == 0:
+            key_padding_mask = None
+        assert key_padding_mask is None or key_padding_mask.size()[:2] == (bsz, src_len,)
+
+        if self.attention_chunk_size is not None and not need_weights:
+            # Memory-efficient attention: the attention weights are never materialized
+            attention_biases = [] if attn_mask is None else [attn_mask]
+            if key_padding_mask is not None:  # don't attend to padding symbols
+                padding_bias = torch.zeros(key_padding_mask.size(), dtype=q.dtype, device=q.device)
+                attention_biases.append(padding_bias.masked_fill(key_padding_mask, float("-inf"))[:, None, None, :])
+            assert v is not None
+            attn_output = chunked_attention(
+                q.view(bsz, self.num_heads, tgt_len, self.head_dim),
+                k.view(bsz, self.num_heads, src_len, self.head_dim),
+                v.view(bsz, self.num_heads, src_len, self.head_dim),
+                attention_biases=attention_biases,
+                dropout=lambda probs: F.dropout(probs, p=self.dropout, training=self.training),
+                chunk_size=self.attention_chunk_size,
+            )
+            attn_output = attn_output.view(bsz * self.num_heads, tgt_len, self.head_dim)
+            attn_output = attn_output.transpose(0, 1).contiguous().view(tgt_len, bsz, embed_dim)
+            return self.out_proj(attn_output), None
+
         attn_weights = torch.bmm(q, k.transpose(1, 2))
         assert attn_weights.size() == (bsz * self.num_heads, tgt_len, src_len)
 
@@ -592,11 +625,6 @@ class SelfAttention(nn.Module):
             attn_weights = attn_weights.view(bsz, self.num_heads, tgt_len, src_len) + attn_mask
             attn_weights = attn_weights.view(bsz * self.num_heads, tgt_len, src_len)
 
-        # This is part of a workaround to get around fork/join parallelism not supporting Optional types.
-        if key_padding_mask is not None and key_padding_mask.dim() == 0:
-            key_padding_mask = None
-        assert key_padding_mask is None or key_padding_mask.size()[:2] == (bsz, src_len,)
-
         if key_padding_mask is not None:  # don't attend to padding symbols
             attn_weights = attn_weights.view(bsz, self.num_heads, tgt_len, src_len)
             reshaped = key_padding_mask.unsqueeze(1).unsqueeze(2)
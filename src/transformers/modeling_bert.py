@@ -27,7 +27,14 @@ from torch.nn import CrossEntropyLoss, MSELoss
 from .activations import gelu, gelu_new, swish
 from .configuration_bert import BertConfig
 from .file_utils import add_start_docstrings, add_start_docstrings_to_callable
-from .modeling_utils import PreTrainedModel, prune_linear_layer
+from .modeling_utils import (
+    PreTrainedModel,
+    chunked_attention,
+    get_unpad_data,
+    pad_input,
+    prune_linear_layer,
+    unpad_input,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -161,11 +168,9 @@ class BertEmbeddings(nn.Module):
         else:
             input_shape = inputs_embeds.size()[:-1]
 
-        seq_length = input_shape[1]
         device = input_ids.device if input_ids is not None else inputs_embeds.device
         if position_ids is None:
-            position_ids = torch.arange(seq_length, dtype=torch.long, device=device)
-            position_ids = position_ids.unsqueeze(0).expand(input_shape)
+            position_ids = self.create_position_ids(input_ids, inputs_embeds)
         if token_type_ids is None:
             token_type_ids = torch.zeros(input_shape, dtype=torch.long, device=device)
 
@@ -179,6 +184,15 @@ class BertEmbeddings(nn.Module):
         embeddings = self.dropout(embeddings)
         return embeddings
 
+    def create_position_ids(self, input_ids=None, inputs_embeds=None):
+        """ Default position ids of a (batch_size, seq_length) batch of `input_ids` or `inputs_embeds`. """
+        if input_ids is not None:
+            input_shape, device = input_ids.size(), input_ids.device
+        else:
+            input_shape, device = inputs_embeds.size()[:-1], inputs_embeds.device
+        position_ids = torch.arange(input_shape[1], dtype=torch.long, device=device)
+        return position_ids.unsqueeze(0).expand(input_shape)
+
 
 class BertSelfAttention(nn.Module):
     def __init__(self, config):
@@ -200,11 +214,80 @@ class BertSelfAttention(nn.Module):
 
         self.dropout = nn.Dropout(config.attention_probs_dropout_prob)
 
+        self.fused_qkv = config.fused_qkv
+        self._packed_qkv = None
+        self.attention_chunk_size = config.attention_chunk_size
+
     def transpose_for_scores(self, x):
         new_x_shape = x.size()[:-1] + (self.num_attention_heads, self.attention_head_size)
         x = x.view(*new_x_shape)
         return x.permute(0, 2, 1, 3)
 
+    def pack_qkv(self):
+        """ Packs the query, key and value projections in a single (3 * all_head_size, hidden_size) weight (and bias).
+            The packed tensors are a copy cached next to the ``query``, ``key`` and ``value`` parameters, which are
+            left untouched (optimizers and the state dict keep working on them). This costs the memory of one extra
+            copy of the projections.
+        """
+        linears = (self.query, self.key, self.value)
+        with torch.no_grad():
+            weight = torch.cat([linear.weight for linear in linears])
+            bias = torch.cat([linear.bias for linear in linears])
+        self._packed_qkv = (weight, bias, self._qkv_versions())
+        return weight, bias
+
+    def _qkv_versions(self):
+        tensors = [linear.weight for linear in (self.query, self.key, self.value)]
+        tensors += [linear.bias for linear in (self.query, self.key, self.value)]
+        return [(tensor.data_ptr(), tensor._version) for tensor in tensors]
+
+    def packed_qkv(self):
+        """ Returns the packed query/key/value weight and bias, packing them again if the projections were
+            replaced or modified in place since (e.g. by ``prune_heads``, ``to()``, ``half()``, ``load_state_dict``
+            or an optimizer step).
+        """
+        packed_qkv = self._packed_qkv
+        if packed_qkv is None or packed_qkv[2] != self._qkv_versions():
+            return self.pack_qkv()
+        return packed_qkv[:2]
+
+    def project_qkv(self, hidden_states, encoder_hidden_states=None, unpad_indices=None, padded_shape=None):
+        """ Computes the query, key and value layers, each of shape (batch_size, num_heads, seq_length, head_size).
+
+            In inference (``config.fused_qkv`` is set, the module is in eval mode and gradients are disabled), the
+            projections are computed with a single GEMM on the packed weight and split in heads with views only.
+
+            With `unpad_indices` (see :func:`~transformers.modeling_utils.get_unpad_data`), `hidden_states` holds the
+            (total_tokens, hidden_size) real tokens only: they are projected as is, then padded to `padded_shape`.
+        """
+
+        def split_heads(mixed_layer, num_layers):
+            if unpad_indices is not None:
+                mixed_layer = pad_input(mixed_layer, unpad_indices, *padded_shape)
+            mixed_layer = mixed_layer.view(
+                *mixed_layer.size()[:-1], num_layers, self.num_attention_heads, self.attention_head_size
+            )
+            # (num_layers, batch_size, num_heads, seq_length, head_size) views of the projection
+            return mixed_layer.permute(2, 0, 3, 1, 4).unbind(0)
+
+        if not self.fused_qkv or self.training or torch.is_grad_enabled() or not isinstance(self.query, nn.Linear):
+            context_states = hidden_states if encoder_hidden_states is None else encoder_hidden_states
+            (query_layer,) = split_heads(self.query(hidden_states), 1)
+            (key_layer,) = split_heads(self.key(context_states), 1)
+            (value_layer,) = split_heads(self.value(context_states), 1)
+            return query_layer, key_layer, value_layer
+
+        weight, bias = self.packed_qkv()
+        if encoder_hidden_states is None:
+            return split_heads(nn.functional.linear(hidden_states, weight, bias), 3)
+
+        size = self.query.weight.size(0)
+        (query_layer,) = split_heads(self.query(hidden_states), 1)
+        key_layer, value_layer = split_heads(
+            nn.functional.linear(encoder_hidden_states, weight[size:], bias[size:]), 2
+        )
+        return query_layer, key_layer, value_layer
+
     def forward(
         self,
         hidden_states,
@@ -212,47 +295,58 @@ class BertSelfAttention(nn.Module):
         head_mask=None,
         encoder_hidden_states=None,
         encoder_attention_mask=None,
+        unpad_indices=None,
     ):
-        mixed_query_layer = self.query(hidden_states)
-
         # If this is instantiated as a cross-attention module, the keys
         # and values come from an encoder; the attention mask needs to be
         # such that the encoder's padding tokens are not attended to.
         if encoder_hidden_states is not None:
-            mixed_key_layer = self.key(encoder_hidden_states)
-            mixed_value_layer = self.value(encoder_hidden_states)
             attention_mask = encoder_attention_mask
-        else:
-            mixed_key_layer = self.key(hidden_states)
-            mixed_value_layer = self.value(hidden_states)
 
-        query_layer = self.transpose_for_scores(mixed_query_layer)
-        key_layer = self.transpose_for_scores(mixed_key_layer)
-        value_layer = self.transpose_for_scores(mixed_value_layer)
+        # Padding-free execution: the real tokens are packed in `hidden_states`, and attention runs on the
+        # (batch_size, max_seqlen) block described by the attention mask
+        padded_shape = None if unpad_indices is None else (attention_mask.size(0), attention_mask.size(-1))
+        query_layer, key_layer, value_layer = self.project_qkv(
+            hidden_states, encoder_hidden_states, unpad_indices, padded_shape
+        )
 
-        # Take the dot product between "query" and "key" to get the raw attention scores.
-        attention_scores = torch.matmul(query_layer, key_layer.transpose(-1, -2))
-        attention_scores = attention_scores / math.sqrt(self.attention_head_size)
-        if attention_mask is not None:
-            # Apply the attention mask is (precomputed for all layers in BertModel forward() function)
-            attention_scores = attention_scores + attention_mask
+        if self.attention_chunk_size is not None and not self.output_attentions:
+            # Memory-efficient attention: the attention probabilities are never materialized
+            context_layer = chunked_attention(
+                query_layer / math.sqrt(self.attention_head_size),
+                key_layer,
+                value_layer,
+                attention_biases=() if attention_mask is None else (attention_mask,),
+                head_mask=head_mask,
+                dropout=self.dropout,
+                chunk_size=self.attention_chunk_size,
+            )
+        else:
+            # Take the dot product between "query" and "key" to get the raw attention scores.
+            attention_scores = torch.matmul(query_layer, key_layer.transpose(-1, -2))
+            attention_scores = attention_scores / math.sqrt(self.attention_head_size)
+            if attention_mask is not None:
+                # Apply the attention mask is (precomputed for all layers in BertModel forward() function)
+                attention_scores = attention_scores + attention_mask
 
-        # Normalize the attention scores to probabilities.
-        attention_probs = nn.Softmax(dim=-1)(attention_scores)
+            # Normalize the attention scores to probabilities.
+            attention_probs = nn.Softmax(dim=-1)(attention_scores)
 
-        # This is actually dropping out entire tokens to attend to, which might
-        # seem a bit unusual, but is taken from the original Transformer paper.
-        attention_probs = self.dropout(attention_probs)
+            # This is actually dropping out entire tokens to attend to, which might
+            # seem a bit unusual, but is taken from the original Transformer paper.
+            attention_probs = self.dropout(attention_probs)
 
-        # Mask heads if we want to
-        if head_mask is not None:
-            attention_probs = attention_probs * head_mask
+            # Mask heads if we want to
+            if head_mask is not None:
+                attention_probs = attention_probs * head_mask
 
-        context_layer = torch.matmul(attention_probs, value_layer)
+            context_layer = torch.matmul(attention_probs, value_layer)
 
-        context_layer = context_layer.permute(0, 2, 1, 3).contiguous()
-        new_context_layer_shape = context_layer.size()[:-2] + (self.all_head_size,)
-        context_layer = context_layer.view(*new_context_layer_shape)
+        # Merge the heads back: a single copy, that the output projection needs anyway
+        new_context_layer_shape = context_layer.size()[:1] + context_layer.size()[2:3] + (self.all_head_size,)
+        context_layer = context_layer.transpose(1, 2).reshape(new_context_layer_shape)
+        if unpad_indices is not None:
+            context_layer = unpad_input(context_layer, unpad_indices)
 
         outputs = (context_layer, attention_probs) if self.output_attentions else (context_layer,)
         return outputs
@@ -295,6 +389,7 @@ class BertAttention(nn.Module):
         self.self.query = prune_linear_layer(self.self.query, index)
         self.self.key = prune_linear_layer(self.self.key, index)
         self.self.value = prune_linear_layer(self.self.value, index)
+        self.self._packed_qkv = None
         self.output.dense = prune_linear_layer(self.output.dense, index, dim=1)
 
         # Update hyper params and store pruned heads
@@ -309,9 +404,10 @@ class BertAttention(nn.Module):
         head_mask=None,
         encoder_hidden_states=None,
         encoder_attention_mask=None,
+        unpad_indices=None,
     ):
         self_outputs = self.self(
-            hidden_states, attention_mask, head_mask, encoder_hidden_states, encoder_attention_mask
+            hidden_states, attention_mask, head_mask, encoder_hidden_states, encoder_attention_mask, unpad_indices
         )
         attention_output = self.output(self_outputs[0], hidden_states)
         outputs = (attention_output,) + self_outputs[1:]  # add attentions if we output them
@@ -364,8 +460,9 @@ class BertLayer(nn.Module):
         head_mask=None,
         encoder_hidden_states=None,
         encoder_attention_mask=None,
+        unpad_indices=None,
     ):
-        self_attention_outputs = self.attention(hidden_states, attention_mask, head_mask)
+        self_attention_outputs = self.attention(hidden_states, attention_mask, head_mask, unpad_indices=unpad_indices)
         attention_output = self_attention_outputs[0]
         outputs = self_attention_outputs[1:]  # add self attentions if we output attention weights
 
@@ -396,6 +493,7 @@ class BertEncoder(nn.Module):
         head_mask=None,
         encoder_hidden_states=None,
         encoder_attention_mask=None,
+        unpad_indices=None,
     ):
         all_hidden_states = ()
         all_attentions = ()
@@ -404,7 +502,12 @@ class BertEncoder(nn.Module):
                 all_hidden_states = all_hidden_states + (hidden_states,)
 
             layer_outputs = layer_module(
-                hidden_states, attention_mask, head_mask[i], encoder_hidden_states, encoder_attention_mask
+                hidden_states,
+                attention_mask,
+                head_mask[i],
+                encoder_hidden_states,
+                encoder_attention_mask,
+                unpad_indices=unpad_indices,
             )
             hidden_states = layer_outputs[0]
 
@@ -726,6 +829,25 @@ class BertModel(BertPreTrainedModel):
                 )
             )
 
+        # Padding-free execution: only the real tokens go through the embeddings, feed-forward and layer norms,
+        # attention runs on (batch_size, longest sequence) blocks. The pooler needs the first token of each sequence.
+        unpad_indices = None
+        if (
+            self.config.unpad_inputs
+            and attention_mask.dim() == 2
+            and not self.config.is_decoder
+            and not self.config.output_attentions
+            and bool(attention_mask[:, 0].ne(0).all())
+        ):
+            indices, unpad_indices, unpadded_attention_mask = get_unpad_data(attention_mask)
+            extended_attention_mask = unpadded_attention_mask[:, None, None, :]
+            if position_ids is None:
+                position_ids = self.embeddings.create_position_ids(input_ids, inputs_embeds)
+            input_ids, token_type_ids, position_ids, inputs_embeds = [
+                None if tensor is None else unpad_input(tensor.expand(input_shape + tensor.size()[2:]), indices)[None]
+                for tensor in (input_ids, token_type_ids, position_ids, inputs_embeds)
+            ]
+
         # Since attention_mask is 1.0 for positions we want to attend and 0.0 for
         # masked positions, this operation will create a tensor which is 0.0 for
         # positions we want to attend and -10000.0 for masked positions.
@@ -782,13 +904,22 @@ class BertModel(BertPreTrainedModel):
         embedding_output = self.embeddings(
             input_ids=input_ids, position_ids=position_ids, token_type_ids=token_type_ids, inputs_embeds=inputs_embeds
         )
+        if unpad_indices is not None:
+            embedding_output = embedding_output[0]
         encoder_outputs = self.encoder(
             embedding_output,
             attention_mask=extended_attention_mask,
             head_mask=head_mask,
             encoder_hidden_states=encoder_hidden_states,
             encoder_attention_mask=encoder_extended_attention_mask,
+            unpad_indices=unpad_indices,
         )
+        if unpad_indices is not None:
+            # Scatter the real tokens back to the (batch_size, seq_length, hidden_size) inputs layout
+            encoder_outputs = (pad_input(encoder_outputs[0], indices, *input_shape),) + tuple(
+                tuple(pad_input(hidden_states, indices, *input_shape) for hidden_states in all_hidden_states)
+                for all_hidden_states in encoder_outputs[1:]
+            )
         sequence_output = encoder_outputs[0]
         pooled_output = self.pooler(sequence_output)
 
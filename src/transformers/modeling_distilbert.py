@@ -30,7 +30,14 @@ from torch.nn import CrossEntropyLoss
 from .activations import gelu
 from .configuration_distilbert import DistilBertConfig
 from .file_utils import add_start_docstrings, add_start_docstrings_to_callable
-from .modeling_utils import PreTrainedModel, prune_linear_layer
+from .modeling_utils import (
+    PreTrainedModel,
+    chunked_attention,
+    get_unpad_data,
+    pad_input,
+    prune_linear_layer,
+    unpad_input,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -71,21 +78,24 @@ class Embeddings(nn.Module):
         self.LayerNorm = nn.LayerNorm(config.dim, eps=1e-12)
         self.dropout = nn.Dropout(config.dropout)
 
-    def forward(self, input_ids):
+    def forward(self, input_ids, position_ids=None):
         """
         Parameters
         ----------
         input_ids: torch.tensor(bs, max_seq_length)
             The token ids to embed.
+        position_ids: torch.tensor(bs, max_seq_length), optional
+            The positions of the tokens, defaults to 0, ..., max_seq_length - 1.
 
         Outputs
         -------
         embeddings: torch.tensor(bs, max_seq_length, dim)
             The embedded tokens (plus position embeddings, no token_type embeddings)
         """
-        seq_length = input_ids.size(1)
-        position_ids = torch.arange(seq_length, dtype=torch.long, device=input_ids.device)  # (max_seq_length)
-        position_ids = position_ids.unsqueeze(0).expand_as(input_ids)  # (bs, max_seq_length)
+        if position_ids is None:
+            seq_length = input_ids.size(1)
+            position_ids = torch.arange(seq_length, dtype=torch.long, device=input_ids.device)  # (max_seq_length)
+            position_ids = position_ids.unsqueeze(0).expand_as(input_ids)  # (bs, max_seq_length)
 
         word_embeddings = self.word_embeddings(input_ids)  # (bs, max_seq_length, dim)
         position_embeddings = self.position_embeddings(position_ids)  # (bs, max_seq_length, dim)
@@ -104,6 +114,7 @@ class MultiHeadSelfAttention(nn.Module):
         self.dim = config.dim
         self.dropout = nn.Dropout(p=config.attention_dropout)
         self.output_attentions = config.output_attentions
+        self.attention_chunk_size = config.attention_chunk_size
 
         assert self.dim % self.n_heads == 0
 
@@ -135,7 +146,7 @@ class MultiHeadSelfAttention(nn.Module):
         self.dim = attention_head_size * self.n_heads
         self.pruned_heads = self.pruned_heads.union(heads)
 
-    def forward(self, query, key, value, mask, head_mask=None):
+    def forward(self, query, key, value, mask, head_mask=None, unpad_indices=None):
         """
         Parameters
         ----------
@@ -143,6 +154,9 @@ class MultiHeadSelfAttention(nn.Module):
         key: torch.tensor(bs, seq_length, dim)
         value: torch.tensor(bs, seq_length, dim)
         mask: torch.tensor(bs, seq_length)
+        unpad_indices: torch.tensor(total_tokens), optional
+            Padding-free execution: query, key and value are the (total_tokens, dim) real tokens only, that are
+            padded in the (bs, seq_length) block described by `mask` for attention (see `get_unpad_data`).
 
         Outputs
         -------
@@ -151,8 +165,11 @@ class MultiHeadSelfAttention(nn.Module):
         context: torch.tensor(bs, seq_length, dim)
             Contextualized layer. Optional: only if `output_attentions=True`
         """
-        bs, q_length, dim = query.size()
-        k_length = key.size(1)
+        if unpad_indices is None:
+            bs, q_length, dim = query.size()
+            k_length = key.size(1)
+        else:
+            bs, k_length = mask.size()
         # assert dim == self.dim, 'Dimensions do not match: %s input vs %s configured' % (dim, self.dim)
         # assert key.size() == value.size()
 
@@ -162,29 +179,43 @@ class MultiHeadSelfAttention(nn.Module):
 
         def shape(x):
             """ separate heads """
+            if unpad_indices is not None:
+                x = pad_input(x, unpad_indices, bs, k_length)
             return x.view(bs, -1, self.n_heads, dim_per_head).transpose(1, 2)
 
         def unshape(x):
             """ group heads """
-            return x.transpose(1, 2).contiguous().view(bs, -1, self.n_heads * dim_per_head)
+            x = x.transpose(1, 2).contiguous().view(bs, -1, self.n_heads * dim_per_head)
+            if unpad_indices is not None:
+                x = unpad_input(x, unpad_indices)
+            return x
 
         q = shape(self.q_lin(query))  # (bs, n_heads, q_length, dim_per_head)
         k = shape(self.k_lin(key))  # (bs, n_heads, k_length, dim_per_head)
         v = shape(self.v_lin(value))  # (bs, n_heads, k_length, dim_per_head)
 
         q = q / math.sqrt(dim_per_head)  # (bs, n_heads, q_length, dim_per_head)
-        scores = torch.matmul(q, k.transpose(2, 3))  # (bs, n_heads, q_length, k_length)
-        mask = (mask == 0).view(mask_reshp).expand_as(scores)  # (bs, n_heads, q_length, k_length)
-        scores.masked_fill_(mask, -float("inf"))  # (bs, n_heads, q_length, k_length)
+        if self.attention_chunk_size is not None and not self.output_attentions:
+            # Memory-efficient attention: the attention weights are never materialized
+            mask = torch.zeros(mask_reshp, dtype=q.dtype, device=q.device).masked_fill(
+                (mask == 0).view(mask_reshp), -float("inf")
+            )  # (bs, 1, 1, k_length)
+            context = chunked_attention(
+                q, k, v, (mask,), head_mask, self.dropout, self.attention_chunk_size
+            )  # (bs, n_heads, q_length, dim_per_head)
+        else:
+            scores = torch.matmul(q, k.transpose(2, 3))  # (bs, n_heads, q_length, k_length)
+            mask = (mask == 0).view(mask_reshp).expand_as(scores)  # (bs, n_heads, q_length, k_length)
+            scores.masked_fill_(mask, -float("inf"))  # (bs, n_heads, q_length, k_length)
 
-        weights = nn.Softmax(dim=-1)(scores)  # (bs, n_heads, q_length, k_length)
-        weights = self.dropout(weights)  # (bs, n_heads, q_length, k_length)
+            weights = nn.Softmax(dim=-1)(scores)  # (bs, n_heads, q_length, k_length)
+            weights = self.dropout(weights)  # (bs, n_heads, q_length, k_length)
 
-        # Mask heads if we want to
-        if head_mask is not None:
-            weights = weights * head_mask
+            # Mask heads if we want to
+            if head_mask is not None:
+                weights = weights * head_mask
 
-        context = torch.matmul(weights, v)  # (bs, n_heads, q_length, dim_per_head)
+            context = torch.matmul(weights, v)  # (bs, n_heads, q_length, dim_per_head)
         context = unshape(context)  # (bs, q_length, dim)
         context = self.out_lin(context)  # (bs, q_length, dim)
 
@@ -227,12 +258,14 @@ class TransformerBlock(nn.Module):
         self.ffn = FFN(config)
         self.output_layer_norm = nn.LayerNorm(normalized_shape=config.dim, eps=1e-12)
 
-    def forward(self, x, attn_mask=None, head_mask=None):
+    def forward(self, x, attn_mask=None, head_mask=None, unpad_indices=None):
         """
         Parameters
         ----------
         x: torch.tensor(bs, seq_length, dim)
         attn_mask: torch.tensor(bs, seq_length)
+        unpad_indices: torch.tensor(total_tokens), optional
+            Padding-free execution: x holds the (total_tokens, dim) real tokens only.
 
         Outputs
         -------
@@ -242,7 +275,9 @@ class TransformerBlock(nn.Module):
             The output of the transformer block contextualization.
         """
         # Self-Attention
-        sa_output = self.attention(query=x, key=x, value=x, mask=attn_mask, head_mask=head_mask)
+        sa_output = self.attention(
+            query=x, key=x, value=x, mask=attn_mask, head_mask=head_mask, unpad_indices=unpad_indices
+        )
         if self.output_attentions:
             sa_output, sa_weights = sa_output  # (bs, seq_length, dim), (bs, n_heads, seq_length, seq_length)
         else:  # To handle these `output_attention` or `output_hidden_states` cases returning tuples
@@ -270,7 +305,7 @@ class Transformer(nn.Module):
         layer = TransformerBlock(config)
         self.layer = nn.ModuleList([copy.deepcopy(layer) for _ in range(config.n_layers)])
 
-    def forward(self, x, attn_mask=None, head_mask=None):
+    def forward(self, x, attn_mask=None, head_mask=None, unpad_indices=None):
         """
         Parameters
         ----------
@@ -278,6 +313,8 @@ class Transformer(nn.Module):
             Input sequence embedded.
         attn_mask: torch.tensor(bs, seq_length)
             Attention mask on the sequence.
+        unpad_indices: torch.tensor(total_tokens), optional
+            Padding-free execution: x holds the (total_tokens, dim) real tokens only (see `get_unpad_data`).
 
         Outputs
         -------
@@ -298,7 +335,9 @@ class Transformer(nn.Module):
             if self.output_hidden_states:
                 all_hidden_states = all_hidden_states + (hidden_state,)
 
-            layer_outputs = layer_module(x=hidden_state, attn_mask=attn_mask, head_mask=head_mask[i])
+            layer_outputs = layer_module(
+                x=hidden_state, attn_mask=attn_mask, head_mask=head_mask[i], unpad_indices=unpad_indices
+            )
             hidden_state = layer_outputs[-1]
 
             if self.output_attentions:
@@ -478,9 +517,36 @@ class DistilBertModel(DistilBertPreTrainedModel):
         else:
             head_mask = [None] * self.config.num_hidden_layers
 
+        # Padding-free execution: only the real tokens go through the embeddings, feed-forward and layer norms,
+        # attention runs on (bs, longest sequence) blocks. Heads use the first token of each sequence.
+        unpad_indices = position_ids = None
+        if (
+            self.config.unpad_inputs
+            and attention_mask.dim() == 2
+            and not self.config.output_attentions
+            and bool(attention_mask[:, 0].ne(0).all())
+        ):
+            indices, unpad_indices, attention_mask = get_unpad_data(attention_mask)
+            if inputs_embeds is None:
+                position_ids = torch.arange(input_shape[1], dtype=torch.long, device=device).expand(input_shape)
+                input_ids = unpad_input(input_ids, indices)[None]  # (1, total_tokens)
+                position_ids = unpad_input(position_ids, indices)[None]  # (1, total_tokens)
+            else:
+                inputs_embeds = unpad_input(inputs_embeds, indices)[None]
+
         if inputs_embeds is None:
-            inputs_embeds = self.embeddings(input_ids)  # (bs, seq_length, dim)
-        tfmr_output = self.transformer(x=inputs_embeds, attn_mask=attention_mask, head_mask=head_mask)
+            inputs_embeds = self.embeddings(input_ids, position_ids)  # (bs, seq_length, dim)
+        if unpad_indices is not None:
+            inputs_embeds = inputs_embeds[0]  # (total_tokens, dim)
+        tfmr_output = self.transformer(
+            x=inputs_embeds, attn_mask=attention_mask, head_mask=head_mask, unpad_indices=unpad_indices
+        )
+        if unpad_indices is not None:
+            # Scatter the real tokens back to the (bs, seq_length, dim) inputs layout
+            tfmr_output = (pad_input(tfmr_output[0], indices, *input_shape),) + tuple(
+                tuple(pad_input(hidden_state, indices, *input_shape) for hidden_state in all_hidden_states)
+                for all_hidden_states in tfmr_output[1:]
+            )
         hidden_state = tfmr_output[0]
         output = (hidden_state,) + tfmr_output[1:]
 
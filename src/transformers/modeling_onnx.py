@@ -0,0 +1,162 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+""" Runtime for the ONNX graphs exported with `convert_graph_to_onnx`, based on ONNX Runtime. """
+
+
+import io
+import logging
+import os
+
+import numpy as np
+import torch
+
+from .configuration_auto import AutoConfig
+from .file_utils import ONNX_WEIGHTS_NAME, is_onnxruntime_available
+
+
+if is_onnxruntime_available():
+    import onnxruntime
+
+
+logger = logging.getLogger(__name__)
+
+ONNX_INPUT_TYPES = {"tensor(int64)": np.int64, "tensor(int32)": np.int32, "tensor(float)": np.float32}
+
+
+class OnnxModel(object):
+    r""" Runs a model exported to ONNX (see :func:`~transformers.convert_graph_to_onnx.export_onnx`) with an ONNX
+        Runtime inference session, with all the graph optimizations of ONNX Runtime enabled.
+
+        It is called like the PyTorch model it was exported from, with PyTorch tensors, and returns the same tuple of
+        outputs as PyTorch tensors, so that it can be used in place of the model in the pipelines (see the `backend`
+        argument of :func:`~transformers.pipeline`). The ``token_type_ids`` and ``attention_mask`` inputs of the
+        graph default to zeros and ones, and the ``past`` of a decoder exported with past is given as a list of
+        tensors, like for the PyTorch model.
+
+        Examples::
+
+            # After `transformers-cli convert --to onnx --model bert-base-cased --output ./bert-onnx/`
+            onnx_model = OnnxModel.from_pretrained('./bert-onnx/')
+            last_hidden_state = onnx_model(**tokenizer.encode_plus("Hello, my dog is cute", return_tensors="pt"))[0]
+
+            # Exported in memory
+            onnx_model = OnnxModel.from_model(BertModel.from_pretrained('bert-base-cased'))
+    """
+
+    def __init__(self, session, config, onnx_file=None):
+        self.session = session
+        self.config = config
+        self.onnx_file = onnx_file
+        self.input_names = [graph_input.name for graph_input in session.get_inputs()]
+        self.input_types = {graph_input.name: graph_input.type for graph_input in session.get_inputs()}
+        self.past_names = [name for name in self.input_names if name.startswith("past_")]
+
+    @staticmethod
+    def create_session(onnx_model, num_threads=None, providers=None):
+        """ ONNX Runtime inference session of `onnx_model` (file name or serialized graph). """
+        if not is_onnxruntime_available():
+            raise ImportError("ONNX Runtime is required to run ONNX graphs, install it with `pip install onnxruntime`")
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        if providers is None:
+            return onnxruntime.InferenceSession(onnx_model, options)
+        return onnxruntime.InferenceSession(onnx_model, options, providers=providers)
+
+    @classmethod
+    def from_pretrained(cls, path, num_threads=None, providers=None):
+        """ Loads the graph ``ONNX_WEIGHTS_NAME`` and the configuration saved in the directory `path` (see
+            :func:`~transformers.convert_graph_to_onnx.convert`).
+
+            Arguments:
+
+                num_threads: (`optional`) int, default None:
+                    Number of threads of ONNX Runtime (defaults to the number of cores).
+
+                providers: (`optional`) list of string, default None:
+                    Execution providers of ONNX Runtime (e.g. ``["CPUExecutionProvider"]``).
+        """
+        onnx_file = os.path.join(path, ONNX_WEIGHTS_NAME)
+        if not os.path.isfile(onnx_file):
+            raise EnvironmentError("No file named {} found in directory {}".format(ONNX_WEIGHTS_NAME, path))
+        session = cls.create_session(onnx_file, num_threads=num_threads, providers=providers)
+        return cls(session, AutoConfig.from_pretrained(path), onnx_file=onnx_file)
+
+    @classmethod
+    def from_model(cls, model, use_past=False, num_threads=None, providers=None):
+        """ Exports the PyTorch `model` to ONNX in memory and loads the graph. """
+        from .convert_graph_to_onnx import export_onnx
+
+        onnx_model = io.BytesIO()
+        export_onnx(model, onnx_model, use_past=use_past)
+        session = cls.create_session(onnx_model.getvalue(), num_threads=num_threads, providers=providers)
+        return cls(session, model.config)
+
+    def save_pretrained(self, save_directory):
+        """ Saves the graph and the configuration in `save_directory` (only for graphs loaded from a file). """
+        if self.onnx_file is None:
+            raise ValueError("The ONNX graph was exported in memory, use `convert_graph_to_onnx.convert` to save it")
+        os.makedirs(save_directory, exist_ok=True)
+        with open(self.onnx_file, "rb") as reader:
+            onnx_model = reader.read()
+        with open(os.path.join(save_directory, ONNX_WEIGHTS_NAME), "wb") as writer:
+            writer.write(onnx_model)
+        self.config.save_pretrained(save_directory)
+
+    def to(self, device):
+        if torch.device(device).type != "cpu":
+            logger.warning("The device of ONNX Runtime is selected with its execution providers, not with `to`")
+        return self
+
+    def eval(self):
+        return self
+
+    def _input_value(self, name, inputs, past):
+        input_ids = inputs["input_ids"]
+        if name in inputs:
+            return inputs[name]
+        if name == "token_type_ids":
+            return torch.zeros_like(input_ids)
+        if name == "attention_mask":
+            past_length = past[0].size(-2) if past else 0
+            return torch.ones(input_ids.size(0), past_length + input_ids.size(1), dtype=torch.long)
+        # Decoding without past
+        head_dim = self.config.n_embd // self.config.n_head
+        return torch.zeros(2, input_ids.size(0), self.config.n_head, 0, head_dim)
+
+    def __call__(self, **inputs):
+        past = inputs.pop("past", None)
+        unexpected_inputs = set(inputs) - set(self.input_names)
+        if unexpected_inputs or (past is not None and not self.past_names):
+            raise ValueError(
+                "The ONNX graph takes the inputs {}, got {}".format(
+                    self.input_names, sorted(inputs.keys()) + (["past"] if past is not None else [])
+                )
+            )
+        if past is not None:
+            inputs.update(zip(self.past_names, past))
+
+        onnx_inputs = {}
+        for name in self.input_names:
+            value = self._input_value(name, inputs, past)
+            value = value.cpu().numpy() if isinstance(value, torch.Tensor) else np.asarray(value)
+            onnx_inputs[name] = value.astype(ONNX_INPUT_TYPES.get(self.input_types[name], value.dtype), copy=False)
+
+        outputs = tuple(torch.from_numpy(output) for output in self.session.run(None, onnx_inputs))
+        if self.past_names:
+            # Same outputs as the PyTorch model: the presents are grouped in a tuple
+            return (outputs[0], outputs[1:])
+        return outputs
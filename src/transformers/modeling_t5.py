@@ -28,7 +28,7 @@ from torch.nn import CrossEntropyLoss
 
 from .configuration_t5 import T5Config
 from .file_utils import DUMMY_INPUTS, DUMMY_MASK, add_start_docstrings, add_start_docstrings_to_callable
-from .modeling_utils import PreTrainedModel, prune_linear_layer
+from .modeling_utils import PreTrainedModel, chunked_attention, prune_linear_layer
 
 
 logger = logging.getLogger(__name__)
@@ -200,6 +200,7 @@ class T5Attention(nn.Module):
         self.n_heads = config.num_heads
         self.dropout = config.dropout_rate
         self.inner_dim = self.n_heads * self.d_kv
+        self.attention_chunk_size = config.attention_chunk_size
 
         # Mesh TensorFlow initialization to avoid scaling before softmax
         self.q = nn.Linear(self.d_model, self.inner_dim, bias=False)
@@ -211,6 +212,11 @@ class T5Attention(nn.Module):
             self.relative_attention_bias = nn.Embedding(self.relative_attention_num_buckets, self.n_heads)
         self.pruned_heads = set()
 
+        # Table of the relative position buckets of the positions up to (at least) `n_positions`, built on the device
+        # of the module on first use and sliced for each (query length, key length), see `relative_position_buckets`
+        self.relative_position_table_size = config.n_positions
+        self._relative_position_buckets = None
+
     def prune_heads(self, heads):
         if len(heads) == 0:
             return
@@ -279,17 +285,33 @@ class T5Attention(nn.Module):
         ret += torch.where(is_small, n, val_if_large)
         return ret
 
-    def compute_bias(self, qlen, klen):
+    def relative_position_buckets(self, qlen, klen, query_offset=0):
+        """ Relative position buckets of the queries at positions `query_offset` to `query_offset + qlen` and the keys
+            at positions 0 to `klen`, shape (qlen, klen).
+
+            The buckets only depend on the difference of the positions, so they are sliced from a table of all the
+            positions up to the largest length seen, cached on the device of the module: incremental decoding (with
+            `query_offset`) slices the rows of the new positions.
+        """
+        length = max(query_offset + qlen, klen)
+        device = self.relative_attention_bias.weight.device
+        table = self._relative_position_buckets
+        if table is None or table.size(0) < length or table.device != device:
+            if table is not None and table.size(0) < length:
+                self.relative_position_table_size = max(length, 2 * table.size(0))
+            table_size = max(length, self.relative_position_table_size)
+            positions = torch.arange(table_size, dtype=torch.long, device=device)
+            table = self._relative_position_bucket(
+                positions[None, :] - positions[:, None],  # memory_position - context_position
+                bidirectional=not self.is_decoder,
+                num_buckets=self.relative_attention_num_buckets,
+            )
+            self._relative_position_buckets = table
+        return table[query_offset : query_offset + qlen, :klen]
+
+    def compute_bias(self, qlen, klen, query_offset=0):
         """ Compute binned relative position bias """
-        context_position = torch.arange(qlen, dtype=torch.long)[:, None]
-        memory_position = torch.arange(klen, dtype=torch.long)[None, :]
-        relative_position = memory_position - context_position  # shape (qlen, klen)
-        rp_bucket = self._relative_position_bucket(
-            relative_position,  # shape (qlen, klen)
-            bidirectional=not self.is_decoder,
-            num_buckets=self.relative_attention_num_buckets,
-        )
-        rp_bucket = rp_bucket.to(self.relative_attention_bias.weight.device)
+        rp_bucket = self.relative_position_buckets(qlen, klen, query_offset=query_offset)  # shape (qlen, klen)
         values = self.relative_attention_bias(rp_bucket)  # shape (qlen, klen, num_heads)
         values = values.permute([2, 0, 1]).unsqueeze(0)  # shape (1, num_heads, qlen, klen)
         return values
@@ -333,25 +355,37 @@ class T5Attention(nn.Module):
                     k, v = cache[self.layer_id]
             cache[self.layer_id] = (k, v)
 
-        # q = q / math.sqrt(dim_per_head)                                     # No scaling in T5
-        scores = torch.einsum("bnqd,bnkd->bnqk", q, k)  # (bs, n_heads, qlen, klen)
-
         if position_bias is None:
             if not self.has_relative_attention_bias:
                 raise ValueError("No position_bias provided and no weights to compute position_bias")
-            position_bias = self.compute_bias(qlen, klen)
+            # With a cache, the queries are the positions following the `slen` cached ones
+            position_bias = self.compute_bias(qlen, klen, query_offset=cache["slen"] if cache is not None else 0)
             if mask is not None:
                 position_bias = position_bias + mask  # (bs, n_heads, qlen, klen)
 
-        scores += position_bias
-        weights = F.softmax(scores.float(), dim=-1).type_as(scores)  # (bs, n_heads, qlen, klen)
-        weights = F.dropout(weights, p=self.dropout, training=self.training)  # (bs, n_heads, qlen, klen)
+        # q = q / math.sqrt(dim_per_head)                                     # No scaling in T5
+        if self.attention_chunk_size is not None and not self.output_attentions:
+            # Memory-efficient attention: the attention weights are never materialized
+            context = chunked_attention(
+                q,
+                k,
+                v,
+                attention_biases=(position_bias,),
+                head_mask=head_mask,
+                dropout=lambda weights: F.dropout(weights, p=self.dropout, training=self.training),
+                chunk_size=self.attention_chunk_size,
+            )  # (bs, n_heads, qlen, dim_per_head)
+        else:
+            scores = torch.einsum("bnqd,bnkd->bnqk", q, k)  # (bs, n_heads, qlen, klen)
+            scores += position_bias
+            weights = F.softmax(scores.float(), dim=-1).type_as(scores)  # (bs, n_heads, qlen, klen)
+            weights = F.dropout(weights, p=self.dropout, training=self.training)  # (bs, n_heads, qlen, klen)
 
-        # Mask heads if we want to
-        if head_mask is not None:
-            weights = weights * head_mask
+            # Mask heads if we want to
+            if head_mask is not None:
+                weights = weights * head_mask
 
-        context = torch.matmul(weights, v)  # (bs, n_heads, qlen, dim_per_head)
+            context = torch.matmul(weights, v)  # (bs, n_heads, qlen, dim_per_head)
         context = unshape(context)  # (bs, qlen, dim)
 
         context = self.o(context)
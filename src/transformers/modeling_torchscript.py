@@ -0,0 +1,281 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+""" TorchScript export of PyTorch models and runtime for the exported (traced) modules. """
+
+
+import itertools
+import json
+import logging
+import os
+import shutil
+
+import torch
+from torch import nn
+
+from .configuration_auto import AutoConfig
+from .file_utils import CONFIG_NAME, TORCHSCRIPT_CONFIG_NAME
+
+
+logger = logging.getLogger(__name__)
+
+
+def torchscript_file_name(bucket):
+    """ Name of the file holding the module traced for `bucket` (a tuple with one size per dynamic axis). """
+    if not bucket:
+        return "traced_model.pt"
+    return "traced_model-{}.pt".format("x".join(str(size) for size in bucket))
+
+
+def _flatten(outputs):
+    """ List of the tensors of a (nested) tuple of model outputs. """
+    if isinstance(outputs, (tuple, list)):
+        return [tensor for output in outputs for tensor in _flatten(output)]
+    return [outputs]
+
+
+def _unflatten(outputs, tensors):
+    """ Inverse of `_flatten`: rebuilds the nesting of `outputs` with the tensors of the iterator `tensors`. """
+    if isinstance(outputs, (tuple, list)):
+        return tuple(_unflatten(output, tensors) for output in outputs)
+    return next(tensors)
+
+
+def _resize(tensor, sizes):
+    """ Repeats or crops `tensor` along the axes of `sizes` (a dict axis -> size), e.g. to build example inputs. """
+    for axis, size in sizes.items():
+        repeats = [1] * tensor.dim()
+        repeats[axis] = -(-size // tensor.size(axis))
+        tensor = tensor.repeat(*repeats).narrow(axis, 0, size)
+    return tensor
+
+
+def _pad(tensor, sizes, value):
+    """ Pads `tensor` with `value` at the end of the axes of `sizes` (a dict axis -> size). """
+    for axis, size in sizes.items():
+        if tensor.size(axis) < size:
+            padding_shape = list(tensor.shape)
+            padding_shape[axis] = size - tensor.size(axis)
+            tensor = torch.cat([tensor, tensor.new_full(padding_shape, value)], dim=axis)
+    return tensor
+
+
+class _TracingWrapper(nn.Module):
+    """ Calls a model with positional inputs (the only ones `torch.jit.trace` supports) given as keyword arguments. """
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs)))
+
+
+def export_torchscript(model, path, example_inputs, dynamic_axes=None):
+    """ Traces `model` and saves it, with its configuration, in the directory `path`.
+        See :func:`~transformers.PreTrainedModel.export_torchscript`.
+    """
+    if not isinstance(example_inputs, dict) or not example_inputs:
+        raise ValueError("example_inputs should be a dict mapping the names of the model inputs to tensors")
+    input_names = list(example_inputs.keys())
+    dynamic_axes = {int(axis): sorted(set(sizes)) for axis, sizes in (dynamic_axes or {}).items()}
+    axes = sorted(dynamic_axes)
+    buckets = list(itertools.product(*[dynamic_axes[axis] for axis in axes]))
+    os.makedirs(path, exist_ok=True)
+
+    # Padded positions are masked, so the unpadded execution path (whose shapes depend on the values of the
+    # attention mask) is not needed and can't be traced
+    unpad_inputs, model.config.unpad_inputs = model.config.unpad_inputs, False
+    was_training = model.training
+    model.eval()
+    wrapper = _TracingWrapper(model, input_names)
+
+    def output_shapes(sizes):
+        inputs = tuple(_resize(example_inputs[name], dict(zip(axes, sizes))) for name in input_names)
+        return inputs, [list(tensor.shape) for tensor in _flatten(wrapper(*inputs))]
+
+    # Input sizes along the dynamic axes and output shapes of each trace and probe
+    samples = []
+    try:
+        with torch.no_grad():
+            for bucket in buckets:
+                inputs, shapes = output_shapes(bucket)
+                traced_model = torch.jit.trace(wrapper, inputs, check_trace=False)
+                torch.jit.save(traced_model, os.path.join(path, torchscript_file_name(bucket)))
+                samples.append((bucket, shapes))
+                logger.info("Traced model for bucket {} saved in {}".format(bucket, path))
+
+            # Probes changing the size of a single dynamic axis (to a smaller size if possible, the smallest bucket
+            # size being at most the maximum size of the axis), to tell apart the output axes following each input
+            # axis from the ones which have the same size by chance (e.g. the hidden size or the number of labels)
+            for j in range(len(axes)):
+                probe = list(buckets[0])
+                probe[j] = probe[j] - 1 if probe[j] > 1 else probe[j] + 1
+                samples.append((tuple(probe), output_shapes(probe)[1]))
+    finally:
+        model.config.unpad_inputs = unpad_inputs
+        model.train(was_training)
+
+    # The axes of the outputs which follow a dynamic axis of the inputs are the ones to crop back to the unpadded
+    # sizes: they are the ones whose size is the size of this input axis in every trace and probe
+    output_axes = []
+    for i, shape in enumerate(samples[0][1]):
+        output_axes.append(
+            [
+                [output_axis, axis]
+                for output_axis in range(len(shape))
+                for j, axis in enumerate(axes)
+                if all(shapes[i][output_axis] == sizes[j] for sizes, shapes in samples)
+            ]
+        )
+
+    model.config.save_pretrained(path)
+    pad_values = {name: 0 for name in input_names}
+    if "input_ids" in pad_values and model.config.pad_token_id is not None:
+        pad_values["input_ids"] = model.config.pad_token_id
+    torchscript_config = {
+        "input_names": input_names,
+        "dynamic_axes": dynamic_axes,
+        "pad_values": pad_values,
+        "output_axes": output_axes,
+    }
+    with open(os.path.join(path, TORCHSCRIPT_CONFIG_NAME), "w", encoding="utf-8") as writer:
+        writer.write(json.dumps(torchscript_config, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+class TorchScriptModel(object):
+    r""" Runs the TorchScript modules exported with :func:`~transformers.PreTrainedModel.export_torchscript`.
+
+        It is called like the model it was traced from (with the inputs given as ``example_inputs`` at export) and
+        returns the same tuple of outputs, so that it can be used in place of the model in the pipelines.
+
+        The inputs are padded to the smallest bucket size of each dynamic axis (a batch larger than the largest
+        batch-size bucket is split in several calls) and the outputs are cropped back to the size of the inputs. The
+        traced module of each bucket is loaded on first use and then kept in memory.
+
+        Examples::
+
+            model = BertForSequenceClassification.from_pretrained('./my_model/')
+            inputs = tokenizer.encode_plus("Hello, my dog is cute", return_tensors="pt")
+            model.export_torchscript('./my_traced_model/', dict(inputs), dynamic_axes={0: [1, 8], 1: [64, 128, 512]})
+
+            traced_model = TorchScriptModel.from_pretrained('./my_traced_model/')
+            logits = traced_model(**inputs)[0]
+            nlp = pipeline('sentiment-analysis', model=traced_model, tokenizer=tokenizer)
+    """
+
+    def __init__(self, path, config, input_names, dynamic_axes, pad_values, output_axes, map_location=None):
+        self.path = path
+        self.config = config
+        self.input_names = input_names
+        self.dynamic_axes = {int(axis): sizes for axis, sizes in dynamic_axes.items()}
+        self.pad_values = pad_values
+        self.output_axes = output_axes
+        self.device = torch.device(map_location) if map_location is not None else torch.device("cpu")
+        self._traced_modules = {}
+
+    @classmethod
+    def from_pretrained(cls, path, map_location=None):
+        """ Loads the TorchScript export saved in the directory `path`.
+
+            Arguments:
+
+                path: directory given to :func:`~transformers.PreTrainedModel.export_torchscript`.
+
+                map_location: (`optional`) string or ``torch.device``, default None:
+                    Device on which the traced modules are loaded (the CPU by default).
+        """
+        torchscript_config_file = os.path.join(path, TORCHSCRIPT_CONFIG_NAME)
+        if not os.path.isfile(torchscript_config_file):
+            raise EnvironmentError("No TorchScript export found in directory {}".format(path))
+        with open(torchscript_config_file, "r", encoding="utf-8") as reader:
+            torchscript_config = json.load(reader)
+        config = AutoConfig.from_pretrained(path)
+        return cls(path, config, map_location=map_location, **torchscript_config)
+
+    def save_pretrained(self, save_directory):
+        """ Copies the TorchScript export to `save_directory`. """
+        os.makedirs(save_directory, exist_ok=True)
+        buckets = itertools.product(*[self.dynamic_axes[axis] for axis in sorted(self.dynamic_axes)])
+        for file_name in [CONFIG_NAME, TORCHSCRIPT_CONFIG_NAME] + [torchscript_file_name(b) for b in buckets]:
+            shutil.copyfile(os.path.join(self.path, file_name), os.path.join(save_directory, file_name))
+
+    def to(self, device):
+        self.device = torch.device(device)
+        for bucket, traced_module in self._traced_modules.items():
+            self._traced_modules[bucket] = traced_module.to(self.device)
+        return self
+
+    def eval(self):
+        return self
+
+    def traced_module(self, bucket):
+        """ The traced module of `bucket` (a tuple with one size per dynamic axis), loaded on first use. """
+        if bucket not in self._traced_modules:
+            file_name = os.path.join(self.path, torchscript_file_name(bucket))
+            logger.info("Loading traced model {}".format(file_name))
+            self._traced_modules[bucket] = torch.jit.load(file_name, map_location=self.device)
+        return self._traced_modules[bucket]
+
+    def bucket(self, sizes):
+        """ The bucket of inputs with the sizes `sizes` (a dict axis -> size) along the dynamic axes. """
+        bucket = []
+        for axis in sorted(self.dynamic_axes):
+            bucket_sizes = [size for size in self.dynamic_axes[axis] if size >= sizes[axis]]
+            if not bucket_sizes:
+                raise ValueError(
+                    "Size {} of axis {} of the inputs is larger than the largest exported size {}".format(
+                        sizes[axis], axis, self.dynamic_axes[axis][-1]
+                    )
+                )
+            bucket.append(bucket_sizes[0])
+        return tuple(bucket)
+
+    def __call__(self, **inputs):
+        if set(inputs) != set(self.input_names):
+            raise ValueError(
+                "The traced model takes the inputs {}, got {}".format(self.input_names, sorted(inputs.keys()))
+            )
+        tensors = [inputs[name] for name in self.input_names]
+        sizes = {axis: tensors[0].size(axis) for axis in self.dynamic_axes}
+
+        max_batch_size = self.dynamic_axes[0][-1] if 0 in self.dynamic_axes else None
+        if max_batch_size is not None and sizes[0] > max_batch_size:
+            chunks = [
+                self(**{name: tensor[i : i + max_batch_size] for name, tensor in inputs.items()})
+                for i in range(0, sizes[0], max_batch_size)
+            ]
+            concatenated = []
+            for i, chunk_tensors in enumerate(zip(*[_flatten(chunk) for chunk in chunks])):
+                batch_axes = [output_axis for output_axis, axis in self.output_axes[i] if axis == 0]
+                if not batch_axes:
+                    raise ValueError("Output {} of the traced model can't be split along the batch axis".format(i))
+                concatenated.append(torch.cat(chunk_tensors, dim=batch_axes[0]))
+            return _unflatten(chunks[0], iter(concatenated))
+
+        bucket = self.bucket(sizes)
+        bucket_sizes = dict(zip(sorted(self.dynamic_axes), bucket))
+        padded_tensors = [
+            _pad(tensor, bucket_sizes, self.pad_values[name]) for name, tensor in zip(self.input_names, tensors)
+        ]
+        outputs = self.traced_module(bucket)(*padded_tensors)
+
+        cropped = []
+        for i, tensor in enumerate(_flatten(outputs)):
+            for output_axis, axis in self.output_axes[i]:
+                tensor = tensor.narrow(output_axis, 0, sizes[axis])
+            cropped.append(tensor)
+        return _unflatten(outputs, iter(cropped))
@@ -277,11 +277,12 @@ class RelPartialLearnableMultiHeadAttn(nn.Module):
 
         return x
 
-    def forward(self, w, r, attn_mask=None, mems=None, head_mask=None):
+    def forward(self, w, r, attn_mask=None, mems=None, head_mask=None, mems_and_inputs=None):
         qlen, rlen, bsz = w.size(0), r.size(0), w.size(1)
 
-        if mems is not None:
-            cat = torch.cat([mems, w], 0)
+        if mems is not None or mems_and_inputs is not None:
+            # `mems_and_inputs` is the memory already followed by `w` (see `TransfoXLMems`)
+            cat = torch.cat([mems, w], 0) if mems_and_inputs is None else mems_and_inputs
             if self.pre_lnorm:
                 w_heads = self.qkv_net(self.layer_norm(cat))
             else:
@@ -377,9 +378,11 @@ class RelPartialLearnableDecoderLayer(nn.Module):
             d_model, d_inner, dropout, pre_lnorm=kwargs.get("pre_lnorm"), layer_norm_epsilon=layer_norm_epsilon
         )
 
-    def forward(self, dec_inp, r, dec_attn_mask=None, mems=None, head_mask=None):
+    def forward(self, dec_inp, r, dec_attn_mask=None, mems=None, head_mask=None, mems_and_inputs=None):
 
-        attn_outputs = self.dec_attn(dec_inp, r, attn_mask=dec_attn_mask, mems=mems, head_mask=head_mask)
+        attn_outputs = self.dec_attn(
+            dec_inp, r, attn_mask=dec_attn_mask, mems=mems, head_mask=head_mask, mems_and_inputs=mems_and_inputs
+        )
         ff_output = self.pos_ff(attn_outputs[0])
 
         outputs = [ff_output] + attn_outputs[1:]
@@ -447,6 +450,91 @@ class AdaptiveEmbedding(nn.Module):
         return embed
 
 
+class TransfoXLMems(object):
+    r""" Recurrence memory of :class:`~transformers.TransfoXLModel` kept in buffers allocated once, in place of the
+        list of memory tensors allocated again at each segment.
+
+        The buffer of each layer holds the memory followed by the current segment: the hidden states of the segment
+        are written in place right after the memory, so that the attention reads the memory and the segment as a
+        single view instead of concatenating them, and the memory is then advanced by moving its start. The memory is
+        moved back to the beginning of the buffers only when they are full, i.e. once every
+        ``(capacity - mem_len) / tgt_len`` segments.
+
+        The `capacity` of the buffers (in positions) defaults to ``mem_len + segments_per_move * tgt_len``, sized
+        when the first segment is reserved: the buffers only hold the memory until then.
+
+        It behaves like the list of the memories of each layer (of shape ``(mlen, bsz, d_model)``) and is updated in
+        place by the model, which returns it as its new ``mems``. The hidden states are detached when written: it is
+        meant for evaluation and generation.
+
+        Example::
+
+            mems = model.init_mems(batch_size, use_buffers=True)
+            with torch.no_grad():
+                for data, target, seq_len in corpus.get_iterator("test", batch_size, tgt_len):
+                    loss, _, mems = model(data, labels=target, mems=mems)
+    """
+
+    # Number of segments written between two moves of the memory, with the default capacity
+    segments_per_move = 4
+
+    def __init__(self, n_layer, mem_len, bsz, d_model, capacity=None, dtype=torch.float32, device=None):
+        self.capacity = max(capacity, mem_len) if capacity is not None else None
+        size = self.capacity if self.capacity is not None else mem_len
+        self.buffers = [torch.zeros(size, bsz, d_model, dtype=dtype, device=device) for _ in range(n_layer)]
+        # Position and length of the memory in the buffers, which starts with `mem_len` zeros like `init_mems`
+        self.start = 0
+        self.length = mem_len
+
+    def __len__(self):
+        return len(self.buffers)
+
+    def __getitem__(self, layer):
+        return self.buffers[layer][self.start : self.start + self.length]
+
+    def __iter__(self):
+        return (self[layer] for layer in range(len(self)))
+
+    @property
+    def batch_size(self):
+        return self.buffers[0].size(1)
+
+    def reserve(self, qlen):
+        """ Makes room for a segment of `qlen` positions after the memory, by moving the memory back to the beginning
+            of the buffers (or by growing them if they are too small). """
+        if self.capacity is None:
+            self.capacity = self.length + self.segments_per_move * qlen
+        if self.start + self.length + qlen <= self.buffers[0].size(0):
+            return
+        if self.length + qlen > self.capacity:
+            self.capacity = 2 * (self.length + qlen)
+        if self.buffers[0].size(0) < self.capacity:
+            for i, buffer in enumerate(self.buffers):
+                new_buffer = buffer.new_zeros(self.capacity, *buffer.shape[1:])
+                new_buffer[: self.length] = buffer[self.start : self.start + self.length]
+                self.buffers[i] = new_buffer
+        else:
+            for buffer in self.buffers:
+                buffer[: self.length] = buffer[self.start : self.start + self.length].clone()
+        self.start = 0
+
+    def write(self, layer, hidden):
+        """ Writes the (qlen, bsz, d_model) `hidden` states of `layer` right after its memory, and returns the view of
+            the memory followed by them. `reserve` must have been called for the segment. """
+        end = self.start + self.length
+        buffer = self.buffers[layer]
+        buffer[end : end + hidden.size(0)] = hidden.detach()
+        return buffer[self.start : end + hidden.size(0)]
+
+    def advance(self, qlen, mem_len, ext_len=0):
+        """ Makes the memory the last `mem_len` positions of the memory and the segment of `qlen` positions just
+            written, without the last `ext_len` positions (used as extended context), like `_update_mems`. """
+        end_idx = self.length + max(0, qlen - ext_len)
+        beg_idx = max(0, end_idx - mem_len)
+        self.start += beg_idx
+        self.length = end_idx - beg_idx
+
+
 class TransfoXLPreTrainedModel(PreTrainedModel):
     """ An abstract class to handle weights initialization and
         a simple interface for downloading and loading pretrained models.
@@ -633,10 +721,23 @@ class TransfoXLModel(TransfoXLPreTrainedModel):
         logger.info("Head pruning is not implemented for Transformer-XL model")
         pass
 
-    def init_mems(self, bsz):
+    def init_mems(self, bsz, use_buffers=False, capacity=None):
+        """ Initial (zero) memory of a batch of `bsz` sequences: a list with the memory of each layer, or with
+            `use_buffers` a :class:`~transformers.TransfoXLMems` updated in place, with buffers of `capacity`
+            positions (see :class:`~transformers.TransfoXLMems`). """
         if self.mem_len > 0:
-            mems = []
             param = next(self.parameters())
+            if use_buffers:
+                return TransfoXLMems(
+                    self.n_layer,
+                    self.mem_len,
+                    bsz,
+                    self.config.d_model,
+                    capacity=capacity,
+                    dtype=param.dtype,
+                    device=param.device,
+                )
+            mems = []
             for i in range(self.n_layer):
                 empty = torch.zeros(self.mem_len, bsz, self.config.d_model, dtype=param.dtype, device=param.device)
                 mems.append(empty)
@@ -719,6 +820,10 @@ class TransfoXLModel(TransfoXLPreTrainedModel):
 
         if mems is None:
             mems = self.init_mems(bsz)
+        elif isinstance(mems, TransfoXLMems):
+            if mems.batch_size != bsz:
+                raise ValueError("The memory buffers are for a batch size of {}, got {}".format(mems.batch_size, bsz))
+            mems.reserve(qlen)
 
         # Prepare head mask if needed
         # 1.0 in head_mask indicate we keep the head
@@ -771,8 +876,19 @@ class TransfoXLModel(TransfoXLPreTrainedModel):
             for i, layer in enumerate(self.layers):
                 hids.append(core_out)
                 mems_i = None if mems is None else mems[i]
+                mems_and_inputs = None
+                if isinstance(mems, TransfoXLMems):
+                    mems_and_inputs = mems.write(i, core_out)
+                    if torch.is_grad_enabled():
+                        # The buffers are detached: concatenate the memory with the inputs to backpropagate to them
+                        mems_and_inputs = None
                 layer_outputs = layer(
-                    core_out, pos_emb, dec_attn_mask=dec_attn_mask, mems=mems_i, head_mask=head_mask[i]
+                    core_out,
+                    pos_emb,
+                    dec_attn_mask=dec_attn_mask,
+                    mems=mems_i,
+                    head_mask=head_mask[i],
+                    mems_and_inputs=mems_and_inputs,
                 )
                 core_out = layer_outputs[0]
                 if self.output_attentions:
@@ -782,7 +898,11 @@ class TransfoXLModel(TransfoXLPreTrainedModel):
 
         core_out = self.drop(core_out)
 
-        new_mems = self._update_mems(hids, mems, mlen, qlen)
+        if isinstance(mems, TransfoXLMems):
+            mems.advance(qlen, self.mem_len, self.ext_len)
+            new_mems = mems
+        else:
+            new_mems = self._update_mems(hids, mems, mlen, qlen)
 
         # We transpose back here to shape [bsz, len, hidden_dim]
         outputs = [core_out.transpose(0, 1).contiguous(), new_mems]
@@ -844,8 +964,8 @@ class TransfoXLLMHeadModel(TransfoXLPreTrainedModel):
     def reset_length(self, tgt_len, ext_len, mem_len):
         self.transformer.reset_length(tgt_len, ext_len, mem_len)
 
-    def init_mems(self, bsz):
-        return self.transformer.init_mems(bsz)
+    def init_mems(self, bsz, use_buffers=False, capacity=None):
+        return self.transformer.init_mems(bsz, use_buffers=use_buffers, capacity=capacity)
 
     @add_start_docstrings_to_callable(TRANSFO_XL_INPUTS_DOCSTRING)
     def forward(self, input_ids=None, mems=None, head_mask=None, inputs_embeds=None, labels=None):
@@ -914,6 +1034,28 @@ class TransfoXLLMHeadModel(TransfoXLPreTrainedModel):
 
         return outputs  # (loss), logits or None if labels is not None (speed up adaptive softmax), new_mems, (all hidden states), (all attentions)
 
+    def sample_next_tokens(self, input_ids=None, mems=None, head_mask=None, inputs_embeds=None):
+        r""" Samples the token following each sequence of the batch from the adaptive softmax distribution, without
+        computing the log probabilities of the whole vocabulary: only the head of the adaptive softmax and the tail
+        clusters actually sampled are evaluated (see
+        :func:`~transformers.modeling_transfo_xl_utilities.ProjectedAdaptiveLogSoftmax.sample`).
+
+        Takes the same inputs as :func:`~transformers.TransfoXLLMHeadModel.forward` (without `labels`) and returns
+        the sampled tokens of shape :obj:`(batch_size,)` and the new `mems`, to be given back with the sampled tokens
+        to continue the generation.
+
+    Examples::
+
+        model = TransfoXLLMHeadModel.from_pretrained('transfo-xl-wt103')
+        with torch.no_grad():
+            next_tokens, mems = model.sample_next_tokens(input_ids)
+            next_tokens, mems = model.sample_next_tokens(next_tokens.unsqueeze(-1), mems=mems)
+
+        """
+        transformer_outputs = self.transformer(input_ids, mems=mems, head_mask=head_mask, inputs_embeds=inputs_embeds)
+        last_hidden = transformer_outputs[0][:, -1]
+        return self.crit.sample(last_hidden), transformer_outputs[1]
+
     def get_output_embeddings(self):
         """ Double-check if you are using adaptive softmax.
         """
@@ -68,6 +68,49 @@ class ProjectedAdaptiveLogSoftmax(nn.Module):
                 self.out_layers.append(nn.Linear(d_emb_i, r_idx - l_idx))
 
         self.keep_order = keep_order
+        self._cluster_weights = None
+
+    def train(self, mode=True):
+        # The weights are about to be updated: don't keep them concatenated
+        self._cluster_weights = None
+        return super().train(mode)
+
+    def _cluster_weights_key(self):
+        parameters = [self.cluster_weight, self.cluster_bias]
+        for layer in self.out_layers:
+            parameters.extend([layer.weight, layer.bias])
+        return [(parameter.data_ptr(), parameter._version) for parameter in parameters]
+
+    def cluster_weights(self):
+        """ Returns the lists of weights and biases of the head (shortlist followed by the cluster weights) and of each
+            tail cluster.
+
+            Outside of autograd, they are concatenated once and kept until a parameter is replaced or modified in place
+            (e.g. by ``to()``, ``load_state_dict`` or an optimizer step) or the module is put in training mode.
+        """
+        cache = not torch.is_grad_enabled()
+        if cache and self._cluster_weights is not None and self._cluster_weights[2] == self._cluster_weights_key():
+            return self._cluster_weights[:2]
+
+        weights, biases = [], []
+        for i in range(len(self.cutoffs)):
+            if self.div_val == 1:
+                l_idx, r_idx = self.cutoff_ends[i], self.cutoff_ends[i + 1]
+                weight_i = self.out_layers[0].weight[l_idx:r_idx]
+                bias_i = self.out_layers[0].bias[l_idx:r_idx]
+            else:
+                weight_i = self.out_layers[i].weight
+                bias_i = self.out_layers[i].bias
+
+            if i == 0:
+                weight_i = torch.cat([weight_i, self.cluster_weight], dim=0)
+                bias_i = torch.cat([bias_i, self.cluster_bias], dim=0)
+
+            weights.append(weight_i)
+            biases.append(bias_i)
+
+        self._cluster_weights = (weights, biases, self._cluster_weights_key()) if cache else None
+        return weights, biases
 
     def _compute_logit(self, hidden, weight, bias, proj):
         if proj is None:
@@ -110,23 +153,7 @@ class ProjectedAdaptiveLogSoftmax(nn.Module):
             else:
                 out = F.log_softmax(logit, dim=-1)
         else:
-            # construct weights and biases
-            weights, biases = [], []
-            for i in range(len(self.cutoffs)):
-                if self.div_val == 1:
-                    l_idx, r_idx = self.cutoff_ends[i], self.cutoff_ends[i + 1]
-                    weight_i = self.out_layers[0].weight[l_idx:r_idx]
-                    bias_i = self.out_layers[0].bias[l_idx:r_idx]
-                else:
-                    weight_i = self.out_layers[i].weight
-                    bias_i = self.out_layers[i].bias
-
-                if i == 0:
-                    weight_i = torch.cat([weight_i, self.cluster_weight], dim=0)
-                    bias_i = torch.cat([bias_i, self.cluster_bias], dim=0)
-
-                weights.append(weight_i)
-                biases.append(bias_i)
+            weights, biases = self.cluster_weights()
 
             head_weight, head_bias, head_proj = weights[0], biases[0], self.out_projs[0]
 
@@ -184,6 +211,24 @@ class ProjectedAdaptiveLogSoftmax(nn.Module):
 
         return out
 
+    def head_log_prob(self, hidden):
+        """ Log probabilities of the shortlist tokens followed by the ones of the tail clusters, of shape
+            [len*bsz x (shortlist_size + n_clusters)]. Only the head of the adaptive softmax is evaluated.
+        """
+        weights, biases = self.cluster_weights()
+        head_logit = self._compute_logit(hidden, weights[0], biases[0], self.out_projs[0])
+        return F.log_softmax(head_logit, dim=1)
+
+    def tail_log_prob(self, hidden, cluster, head_logprob):
+        """ Log probabilities of the tokens of the tail cluster `cluster` (from 1 to n_clusters), of shape
+            [len*bsz x cluster size]: the log probability of the cluster in `head_logprob` plus the log probabilities
+            of the tokens within the cluster.
+        """
+        weights, biases = self.cluster_weights()
+        tail_logit = self._compute_logit(hidden, weights[cluster], biases[cluster], self.out_projs[cluster])
+        cluster_prob_idx = self.cutoffs[0] + cluster - 1  # No probability for the head cluster
+        return head_logprob[:, cluster_prob_idx, None] + F.log_softmax(tail_logit, dim=1)
+
     def log_prob(self, hidden):
         r""" Computes log probabilities for all :math:`n\_classes`
         From: https://github.com/pytorch/pytorch/blob/master/torch/nn/modules/adaptive.py
@@ -200,44 +245,33 @@ class ProjectedAdaptiveLogSoftmax(nn.Module):
         if self.n_clusters == 0:
             logit = self._compute_logit(hidden, self.out_layers[0].weight, self.out_layers[0].bias, self.out_projs[0])
             return F.log_softmax(logit, dim=-1)
-        else:
-            # construct weights and biases
-            weights, biases = [], []
-            for i in range(len(self.cutoffs)):
-                if self.div_val == 1:
-                    l_idx, r_idx = self.cutoff_ends[i], self.cutoff_ends[i + 1]
-                    weight_i = self.out_layers[0].weight[l_idx:r_idx]
-                    bias_i = self.out_layers[0].bias[l_idx:r_idx]
-                else:
-                    weight_i = self.out_layers[i].weight
-                    bias_i = self.out_layers[i].bias
-
-                if i == 0:
-                    weight_i = torch.cat([weight_i, self.cluster_weight], dim=0)
-                    bias_i = torch.cat([bias_i, self.cluster_bias], dim=0)
-
-                weights.append(weight_i)
-                biases.append(bias_i)
-
-            head_weight, head_bias, head_proj = weights[0], biases[0], self.out_projs[0]
-            head_logit = self._compute_logit(hidden, head_weight, head_bias, head_proj)
-
-            out = hidden.new_empty((head_logit.size(0), self.n_token))
-            head_logprob = F.log_softmax(head_logit, dim=1)
-
-            cutoff_values = [0] + self.cutoffs
-            for i in range(len(cutoff_values) - 1):
-                start_idx, stop_idx = cutoff_values[i], cutoff_values[i + 1]
-
-                if i == 0:
-                    out[:, : self.cutoffs[0]] = head_logprob[:, : self.cutoffs[0]]
-                else:
-                    weight_i, bias_i, proj_i = weights[i], biases[i], self.out_projs[i]
 
-                    tail_logit_i = self._compute_logit(hidden, weight_i, bias_i, proj_i)
-                    tail_logprob_i = F.log_softmax(tail_logit_i, dim=1)
+        head_logprob = self.head_log_prob(hidden)
+        out = hidden.new_empty((head_logprob.size(0), self.n_token))
+        out[:, : self.cutoffs[0]] = head_logprob[:, : self.cutoffs[0]]
+        for i in range(1, len(self.cutoffs)):
+            out[:, self.cutoff_ends[i] : self.cutoff_ends[i + 1]] = self.tail_log_prob(hidden, i, head_logprob)
+        return out
 
-                    logprob_i = head_logprob[:, -i] + tail_logprob_i
-                    out[:, start_idx, stop_idx] = logprob_i
+    def sample(self, hidden):
+        """ Samples a token for each row of `hidden` [len*bsz x d_proj] from the adaptive softmax distribution.
 
-            return out
+            The head is sampled first, and the tail clusters are only evaluated for the rows which sampled them (and
+            not at all if no row did), instead of computing the log probabilities of the whole vocabulary.
+        """
+        if self.n_clusters == 0:
+            return torch.multinomial(self.log_prob(hidden).exp(), 1).squeeze(1)
+
+        weights, biases = self.cluster_weights()
+        head_logprob = self.head_log_prob(hidden)
+        tokens = torch.multinomial(head_logprob.exp(), 1).squeeze(1)
+        for i in range(1, len(self.cutoffs)):
+            indices_i = (tokens == self.cutoffs[0] + i - 1).nonzero().squeeze(1)
+            if indices_i.numel() == 0:
+                continue
+            tail_logit_i = self._compute_logit(
+                hidden.index_select(0, indices_i), weights[i], biases[i], self.out_projs[i]
+            )
+            tail_tokens_i = torch.multinomial(F.softmax(tail_logit_i, dim=1), 1).squeeze(1)
+            tokens[indices_i] = tail_tokens_i + self.cutoff_ends[i]
+        return tokens
@@ -15,10 +15,16 @@
 # limitations under the License.
 """PyTorch BERT model."""
 
+import json
 import logging
 import os
+import re
+import struct
 import typing
+from collections import OrderedDict
+from contextlib import contextmanager
 
+import numpy as np
 import torch
 from torch import nn
 from torch.nn import CrossEntropyLoss
@@ -28,10 +34,13 @@ from .activations import get_activation
 from .configuration_utils import PretrainedConfig
 from .file_utils import (
     DUMMY_INPUTS,
+    MMAP_WEIGHTS_NAME,
     TF2_WEIGHTS_NAME,
     TF_WEIGHTS_NAME,
+    WEIGHTS_INDEX_NAME,
     WEIGHTS_NAME,
     cached_path,
+    cached_paths,
     hf_bucket_url,
     is_remote_url,
 )
@@ -39,6 +48,27 @@ from .file_utils import (
 
 logger = logging.getLogger(__name__)
 
+# Set to False inside `no_init_weights` to skip the random initialization of weights
+_init_weights_enabled = True
+
+
+# Dynamic quantization configurations (in `torch.quantization`) of the types supported by `PreTrainedModel.quantize`
+QUANTIZATION_DTYPES = {"int8": "default_dynamic_qconfig", "float16": "float16_dynamic_qconfig"}
+
+
+@contextmanager
+def no_init_weights():
+    """ Context manager under which models are instantiated without running their weight initialization.
+        Used by :func:`~transformers.PreTrainedModel.from_pretrained` when the weights are overwritten by a checkpoint anyway.
+    """
+    global _init_weights_enabled
+    old_init_weights_enabled = _init_weights_enabled
+    _init_weights_enabled = False
+    try:
+        yield
+    finally:
+        _init_weights_enabled = old_init_weights_enabled
+
 
 try:
     from torch.nn import Identity
@@ -296,7 +326,8 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
     def init_weights(self):
         """ Initialize and prunes weights if needed. """
         # Initialize weights
-        self.apply(self._init_weights)
+        if _init_weights_enabled:
+            self.apply(self._init_weights)
 
         # Prune heads if needed
         if self.config.pruned_heads:
@@ -320,9 +351,110 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
 
         self.base_model._prune_heads(heads_to_prune)
 
-    def save_pretrained(self, save_directory):
+    def quantize(self, dtype="int8", modules=None):
+        """ Applies post-training dynamic quantization to the model, for inference on CPU: the weights of the
+            ``nn.Linear`` and :class:`~transformers.modeling_utils.Conv1D` layers are quantized once, their activations
+            are quantized on the fly. Embeddings, layer norms and the output embeddings (tied to the input embeddings)
+            are kept in float32.
+
+            The quantization is stored in the configuration (``config.quantization``) so that the quantized model can
+            be saved with :func:`~transformers.PreTrainedModel.save_pretrained` and re-loaded with
+            :func:`~transformers.PreTrainedModel.from_pretrained`.
+
+            Arguments:
+
+                dtype: (`optional`) string, default "int8":
+                    Type of the quantized weights, one of ``QUANTIZATION_DTYPES`` ("int8" or "float16").
+
+                modules: (`optional`) list of string, default None:
+                    Names of the sub-modules to quantize (e.g. ``["bert.encoder"]``). Defaults to the whole model.
+
+            Examples::
+
+                model = BertForSequenceClassification.from_pretrained('./my_model/')
+                model.quantize()
+                model.save_pretrained('./my_quantized_model/')
+                model = BertForSequenceClassification.from_pretrained('./my_quantized_model/')  # still quantized
+        """
+        if dtype not in QUANTIZATION_DTYPES:
+            raise ValueError(
+                "Unsupported quantization dtype {}, should be one of {}".format(dtype, list(QUANTIZATION_DTYPES))
+            )
+        if self.config.quantization is not None:
+            raise ValueError("The model is already quantized ({})".format(self.config.quantization))
+
+        named_modules = dict(self.named_modules())
+        for name in modules or []:
+            if name not in named_modules:
+                raise ValueError("Can't quantize {}: no such module in {}".format(name, self.__class__.__name__))
+
+        output_embeddings = self.get_output_embeddings()
+        qconfig_spec = {}
+        for name, module in named_modules.items():
+            if not isinstance(module, (nn.Linear, Conv1D)) or module is output_embeddings:
+                continue
+            if modules is not None and not any(name == prefix or name.startswith(prefix + ".") for prefix in modules):
+                continue
+            if isinstance(module, Conv1D):
+                # Conv1D is a transposed linear layer: quantize it as a nn.Linear
+                parent_name, _, child_name = name.rpartition(".")
+                setattr(named_modules[parent_name], child_name, conv1d_to_linear(module))
+            qconfig_spec[name] = getattr(torch.quantization, QUANTIZATION_DTYPES[dtype])
+
+        torch.quantization.quantize_dynamic(self, qconfig_spec, inplace=True)
+        self.config.quantization = {"dtype": dtype, "modules": modules}
+        return self
+
+    def export_torchscript(self, path, example_inputs, dynamic_axes=None):
+        """ Exports the model to TorchScript, for inference without the Python overhead of the eager model.
+
+            The model is traced (in evaluation mode) once per bucket, i.e. per combination of the sizes given in
+            `dynamic_axes`, and the traced modules are saved with the configuration in the directory `path`. The export
+            is loaded with :func:`~transformers.TorchScriptModel.from_pretrained`, which pads the inputs to the
+            smallest bucket fitting them and crops the outputs back.
+
+            Arguments:
+
+                path: directory in which the export is saved (created if needed).
+
+                example_inputs: dict mapping the names of the inputs of the forward pass (e.g. ``input_ids``,
+                    ``attention_mask``) to example tensors. The traced modules take exactly these inputs: the
+                    optional inputs which are not given are left to their default value.
+
+                dynamic_axes: (`optional`) dict mapping an axis of the inputs to the list of sizes traced for it,
+                    default None:
+                    E.g. ``{0: [1, 8, 32], 1: [64, 128, 512]}`` for batch sizes up to 32 and sequences up to 512
+                    tokens. Without `dynamic_axes`, the model is traced once with the shape of `example_inputs`.
+                    Padded positions have to be masked by an ``attention_mask`` input for the sequence axis.
+
+            Examples::
+
+                model = BertForSequenceClassification.from_pretrained('./my_model/')
+                inputs = tokenizer.encode_plus("Hello, my dog is cute", return_tensors="pt")
+                model.export_torchscript('./my_traced_model/', dict(inputs), dynamic_axes={0: [1, 8], 1: [64, 128]})
+                traced_model = TorchScriptModel.from_pretrained('./my_traced_model/')
+        """
+        from .modeling_torchscript import export_torchscript
+
+        return export_torchscript(self, path, example_inputs, dynamic_axes=dynamic_axes)
+
+    def save_pretrained(self, save_directory, mmap_format=False, max_shard_size=None):
         """ Save a model and its configuration file to a directory, so that it
             can be re-loaded using the `:func:`~transformers.PreTrainedModel.from_pretrained`` class method.
+
+            Arguments:
+
+                save_directory: directory to which to save the model and its configuration.
+
+                mmap_format: (`optional`) boolean, default False:
+                    Save the weights in the memory-mappable ``MMAP_WEIGHTS_NAME`` format (see :func:`save_mmap_state_dict`)
+                    instead of a ``torch.save`` pickle. Such checkpoints are loaded without any intermediate copy
+                    with ``from_pretrained(..., low_cpu_mem_usage=True)``.
+
+                max_shard_size: (`optional`) int or string, default None:
+                    If set (e.g. ``"200MB"``), weights larger than this size are split in several shards of at most
+                    this size, listed in a ``WEIGHTS_INDEX_NAME`` index file mapping each weight to its shard.
+                    ``from_pretrained`` then loads the shards one by one.
         """
         assert os.path.isdir(
             save_directory
@@ -331,16 +463,63 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
         # Only save the model itself if we are using distributed training
         model_to_save = self.module if hasattr(self, "module") else self
 
+        if model_to_save.config.quantization is not None and (mmap_format or max_shard_size is not None):
+            raise ValueError("Quantized models can only be saved as a single torch.save checkpoint")
+
         # Attach architecture to the config
         model_to_save.config.architectures = [model_to_save.__class__.__name__]
 
         # Save configuration file
         model_to_save.config.save_pretrained(save_directory)
 
+        # Remove the weights of a previous save so that they can't shadow the new ones in `from_pretrained`
+        weights_name = MMAP_WEIGHTS_NAME if mmap_format else WEIGHTS_NAME
+        for filename in os.listdir(save_directory):
+            is_weights_file = filename in (WEIGHTS_NAME, MMAP_WEIGHTS_NAME, WEIGHTS_INDEX_NAME)
+            if is_weights_file or _SHARD_FILE_PATTERN.match(filename):
+                os.remove(os.path.join(save_directory, filename))
+
+        def save(state_dict, output_model_file):
+            if mmap_format:
+                save_mmap_state_dict(state_dict, output_model_file)
+            else:
+                # torch.save serializes whole storages: copy the weights that are views of a larger tensor so that
+                # each shard only holds its own weights, not the whole storage of the weights it shares it with
+                metadata = getattr(state_dict, "_metadata", None)
+                state_dict = OrderedDict(
+                    (key, value.clone() if _is_view_of_larger_tensor(value) else value)
+                    for key, value in state_dict.items()
+                )
+                if metadata is not None:
+                    state_dict._metadata = metadata
+                torch.save(state_dict, output_model_file)
+
+        state_dict = model_to_save.state_dict()
+        shards = [state_dict] if max_shard_size is None else shard_state_dict(state_dict, max_shard_size)
+
         # If we save using the predefined names, we can load using `from_pretrained`
-        output_model_file = os.path.join(save_directory, WEIGHTS_NAME)
-        torch.save(model_to_save.state_dict(), output_model_file)
-        logger.info("Model weights saved in {}".format(output_model_file))
+        if len(shards) == 1:
+            output_model_file = os.path.join(save_directory, weights_name)
+            save(state_dict, output_model_file)
+            logger.info("Model weights saved in {}".format(output_model_file))
+        else:
+            weight_map = OrderedDict()
+            for shard_index, shard in enumerate(shards):
+                shard_name = shard_file_name(weights_name, shard_index, len(shards))
+                save(shard, os.path.join(save_directory, shard_name))
+                weight_map.update((key, shard_name) for key in shard.keys())
+            index = {
+                "metadata": {"total_size": sum(t.numel() * t.element_size() for t in state_dict.values())},
+                "weight_map": weight_map,
+            }
+            output_index_file = os.path.join(save_directory, WEIGHTS_INDEX_NAME)
+            with open(output_index_file, "w", encoding="utf-8") as writer:
+                writer.write(json.dumps(index, indent=2) + "\n")
+            logger.info(
+                "Model weights saved in {} shards in {}, index saved in {}".format(
+                    len(shards), save_directory, output_index_file
+                )
+            )
 
     @classmethod
     def from_pretrained(cls, pretrained_model_name_or_path, *model_args, **kwargs):
@@ -395,6 +574,12 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
             output_loading_info: (`optional`) boolean:
                 Set to ``True`` to also return a dictionnary containing missing keys, unexpected keys and error messages.
 
+            low_cpu_mem_usage: (`optional`) boolean, default False:
+                Skip the random initialization of the weights found in the checkpoint and assign the loaded tensors
+                directly to the model instead of copying them into freshly initialized parameters.
+                Checkpoints saved with ``save_pretrained(..., mmap_format=True)`` are memory-mapped, so the weights are
+                paged in from disk on first use and peak memory stays close to the model size.
+
             kwargs: (`optional`) Remaining dictionary of keyword arguments:
                 Can be used to update the configuration object (after it being loaded) and initiate the model. (e.g. ``output_attention=True``). Behave differently depending on whether a `config` is provided or automatically loaded:
 
@@ -422,6 +607,7 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
         proxies = kwargs.pop("proxies", None)
         output_loading_info = kwargs.pop("output_loading_info", False)
         local_files_only = kwargs.pop("local_files_only", False)
+        low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", False)
 
         # Load config if we don't provide a configuration
         if not isinstance(config, PretrainedConfig):
@@ -441,6 +627,7 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
             model_kwargs = kwargs
 
         # Load model
+        weight_map = None
         if pretrained_model_name_or_path is not None:
             if pretrained_model_name_or_path in cls.pretrained_model_archive_map:
                 archive_file = cls.pretrained_model_archive_map[pretrained_model_name_or_path]
@@ -451,13 +638,25 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
                 elif from_tf and os.path.isfile(os.path.join(pretrained_model_name_or_path, TF2_WEIGHTS_NAME)):
                     # Load from a TF 2.0 checkpoint
                     archive_file = os.path.join(pretrained_model_name_or_path, TF2_WEIGHTS_NAME)
+                elif os.path.isfile(os.path.join(pretrained_model_name_or_path, MMAP_WEIGHTS_NAME)):
+                    # Load from a memory-mappable PyTorch checkpoint
+                    archive_file = os.path.join(pretrained_model_name_or_path, MMAP_WEIGHTS_NAME)
                 elif os.path.isfile(os.path.join(pretrained_model_name_or_path, WEIGHTS_NAME)):
                     # Load from a PyTorch checkpoint
                     archive_file = os.path.join(pretrained_model_name_or_path, WEIGHTS_NAME)
+                elif os.path.isfile(os.path.join(pretrained_model_name_or_path, WEIGHTS_INDEX_NAME)):
+                    # Load from a sharded PyTorch checkpoint
+                    archive_file = os.path.join(pretrained_model_name_or_path, WEIGHTS_INDEX_NAME)
                 else:
                     raise EnvironmentError(
                         "Error no file named {} found in directory {} or `from_tf` set to False".format(
-                            [WEIGHTS_NAME, TF2_WEIGHTS_NAME, TF_WEIGHTS_NAME + ".index"],
+                            [
+                                WEIGHTS_NAME,
+                                MMAP_WEIGHTS_NAME,
+                                WEIGHTS_INDEX_NAME,
+                                TF2_WEIGHTS_NAME,
+                                TF_WEIGHTS_NAME + ".index",
+                            ],
                             pretrained_model_name_or_path,
                         )
                     )
@@ -475,16 +674,28 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
                     pretrained_model_name_or_path, postfix=(TF2_WEIGHTS_NAME if from_tf else WEIGHTS_NAME),
                 )
 
+            cached_path_kwargs = dict(
+                cache_dir=cache_dir,
+                force_download=force_download,
+                proxies=proxies,
+                resume_download=resume_download,
+                local_files_only=local_files_only,
+            )
+
             # redirect to the cache, if necessary
             try:
-                resolved_archive_file = cached_path(
-                    archive_file,
-                    cache_dir=cache_dir,
-                    force_download=force_download,
-                    proxies=proxies,
-                    resume_download=resume_download,
-                    local_files_only=local_files_only,
-                )
+                resolved_archive_file = cached_path(archive_file, **cached_path_kwargs)
+                if resolved_archive_file is None and not from_tf and archive_file.endswith("/" + WEIGHTS_NAME):
+                    # No single weights file on the server, look for a sharded checkpoint instead
+                    index_file = archive_file[: -len(WEIGHTS_NAME)] + WEIGHTS_INDEX_NAME
+                    resolved_archive_file = cached_path(index_file, **cached_path_kwargs)
+                    if resolved_archive_file is not None:
+                        archive_file = index_file
+                is_sharded = resolved_archive_file is not None and archive_file.endswith(WEIGHTS_INDEX_NAME)
+                if is_sharded and state_dict is None:
+                    shard_files, weight_map = resolve_sharded_checkpoint(
+                        archive_file, resolved_archive_file, **cached_path_kwargs
+                    )
             except EnvironmentError:
                 if pretrained_model_name_or_path in cls.pretrained_model_archive_map:
                     msg = "Couldn't reach server at '{}' to download pretrained weights.".format(archive_file)
@@ -508,12 +719,26 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
         else:
             resolved_archive_file = None
 
+        if config.quantization is not None and low_cpu_mem_usage:
+            logger.warning("low_cpu_mem_usage is not supported for quantized models, loading them normally.")
+            low_cpu_mem_usage = False
+
         # Instantiate model.
-        model = cls(config, *model_args, **model_kwargs)
+        if low_cpu_mem_usage and not from_tf:
+            # Weights found in the checkpoint are overwritten, the missing ones are initialized after loading
+            with no_init_weights():
+                model = cls(config, *model_args, **model_kwargs)
+        else:
+            model = cls(config, *model_args, **model_kwargs)
 
-        if state_dict is None and not from_tf:
+        if config.quantization is not None:
+            # The checkpoint holds quantized weights: quantize the model the same way before loading them
+            quantization, config.quantization = config.quantization, None
+            model.quantize(**quantization)
+
+        if state_dict is None and not from_tf and weight_map is None:
             try:
-                state_dict = torch.load(resolved_archive_file, map_location="cpu")
+                state_dict = load_state_dict(resolved_archive_file)
             except Exception:
                 raise OSError(
                     "Unable to load weights from pytorch checkpoint file. "
@@ -541,51 +766,95 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin):
                     )
                     raise
         else:
-            # Convert old format to new format if needed from a PyTorch state_dict
-            old_keys = []
-            new_keys = []
-            for key in state_dict.keys():
-                new_key = None
-                if "gamma" in key:
-                    new_key = key.replace("gamma", "weight")
-                if "beta" in key:
-                    new_key = key.replace("beta", "bias")
-                if new_key:
-                    old_keys.append(key)
-                    new_keys.append(new_key)
-            for old_key, new_key in zip(old_keys, new_keys):
-                state_dict[new_key] = state_dict.pop(old_key)
-
-            # copy state_dict so _load_from_state_dict can modify it
-            metadata = getattr(state_dict, "_metadata", None)
-            state_dict = state_dict.copy()
-            if metadata is not None:
-                state_dict._metadata = metadata
-
-            # PyTorch's `_load_from_state_dict` does not copy parameters in a module's descendants
-            # so we need to apply the function recursively.
-            def load(module: nn.Module, prefix=""):
-                local_metadata = {} if metadata is None else metadata.get(prefix[:-1], {})
-                module._load_from_state_dict(
-                    state_dict, prefix, local_metadata, True, missing_keys, unexpected_keys, error_msgs,
-                )
-                for name, child in module._modules.items():
-                    if child is not None:
-                        load(child, prefix + name + ".")
+            # Keys of the checkpoint, converted from the old format if needed
+            if weight_map is not None:
+                loaded_keys = [_convert_legacy_key(key) for key in weight_map.keys()]
+            else:
+                _convert_legacy_keys(state_dict)
+                loaded_keys = list(state_dict.keys())
 
             # Make sure we are able to load base models as well as derived models (with heads)
             start_prefix = ""
             model_to_load = model
             if not hasattr(model, cls.base_model_prefix) and any(
-                s.startswith(cls.base_model_prefix) for s in state_dict.keys()
+                s.startswith(cls.base_model_prefix) for s in loaded_keys
             ):
                 start_prefix = cls.base_model_prefix + "."
             if hasattr(model, cls.base_model_prefix) and not any(
-                s.startswith(cls.base_model_prefix) for s in state_dict.keys()
+                s.startswith(cls.base_model_prefix) for s in loaded_keys
             ):
                 model_to_load = getattr(model, cls.base_model_prefix)
 
-            load(model_to_load, prefix=start_prefix)
+            loaded_keys = set(loaded_keys)
+            missing_keys.extend(
+                start_prefix + key
+                for key in model_to_load.state_dict().keys()
+                if start_prefix + key not in loaded_keys
+            )
+
+            if low_cpu_mem_usage:
+                # Initialize the weights that won't be overwritten by the checkpoint
+                for module in _modules_owning_keys(model_to_load, missing_keys, prefix=start_prefix):
+                    model._init_weights(module)
+                if model_to_load is not model:
+                    # The head on top of the base model is not in the checkpoint either
+                    base_model_modules = set(model_to_load.modules())
+                    for module in model.modules():
+                        if module not in base_model_modules:
+                            model._init_weights(module)
+
+            def load_shard(shard_state_dict):
+                if low_cpu_mem_usage:
+                    # Tensors are assigned to the model as is: no copy of the state_dict nor of the parameters
+                    assign_state_dict(
+                        model_to_load,
+                        shard_state_dict,
+                        prefix=start_prefix,
+                        unexpected_keys=unexpected_keys,
+                        error_msgs=error_msgs,
+                    )
+                    return
+
+                # copy state_dict so _load_from_state_dict can modify it
+                metadata = getattr(shard_state_dict, "_metadata", None)
+                shard_state_dict = shard_state_dict.copy()
+                if metadata is not None:
+                    shard_state_dict._metadata = metadata
+
+                # Missing keys are computed on the whole checkpoint above
+                shard_missing_keys = []
+
+                # PyTorch's `_load_from_state_dict` does not copy parameters in a module's descendants
+                # so we need to apply the function recursively.
+                def load(module: nn.Module, prefix=""):
+                    local_metadata = {} if metadata is None else metadata.get(prefix[:-1], {})
+                    module._load_from_state_dict(
+                        shard_state_dict,
+                        prefix,
+                        local_metadata,
+                        True,
+                        shard_missing_keys,
+                        unexpected_keys,
+                        error_msgs,
+                    )
+                    for name, child in module._modules.items():
+                        if child is not None:
+                            load(child, prefix + name + ".")
+
+                load(model_to_load, prefix=start_prefix)
+
+            if weight_map is not None:
+                # Stream the shards in the model one by one so that only one of them is in memory at a time
+                for shard_file in shard_files:
+                    try:
+                        shard_state_dict = load_state_dict(shard_file)
+                    except Exception:
+                        raise OSError("Unable to load weights from pytorch checkpoint shard {}.".format(shard_file))
+                    _convert_legacy_keys(shard_state_dict)
+                    load_shard(shard_state_dict)
+                    del shard_state_dict
+            else:
+                load_shard(state_dict)
 
             if model.__class__.__name__ != model_to_load.__class__.__name__:
                 base_model_state_dict = model_to_load.state_dict().keys()
@@ -1593,6 +1862,15 @@ class Conv1D(nn.Module):
         return x
 
 
+def conv1d_to_linear(layer):
+    """ Converts a :class:`~transformers.modeling_utils.Conv1D` layer in the equivalent ``nn.Linear`` layer. """
+    linear = nn.Linear(layer.weight.size(0), layer.nf).to(layer.weight.device)
+    with torch.no_grad():
+        linear.weight.copy_(layer.weight.t())
+        linear.bias.copy_(layer.bias)
+    return linear
+
+
 class PoolerStartLogits(nn.Module):
     """ Compute SQuAD start_logits from sequence hidden states. """
 
@@ -1981,3 +2259,342 @@ def prune_layer(layer, index, dim=None):
         return prune_conv1d_layer(layer, index, dim=1 if dim is None else dim)
     else:
         raise ValueError("Can't prune layer of class {}".format(layer.__class__))
+
+
+def chunked_attention(query, key, value, attention_biases=(), head_mask=None, dropout=None, chunk_size=256):
+    """ Memory-efficient attention: computes ``softmax(query @ key^T + sum(attention_biases)) @ value`` by blocks of
+        `chunk_size` queries and keys with an online softmax (running maximum and normalizer), so that only
+        (chunk_size, chunk_size) blocks of scores are materialized instead of the (query_length, key_length) matrix.
+        The softmax is computed in float32.
+
+        Args:
+            query: (..., query_length, head_size) queries, already scaled if the model scales them
+            key, value: (..., key_length, head_size) keys and values
+            attention_biases: additive masks or biases (e.g. ``0.0``/``-10000.0`` masks, ``-inf`` masks, T5 position
+                bias) broadcastable to (..., query_length, key_length)
+            head_mask: (`optional`) multiplies the attention probabilities, broadcastable to (..., 1, 1)
+            dropout: (`optional`) callable applied to the (unnormalized) attention probabilities
+
+        Return:
+            (..., query_length, head_size) context
+    """
+
+    def chunk(bias, q_start, k_start):
+        # Dimensions of size 1 are broadcast, don't slice them
+        if bias.size(-2) != 1:
+            bias = bias[..., q_start : q_start + chunk_size, :]
+        if bias.size(-1) != 1:
+            bias = bias[..., k_start : k_start + chunk_size]
+        return bias
+
+    query_length, key_length = query.size(-2), key.size(-2)
+    contexts = []
+    for q_start in range(0, query_length, chunk_size):
+        query_chunk = query[..., q_start : q_start + chunk_size, :]
+        running_max = query_chunk.new_full(query_chunk.size()[:-1] + (1,), -float("inf"), dtype=torch.float32)
+        running_sum = torch.zeros_like(running_max)
+        context = query_chunk.new_zeros(query_chunk.size()[:-1] + value.size()[-1:], dtype=torch.float32)
+        for k_start in range(0, key_length, chunk_size):
+            scores = torch.matmul(query_chunk, key[..., k_start : k_start + chunk_size, :].transpose(-1, -2))
+            for bias in attention_biases:
+                scores = scores + chunk(bias, q_start, k_start)
+            scores = scores.float()
+
+            new_max = torch.max(running_max, scores.max(dim=-1, keepdim=True)[0])
+            # Rows without any key to attend to yet keep a -inf maximum: shift them by 0 to get zeros instead of nan
+            shift = new_max.masked_fill(new_max == -float("inf"), 0.0)
+            probs = torch.exp(scores - shift)
+            correction = torch.exp(running_max - shift)
+            running_sum = running_sum * correction + probs.sum(dim=-1, keepdim=True)
+            if dropout is not None:
+                probs = dropout(probs)
+            value_chunk = value[..., k_start : k_start + chunk_size, :]
+            context = context * correction + torch.matmul(probs.type_as(value_chunk), value_chunk).float()
+            running_max = new_max
+        contexts.append(context / running_sum)
+
+    context = torch.cat(contexts, dim=-2).type_as(value)
+    if head_mask is not None:
+        context = context * head_mask
+    return context
+
+
+def _is_view_of_larger_tensor(tensor):
+    return isinstance(tensor, torch.Tensor) and not tensor.is_quantized and tensor.numel() != tensor.storage().size()
+
+
+def get_unpad_data(attention_mask):
+    """ Computes what padding-free (unpadded) execution needs from a (batch_size, seq_length) padding mask.
+        The real tokens of the batch are packed in a flat (total_tokens, hidden_size) tensor with :func:`unpad_input`.
+        Attention re-pads them in a (batch_size, max_seqlen) block where each sequence starts at position 0, so that
+        it never runs on more than the longest sequence of the batch.
+
+        Return:
+            indices: positions of the real tokens in the flattened (batch_size * seq_length) inputs
+            unpad_indices: positions of the real tokens in the flattened (batch_size * max_seqlen) attention block
+            unpadded_attention_mask: (batch_size, max_seqlen) padding mask of the attention block
+    """
+    mask = attention_mask.ne(0)
+    batch_size, seq_length = mask.size()
+    seqlens = mask.sum(-1)
+    max_seqlen = int(seqlens.max())
+    indices = mask.reshape(-1).nonzero().squeeze(-1)
+    # Rank of every real token in its own sequence, once the padding tokens are removed
+    ranks = (mask.long().cumsum(-1) - 1).reshape(-1)[indices]
+    batch_ids = torch.arange(batch_size, device=mask.device).unsqueeze(1).expand_as(mask).reshape(-1)[indices]
+    unpad_indices = batch_ids * max_seqlen + ranks
+    unpadded_attention_mask = torch.arange(max_seqlen, device=mask.device).unsqueeze(0) < seqlens.unsqueeze(1)
+    return indices, unpad_indices, unpadded_attention_mask.to(attention_mask.dtype)
+
+
+def unpad_input(hidden_states, indices):
+    """ Gathers the (total_tokens, ...) real tokens of (batch_size, seq_length, ...) `hidden_states`. """
+    return hidden_states.reshape(-1, *hidden_states.size()[2:])[indices]
+
+
+def pad_input(hidden_states, indices, batch_size, seq_length):
+    """ Scatters (total_tokens, ...) `hidden_states` back in a zero-padded (batch_size, seq_length, ...) tensor. """
+    output = hidden_states.new_zeros((batch_size * seq_length,) + hidden_states.size()[1:])
+    output[indices] = hidden_states
+    return output.view(batch_size, seq_length, *hidden_states.size()[1:])
+
+
+MMAP_MAGIC = b"PTMMAP01"
+MMAP_ALIGNMENT = 64
+
+
+def _mmap_align(offset):
+    return (offset + MMAP_ALIGNMENT - 1) // MMAP_ALIGNMENT * MMAP_ALIGNMENT
+
+
+def save_mmap_state_dict(state_dict, path):
+    """ Save a state_dict in a memory-mappable file.
+
+        The file contains a magic string, the length of a JSON header mapping each key to the dtype, shape and offset
+        of its tensor, the header itself and then the raw (aligned) tensor data. It can be read back without
+        unpickling nor copying by :func:`load_mmap_state_dict`.
+    """
+    header = OrderedDict()
+    tensors = []
+    offset = 0
+    for key, tensor in state_dict.items():
+        tensor = tensor.detach().cpu().contiguous()
+        try:
+            array = tensor.numpy()
+        except TypeError:
+            raise ValueError("Tensor {} of dtype {} can't be saved in mmap format".format(key, tensor.dtype))
+        offset = _mmap_align(offset)
+        header[key] = {"dtype": array.dtype.name, "shape": list(array.shape), "offset": offset}
+        tensors.append((offset, array))
+        offset += array.nbytes
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _mmap_align(len(MMAP_MAGIC) + 8 + len(header_bytes))
+    with open(path, "wb") as f:
+        f.write(MMAP_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for tensor_offset, array in tensors:
+            f.seek(data_start + tensor_offset)
+            f.write(array.reshape(-1).view(np.uint8).data)
+        f.truncate(data_start + offset)
+
+
+def is_mmap_checkpoint(path):
+    """ Check whether `path` is a checkpoint written by :func:`save_mmap_state_dict`. """
+    if path is None or not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MMAP_MAGIC)) == MMAP_MAGIC
+
+
+def load_mmap_state_dict(path):
+    """ Load a state_dict saved with :func:`save_mmap_state_dict`.
+
+        The file is memory-mapped in copy-on-write mode: the returned tensors share the pages of the file,
+        nothing is read until a tensor is used and writing to a tensor never modifies the file.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MMAP_MAGIC)) != MMAP_MAGIC:
+            raise ValueError("{} is not a mmap checkpoint".format(path))
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length).decode("utf-8"), object_pairs_hook=OrderedDict)
+    data_start = _mmap_align(len(MMAP_MAGIC) + 8 + header_length)
+
+    buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    state_dict = OrderedDict()
+    for key, info in header.items():
+        dtype = np.dtype(info["dtype"])
+        shape = tuple(info["shape"])
+        start = data_start + info["offset"]
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        array = buffer[start : start + nbytes].view(dtype).reshape(shape)
+        state_dict[key] = torch.from_numpy(array)
+    return state_dict
+
+
+def load_state_dict(path):
+    """ Load a state_dict saved either with ``torch.save`` or with :func:`save_mmap_state_dict`. """
+    if is_mmap_checkpoint(path):
+        return load_mmap_state_dict(path)
+    return torch.load(path, map_location="cpu")
+
+
+def _convert_legacy_key(key):
+    new_key = None
+    if "gamma" in key:
+        new_key = key.replace("gamma", "weight")
+    if "beta" in key:
+        new_key = key.replace("beta", "bias")
+    return new_key if new_key else key
+
+
+def _convert_legacy_keys(state_dict):
+    """ Rename in place the keys of a state_dict using the old `gamma`/`beta` LayerNorm names. """
+    old_keys = [key for key in state_dict.keys() if _convert_legacy_key(key) != key]
+    for old_key in old_keys:
+        state_dict[_convert_legacy_key(old_key)] = state_dict.pop(old_key)
+
+
+def _named_entries(module, prefix=""):
+    """ Yield (key, module, name, is_parameter) for every parameter and buffer of `module`.
+        Contrary to `named_parameters`, modules shared under several names are visited under all of them.
+    """
+    for name, param in module._parameters.items():
+        if param is not None:
+            yield prefix + name, module, name, True
+    for name, buf in module._buffers.items():
+        if buf is not None:
+            yield prefix + name, module, name, False
+    for name, child in module._modules.items():
+        if child is not None:
+            yield from _named_entries(child, prefix + name + ".")
+
+
+def _modules_owning_keys(model, keys, prefix=""):
+    """ Return the (unique) submodules of `model` holding the parameters or buffers named `keys`. """
+    keys = set(keys)
+    modules = []
+    for key, module, _, _ in _named_entries(model, prefix):
+        if key in keys and module not in modules:
+            modules.append(module)
+    return modules
+
+
+def assign_state_dict(model, state_dict, prefix="", unexpected_keys=None, error_msgs=None):
+    """ Load a state_dict in `model` by assigning its tensors to the parameters and buffers of the model
+        instead of copying them (as done by :func:`torch.nn.Module.load_state_dict`).
+
+        Parameters and buffers that are not found in `state_dict` are left untouched, so a checkpoint can be
+        assigned one shard at a time. The unexpected keys and error messages are appended to the provided lists.
+    """
+    unexpected_keys = [] if unexpected_keys is None else unexpected_keys
+    error_msgs = [] if error_msgs is None else error_msgs
+
+    model_entries = OrderedDict(
+        (key, (module, name, is_parameter)) for key, module, name, is_parameter in _named_entries(model, prefix)
+    )
+
+    # Parameters shared between several modules are replaced by the same new parameter
+    assigned = {}
+    for key, (module, name, is_parameter) in model_entries.items():
+        if key not in state_dict:
+            continue
+        current = module._parameters[name] if is_parameter else module._buffers[name]
+        if id(current) in assigned:
+            new_value = assigned[id(current)]
+        else:
+            tensor = state_dict[key]
+            if tensor.shape != current.shape:
+                error_msgs.append(
+                    "size mismatch for {}: copying a param with shape {} from checkpoint, "
+                    "the shape in current model is {}.".format(key, tensor.shape, current.shape)
+                )
+                continue
+            if tensor.dtype != current.dtype or tensor.device != current.device:
+                tensor = tensor.to(device=current.device, dtype=current.dtype)
+            new_value = nn.Parameter(tensor, requires_grad=current.requires_grad) if is_parameter else tensor
+            assigned[id(current)] = new_value
+        if is_parameter:
+            module._parameters[name] = new_value
+        else:
+            module._buffers[name] = new_value
+
+    for key in state_dict.keys():
+        if key.startswith(prefix) and key not in model_entries:
+            unexpected_keys.append(key)
+
+    return unexpected_keys, error_msgs
+
+
+def convert_size_to_bytes(size):
+    """ Convert a size given in bytes or as a string such as ``"200MB"`` or ``"2GiB"`` to a number of bytes. """
+    if isinstance(size, int):
+        return size
+    units = OrderedDict(
+        [
+            ("KIB", 2 ** 10),
+            ("MIB", 2 ** 20),
+            ("GIB", 2 ** 30),
+            ("KB", 10 ** 3),
+            ("MB", 10 ** 6),
+            ("GB", 10 ** 9),
+            ("B", 1),
+        ]
+    )
+    size = size.strip().upper()
+    for unit, factor in units.items():
+        if size.endswith(unit):
+            return int(float(size[: -len(unit)]) * factor)
+    raise ValueError("Can't parse size {}, expected an int or a string such as '200MB'".format(size))
+
+
+def shard_state_dict(state_dict, max_shard_size):
+    """ Split a state_dict in a list of shards (OrderedDict) each weighing at most `max_shard_size` bytes.
+        A tensor larger than `max_shard_size` is put alone in its own shard.
+    """
+    max_shard_size = convert_size_to_bytes(max_shard_size)
+    shards = [OrderedDict()]
+    current_size = 0
+    for key, tensor in state_dict.items():
+        tensor_size = tensor.numel() * tensor.element_size()
+        if current_size + tensor_size > max_shard_size and len(shards[-1]) > 0:
+            shards.append(OrderedDict())
+            current_size = 0
+        shards[-1][key] = tensor
+        current_size += tensor_size
+    return shards
+
+
+_SHARD_FILE_PATTERN = re.compile(r"^pytorch_model-\d{5}-of-\d{5}\.(bin|mmap)$")
+
+
+def shard_file_name(weights_name, shard_index, num_shards):
+    """ Name of a checkpoint shard, e.g. ``pytorch_model-00001-of-00003.bin`` for the first of three shards. """
+    name, extension = os.path.splitext(weights_name)
+    return "{}-{:05d}-of-{:05d}{}".format(name, shard_index + 1, num_shards, extension)
+
+
+def resolve_sharded_checkpoint(index_file, resolved_index_file, **cached_path_kwargs):
+    """ Resolve (downloading them in parallel if needed) the shards listed in the index of a sharded checkpoint.
+
+        Arguments:
+            index_file: path or url of the index file, the shards are looked up next to it.
+            resolved_index_file: local path of the index file.
+            cached_path_kwargs: passed to :func:`~transformers.file_utils.cached_paths`.
+
+        Return: a tuple with the list of the local paths of the shards and the weight map of the index.
+    """
+    with open(resolved_index_file, "r", encoding="utf-8") as reader:
+        weight_map = json.load(reader, object_pairs_hook=OrderedDict)["weight_map"]
+    shard_names = sorted(set(weight_map.values()))
+    if is_remote_url(index_file):
+        shard_files = [index_file.rsplit("/", 1)[0] + "/" + shard_name for shard_name in shard_names]
+    else:
+        shard_files = [os.path.join(os.path.dirname(index_file), shard_name) for shard_name in shard_names]
+
+    resolved_shard_files = cached_paths(shard_files, **cached_path_kwargs)
+    for shard_file, resolved_shard_file in zip(shard_files, resolved_shard_files):
+        if resolved_shard_file is None:
+            raise EnvironmentError("Couldn't find the checkpoint shard {}".format(shard_file))
+    return resolved_shard_files, weight_map
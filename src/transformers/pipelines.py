@@ -15,6 +15,7 @@
 
 
 import csv
+import itertools
 import json
 import logging
 import os
@@ -23,7 +24,7 @@ import sys
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from os.path import abspath, exists
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -35,11 +36,17 @@ from .configuration_t5 import T5Config
 from .configuration_utils import PretrainedConfig
 from .configuration_xlm import XLMConfig
 from .data import SquadExample, squad_convert_examples_to_features
-from .file_utils import is_tf_available, is_torch_available
+from .file_utils import (
+    ONNX_WEIGHTS_NAME,
+    TORCHSCRIPT_CONFIG_NAME,
+    is_pyarrow_available,
+    is_tf_available,
+    is_torch_available,
+)
 from .modelcard import ModelCard
 from .tokenization_auto import AutoTokenizer
 from .tokenization_bert import BasicTokenizer
-from .tokenization_utils import PreTrainedTokenizer
+from .tokenization_utils import BatchEncoding, PreTrainedTokenizer
 
 
 if is_tf_available():
@@ -61,10 +68,15 @@ if is_torch_available():
         AutoModelForTokenClassification,
         AutoModelWithLMHead,
     )
+    from .modeling_onnx import OnnxModel
+    from .modeling_torchscript import TorchScriptModel
 
 
 logger = logging.getLogger(__name__)
 
+# Runtimes executing the models of the pipelines, see the `backend` argument of `pipeline`
+PIPELINE_BACKENDS = [None, "onnx"]
+
 
 def get_framework(model=None):
     """ Select framework (TensorFlow/PyTorch) to use.
@@ -121,14 +133,21 @@ class PipelineDataFormat:
     Base class for all the pipeline supported data format both for reading and writing.
     Supported data formats currently includes:
      - JSON
+     - JSON lines (one JSON object per line)
      - CSV
+     - Arrow (IPC file format, requires PyArrow)
      - stdin/stdout (pipe)
 
     PipelineDataFormat also includes some utilities to work with multi-columns like mapping from datasets columns
     to pipelines keyword arguments through the `dataset_kwarg_1=dataset_column_1` format.
+
+    The outputs can be written as they are produced with `write`, the output being complete once `close` has been
+    called (data formats can be used as context managers to do so). The JSON lines, CSV, Arrow and pipe formats
+    read their input and write their output incrementally, the JSON format holds the whole input and output in
+    memory.
     """
 
-    SUPPORTED_FORMATS = ["json", "csv", "pipe"]
+    SUPPORTED_FORMATS = ["json", "jsonl", "csv", "arrow", "pipe"]
 
     def __init__(
         self, output_path: Optional[str], input_path: Optional[str], column: Optional[str], overwrite=False,
@@ -137,6 +156,7 @@ class PipelineDataFormat:
         self.input_path = input_path
         self.column = column.split(",") if column is not None else [""]
         self.is_multi_columns = len(self.column) > 1
+        self._outputs = []
 
         if self.is_multi_columns:
             self.column = [tuple(c.split("=")) if "=" in c else (c, c) for c in self.column]
@@ -149,10 +169,21 @@ class PipelineDataFormat:
             if not exists(abspath(self.input_path)):
                 raise OSError("{} doesnt exist on disk".format(self.input_path))
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     @abstractmethod
     def __iter__(self):
         raise NotImplementedError()
 
+    def _select_columns(self, entry: dict):
+        if self.is_multi_columns:
+            return {k: entry[c] for k, c in self.column}
+        return entry[self.column[0]]
+
     @abstractmethod
     def save(self, data: dict):
         """
@@ -162,6 +193,21 @@ class PipelineDataFormat:
         """
         raise NotImplementedError()
 
+    def write(self, data: List[dict]):
+        """
+        Write the provided outputs after the ones already written. Data formats which can't be written
+        incrementally hold the outputs until `close` is called.
+        :param data: list of outputs to store
+        """
+        self._outputs += data
+
+    def close(self):
+        """
+        Complete the output written with `write`.
+        """
+        self.save(self._outputs)
+        self._outputs = []
+
     def save_binary(self, data: Union[dict, List[dict]]) -> str:
         """
         Save the provided data object as a pickle-formatted binary data on the disk.
@@ -182,35 +228,87 @@ class PipelineDataFormat:
     ):
         if format == "json":
             return JsonPipelineDataFormat(output_path, input_path, column, overwrite=overwrite)
+        elif format == "jsonl":
+            return JsonLinesPipelineDataFormat(output_path, input_path, column, overwrite=overwrite)
         elif format == "csv":
             return CsvPipelineDataFormat(output_path, input_path, column, overwrite=overwrite)
+        elif format == "arrow":
+            return ArrowPipelineDataFormat(output_path, input_path, column, overwrite=overwrite)
         elif format == "pipe":
             return PipedPipelineDataFormat(output_path, input_path, column, overwrite=overwrite)
         else:
-            raise KeyError("Unknown reader {} (Available reader are json/csv/pipe)".format(format))
+            raise KeyError("Unknown reader {} (Available reader are json/jsonl/csv/arrow/pipe)".format(format))
+
+
+class _StreamingPipelineDataFormat(PipelineDataFormat):
+    """
+    Base class of the data formats whose output file is written incrementally: it is opened by the first `write`
+    and closed by `close`.
+    """
+
+    def __init__(
+        self, output_path: Optional[str], input_path: Optional[str], column: Optional[str], overwrite=False,
+    ):
+        super().__init__(output_path, input_path, column, overwrite=overwrite)
+        self._output_file = None
+
+    def _open_output(self):
+        if self._output_file is None:
+            self._output_file = open(self.output_path, "w", newline="")
+        return self._output_file
+
+    def save(self, data: List[dict]):
+        self.write(data)
+        self.close()
+
+    def close(self):
+        # An output without any row is still created
+        self._open_output().close()
+        self._output_file = None
 
 
-class CsvPipelineDataFormat(PipelineDataFormat):
+class CsvPipelineDataFormat(_StreamingPipelineDataFormat):
     def __init__(
         self, output_path: Optional[str], input_path: Optional[str], column: Optional[str], overwrite=False,
     ):
         super().__init__(output_path, input_path, column, overwrite=overwrite)
+        self._writer = None
 
     def __iter__(self):
         with open(self.input_path, "r") as f:
             reader = csv.DictReader(f)
             for row in reader:
-                if self.is_multi_columns:
-                    yield {k: row[c] for k, c in self.column}
-                else:
-                    yield row[self.column[0]]
+                yield self._select_columns(row)
 
-    def save(self, data: List[dict]):
-        with open(self.output_path, "w") as f:
-            if len(data) > 0:
-                writer = csv.DictWriter(f, list(data[0].keys()))
-                writer.writeheader()
-                writer.writerows(data)
+    def write(self, data: List[dict]):
+        if len(data) == 0:
+            return
+        if self._writer is None:
+            # The columns are the keys of the first output
+            self._writer = csv.DictWriter(self._open_output(), list(data[0].keys()))
+            self._writer.writeheader()
+        self._writer.writerows(data)
+
+    def close(self):
+        super().close()
+        self._writer = None
+
+
+class JsonLinesPipelineDataFormat(_StreamingPipelineDataFormat):
+    """
+    Read and write JSON lines files, with one JSON object per line, one line at a time.
+    """
+
+    def __iter__(self):
+        with open(self.input_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield self._select_columns(json.loads(line))
+
+    def write(self, data: List[dict]):
+        output_file = self._open_output()
+        for row in data:
+            output_file.write(json.dumps(row) + "\n")
 
 
 class JsonPipelineDataFormat(PipelineDataFormat):
@@ -224,22 +322,76 @@ class JsonPipelineDataFormat(PipelineDataFormat):
 
     def __iter__(self):
         for entry in self._entries:
-            if self.is_multi_columns:
-                yield {k: entry[c] for k, c in self.column}
-            else:
-                yield entry[self.column[0]]
+            yield self._select_columns(entry)
 
     def save(self, data: dict):
         with open(self.output_path, "w") as f:
             json.dump(data, f)
 
 
+class ArrowPipelineDataFormat(PipelineDataFormat):
+    """
+    Read and write Arrow files (IPC file format, also read by ``pyarrow.feather``), one record batch at a time.
+    The input file is memory-mapped, and each `write` adds a record batch to the output file, whose schema is the
+    one of the first outputs.
+    """
+
+    def __init__(
+        self, output_path: Optional[str], input_path: Optional[str], column: Optional[str], overwrite=False,
+    ):
+        if not is_pyarrow_available():
+            raise ImportError("The Arrow data format requires PyArrow, install it with `pip install pyarrow`")
+        super().__init__(output_path, input_path, column, overwrite=overwrite)
+        self._writer = None
+        self._schema = None
+
+    def __iter__(self):
+        import pyarrow as pa
+
+        with pa.memory_map(self.input_path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i).to_pydict()
+                for values in zip(*batch.values()):
+                    yield self._select_columns(dict(zip(batch.keys(), values)))
+
+    def write(self, data: List[dict]):
+        import pyarrow as pa
+
+        if len(data) == 0:
+            return
+        columns = {key: [row[key] for row in data] for key in data[0].keys()}
+        if self._writer is None:
+            table = pa.Table.from_pydict(columns)
+            self._schema = table.schema
+            self._writer = pa.ipc.new_file(self.output_path, self._schema)
+        else:
+            table = pa.Table.from_pydict(columns, schema=self._schema)
+        self._writer.write_table(table)
+
+    def save(self, data: List[dict]):
+        self.write(data)
+        self.close()
+
+    def close(self):
+        import pyarrow as pa
+
+        if self._writer is None:
+            if self.output_path is None:
+                return
+            # An output without any row is still created, as an Arrow file without any column
+            self._writer = pa.ipc.new_file(self.output_path, pa.schema([]))
+        self._writer.close()
+        self._writer = None
+
+
 class PipedPipelineDataFormat(PipelineDataFormat):
     """
     Read data from piped input to the python process.
     For multi columns data, columns should separated by \t
 
     If columns are provided, then the output will be a dictionary with {column_x: value_x}
+    Each output is printed on its own line as soon as it is written.
     """
 
     def __iter__(self):
@@ -261,6 +413,13 @@ class PipedPipelineDataFormat(PipelineDataFormat):
     def save(self, data: dict):
         print(data)
 
+    def write(self, data: List[dict]):
+        for row in data:
+            print(row)
+
+    def close(self):
+        sys.stdout.flush()
+
     def save_binary(self, data: Union[dict, List[dict]]) -> str:
         if self.output_path is None:
             raise KeyError(
@@ -306,7 +465,9 @@ class Pipeline(_ScikitCompat):
         model (:obj:`~transformers.PreTrainedModel` or :obj:`~transformers.TFPreTrainedModel`):
             The model that will be used by the pipeline to make predictions. This needs to be a model inheriting from
             :class:`~transformers.PreTrainedModel` for PyTorch and :class:`~transformers.TFPreTrainedModel` for
-            TensorFlow.
+            TensorFlow, or a runtime of an exported model called like the model it was exported from: a
+            :class:`~transformers.TorchScriptModel` (see :func:`~transformers.PreTrainedModel.export_torchscript`)
+            or an :class:`~transformers.OnnxModel` (see the `backend` argument of :func:`~transformers.pipeline`).
         tokenizer (:obj:`~transformers.PreTrainedTokenizer`):
             The tokenizer that will be used by the pipeline to encode data for the model. This object inherits from
             :class:`~transformers.PreTrainedTokenizer`.
@@ -335,6 +496,8 @@ class Pipeline(_ScikitCompat):
     """
 
     default_input_names = None
+    # Whether a call on a single input returns its output itself, instead of a list holding it
+    _unwraps_single_output = False
 
     def __init__(
         self,
@@ -463,10 +626,51 @@ class Pipeline(_ScikitCompat):
 
         return inputs
 
+    def _pad(self, encoded_inputs: Dict[str, List[List[int]]], indices: Optional[List[int]] = None) -> BatchEncoding:
+        """
+        Pads the sequences `indices` (all of them by default) of `encoded_inputs`, the unpadded output of
+        ``batch_encode_plus``, to the longest of these sequences only (dynamic padding), and returns them as tensors
+        of the framework with their attention mask.
+        """
+        if indices is None:
+            indices = range(len(encoded_inputs["input_ids"]))
+        lengths = [len(encoded_inputs["input_ids"][i]) for i in indices]
+        max_length = max(lengths)
+        if self.tokenizer.pad_token_id is None and min(lengths) < max_length:
+            raise ValueError(self.tokenizer.NO_PAD_TOKEN_FOR_BATCH_MSG)
+
+        pad_values = {"input_ids": self.tokenizer.pad_token_id, "token_type_ids": self.tokenizer.pad_token_type_id}
+        padded_inputs = {"attention_mask": [[1] * length + [0] * (max_length - length) for length in lengths]}
+        for name, pad_value in pad_values.items():
+            if name in encoded_inputs:
+                padded_inputs[name] = [
+                    encoded_inputs[name][i] + [pad_value] * (max_length - length)
+                    for i, length in zip(indices, lengths)
+                ]
+        if self.tokenizer.padding_side == "left":
+            padded_inputs = {
+                name: [row[length:] + row[:length] for row, length in zip(rows, lengths)]
+                for name, rows in padded_inputs.items()
+            }
+
+        if self.framework == "tf":
+            return BatchEncoding({name: tf.constant(rows) for name, rows in padded_inputs.items()})
+        return BatchEncoding({name: torch.tensor(rows) for name, rows in padded_inputs.items()})
+
     def __call__(self, *texts, **kwargs):
         inputs = self._parse_and_tokenize(*texts, **kwargs)
         return self._forward(inputs)
 
+    def outputs_per_input(self, inputs: List, **kwargs) -> List:
+        """
+        Runs the pipeline on the list `inputs` at once, and returns the list of the output of each input, including
+        when there is a single input (the output of which some pipelines return as is when called directly).
+        """
+        outputs = self(inputs, **kwargs)
+        if len(inputs) == 1 and self._unwraps_single_output:
+            return [outputs]
+        return outputs
+
     def _forward(self, inputs, return_tensors=False):
         """
         Internal framework specific forward dispatching.
@@ -526,8 +730,18 @@ class FeatureExtractionPipeline(Pipeline):
         device (:obj:`int`, `optional`, defaults to :obj:`-1`):
             Device ordinal for CPU/GPU supports. Setting this to -1 will leverage CPU, >=0 will run the model
             on the associated CUDA device id.
+        pooling (:obj:`str`, `optional`, defaults to :obj:`None`):
+            Pooling of the hidden states of each sequence, computed on the device of the model, one of
+            :obj:`POOLING_MODES`: "cls" (hidden state of the classification token, the first one or the last one
+            for the tokenizers padding on the left like XLNet), "mean" (mean over the attention mask) or "max"
+            (maximum over the attention mask). If :obj:`None`, the hidden states of all the tokens are returned.
+        batch_size (:obj:`int`, `optional`, defaults to :obj:`32`):
+            Number of sequences embedded in each forward pass by :func:`iter_embeddings` and
+            :func:`save_embeddings`.
     """
 
+    POOLING_MODES = ("cls", "mean", "max")
+
     def __init__(
         self,
         model: Union["PreTrainedModel", "TFPreTrainedModel"],
@@ -537,6 +751,8 @@ class FeatureExtractionPipeline(Pipeline):
         args_parser: ArgumentHandler = None,
         device: int = -1,
         task: str = "",
+        pooling: Optional[str] = None,
+        batch_size: int = 32,
     ):
         super().__init__(
             model=model,
@@ -548,9 +764,138 @@ class FeatureExtractionPipeline(Pipeline):
             binary_output=True,
             task=task,
         )
+        self._check_pooling(pooling)
+        self.pooling = pooling
+        self.batch_size = batch_size
+
+    def _check_pooling(self, pooling):
+        if pooling is not None and pooling not in self.POOLING_MODES:
+            raise ValueError("Unknown pooling {}, available poolings are {}".format(pooling, self.POOLING_MODES))
 
     def __call__(self, *args, **kwargs):
-        return super().__call__(*args, **kwargs).tolist()
+        pooling = kwargs.pop("pooling", self.pooling)
+        self._check_pooling(pooling)
+        texts = self._args_parser(*args, **kwargs)
+        if pooling is None:
+            # Texts of different lengths are padded to the longest one
+            encoded_inputs = self.tokenizer.batch_encode_plus(
+                texts, add_special_tokens=True, max_length=self.tokenizer.max_len, return_attention_masks=False
+            )
+            features = self._forward(self._pad(encoded_inputs))
+            # The hidden states of each text are returned without the padding of the batch
+            lengths = [len(input_ids) for input_ids in encoded_inputs["input_ids"]]
+            if self.tokenizer.padding_side == "left":
+                return [text_features[-length:].tolist() for text_features, length in zip(features, lengths)]
+            return [text_features[:length].tolist() for text_features, length in zip(features, lengths)]
+        return self._embed(texts, pooling).tolist()
+
+    def _embed(self, texts: List[str], pooling: str) -> np.ndarray:
+        """
+        Pooled hidden states of `texts`, as a numpy array (number of texts, hidden size). The texts are run in a
+        single forward pass, padded to the longest of them only.
+        """
+        encoded_inputs = self.tokenizer.batch_encode_plus(
+            texts, add_special_tokens=True, max_length=self.tokenizer.max_len, return_attention_masks=False
+        )
+        inputs = self._pad(encoded_inputs)
+        cls_index = -1 if self.tokenizer.padding_side == "left" else 0
+
+        with self.device_placement():
+            if self.framework == "tf":
+                hidden_states = self.model(inputs.data, training=False)[0]
+                mask = tf.cast(inputs["attention_mask"], hidden_states.dtype)[:, :, None]
+                if pooling == "cls":
+                    pooled = hidden_states[:, cls_index]
+                elif pooling == "mean":
+                    pooled = tf.reduce_sum(hidden_states * mask, axis=1) / tf.reduce_sum(mask, axis=1)
+                else:
+                    pooled = tf.reduce_max(hidden_states + (1.0 - mask) * hidden_states.dtype.min, axis=1)
+                return pooled.numpy()
+
+            with torch.no_grad():
+                inputs = self.ensure_tensor_on_device(**inputs)
+                hidden_states = self.model(**inputs)[0]
+                mask = inputs["attention_mask"].unsqueeze(-1)
+                if pooling == "cls":
+                    pooled = hidden_states[:, cls_index]
+                elif pooling == "mean":
+                    pooled = (hidden_states * mask.to(hidden_states.dtype)).sum(dim=1) / mask.sum(dim=1)
+                else:
+                    pooled = hidden_states.masked_fill(mask == 0, float("-inf")).max(dim=1)[0]
+                return pooled.cpu().numpy()
+
+    def iter_embeddings(self, texts, pooling: Optional[str] = None, batch_size: Optional[int] = None):
+        """
+        Embeds `texts` (any iterable of strings, e.g. the lines of a file) by batches of `batch_size` texts
+        (defaults to the one of the pipeline), each batch being tokenized when it is reached and padded to its
+        longest text only.
+
+        Yields:
+            For each batch, the index of its first text and the numpy array (batch size, hidden size) of the pooled
+            hidden states of its texts (with the pooling `pooling`, defaulting to the one of the pipeline or "mean").
+        """
+        pooling = pooling or self.pooling or "mean"
+        self._check_pooling(pooling)
+        batch_size = batch_size or self.batch_size
+        texts = iter(texts)
+        start = 0
+        batch = list(itertools.islice(texts, batch_size))
+        while batch:
+            yield start, self._embed(batch, pooling)
+            start += len(batch)
+            batch = list(itertools.islice(texts, batch_size))
+
+    def save_embeddings(
+        self,
+        texts: Iterable[str],
+        output: str,
+        dtype: str = "float32",
+        pooling: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        num_texts: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Streams the embeddings of `texts` (see :func:`iter_embeddings`) in the file `output`, preallocated with one
+        row per text: a ``.npy`` file if `output` ends with ``.npy``, a raw ``np.memmap`` file otherwise. Only one
+        batch of embeddings is held in memory at a time.
+
+        Args:
+            dtype: (str, default "float32") type of the saved embeddings, "float32" or "float16"
+            num_texts: (int, default to the length of `texts`) number of texts, required when `texts` has no length
+                (e.g. a generator or a file)
+
+        Returns:
+            The memory-mapped array (number of texts, hidden size) of the embeddings
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError("Embeddings can be saved as float32 or float16, got {}".format(dtype))
+        if num_texts is None:
+            if not hasattr(texts, "__len__"):
+                raise ValueError("num_texts is required to save the embeddings of texts without a length")
+            num_texts = len(texts)
+
+        embeddings = None
+        end = 0
+        for start, batch_embeddings in self.iter_embeddings(texts, pooling=pooling, batch_size=batch_size):
+            end = start + len(batch_embeddings)
+            if end > num_texts:
+                raise ValueError("More than num_texts={} texts to embed".format(num_texts))
+            if embeddings is None:
+                # The hidden size is known after the first batch
+                shape = (num_texts, batch_embeddings.shape[-1])
+                if output.endswith(".npy"):
+                    embeddings = np.lib.format.open_memmap(output, mode="w+", dtype=dtype, shape=shape)
+                else:
+                    embeddings = np.memmap(output, mode="w+", dtype=dtype, shape=shape)
+            embeddings[start:end] = batch_embeddings
+
+        if embeddings is None:
+            raise ValueError("No text to embed")
+        embeddings.flush()
+        if end < num_texts:
+            raise ValueError("Only {} texts to embed, expected num_texts={}".format(end, num_texts))
+        logger.info("Embeddings of {} texts saved in {}".format(num_texts, output))
+        return embeddings
 
 
 class TextClassificationPipeline(Pipeline):
@@ -588,12 +933,85 @@ class TextClassificationPipeline(Pipeline):
         device (:obj:`int`, `optional`, defaults to :obj:`-1`):
             Device ordinal for CPU/GPU supports. Setting this to -1 will leverage CPU, >=0 will run the model
             on the associated CUDA device id.
+        batch_size (:obj:`int`, `optional`, defaults to :obj:`32`):
+            Maximum number of texts classified in each forward pass.
+        sort_by_length (:obj:`bool`, `optional`, defaults to :obj:`True`):
+            Whether to batch the texts of similar tokenized lengths together, so that each batch is padded as little
+            as possible. The results are returned in the order of the texts in any case.
     """
 
+    def __init__(
+        self,
+        model: Union["PreTrainedModel", "TFPreTrainedModel"],
+        tokenizer: PreTrainedTokenizer,
+        modelcard: Optional[ModelCard] = None,
+        framework: Optional[str] = None,
+        args_parser: ArgumentHandler = None,
+        device: int = -1,
+        binary_output: bool = False,
+        task: str = "",
+        batch_size: int = 32,
+        sort_by_length: bool = True,
+    ):
+        super().__init__(
+            model=model,
+            tokenizer=tokenizer,
+            modelcard=modelcard,
+            framework=framework,
+            args_parser=args_parser,
+            device=device,
+            binary_output=binary_output,
+            task=task,
+        )
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+
     def __call__(self, *args, **kwargs):
-        outputs = super().__call__(*args, **kwargs)
-        scores = np.exp(outputs) / np.exp(outputs).sum(-1)
-        return [{"label": self.model.config.id2label[item.argmax()], "score": item.max()} for item in scores]
+        """
+        Args:
+            args: (str, List[str]) text(s) to classify
+            batch_size: (int, default to the one of the pipeline) maximum number of texts in each forward pass
+            sort_by_length: (bool, default to the one of the pipeline) whether to batch texts of similar lengths
+        Returns:
+            For each text, in the order of the texts, a dict {'label': str, 'score': float} with its most probable
+            label and the probability of this label
+        """
+        batch_size = kwargs.pop("batch_size", self.batch_size)
+        sort_by_length = kwargs.pop("sort_by_length", self.sort_by_length)
+        if batch_size < 1:
+            raise ValueError("batch_size should be at least 1, got {}".format(batch_size))
+        texts = self._args_parser(*args, **kwargs)
+        encoded_inputs = self.tokenizer.batch_encode_plus(
+            texts, add_special_tokens=True, max_length=self.tokenizer.max_len, return_attention_masks=False
+        )
+
+        lengths = [len(input_ids) for input_ids in encoded_inputs["input_ids"]]
+        order = np.argsort(lengths, kind="stable") if sort_by_length else np.arange(len(lengths))
+        labels_idx = np.zeros(len(lengths), dtype=np.int64)
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        for batch_start in range(0, len(order), batch_size):
+            indices = order[batch_start : batch_start + batch_size]
+            labels_idx[indices], scores[indices] = self._classify(self._pad(encoded_inputs, indices.tolist()))
+
+        id2label = self.model.config.id2label
+        return [
+            {"label": id2label[label], "score": score} for label, score in zip(labels_idx.tolist(), scores.tolist())
+        ]
+
+    def _classify(self, inputs: BatchEncoding) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Most probable label and its probability for each sequence of `inputs`, with the softmax computed on the
+        device of the model.
+        """
+        with self.device_placement():
+            if self.framework == "tf":
+                probs = tf.nn.softmax(self.model(inputs.data, training=False)[0], axis=-1)
+                return tf.argmax(probs, axis=-1).numpy(), tf.reduce_max(probs, axis=-1).numpy()
+
+            with torch.no_grad():
+                inputs = self.ensure_tensor_on_device(**inputs)
+                scores, labels_idx = self.model(**inputs)[0].softmax(dim=-1).max(dim=-1)
+                return labels_idx.cpu().numpy(), scores.cpu().numpy()
 
 
 class FillMaskPipeline(Pipeline):
@@ -634,6 +1052,8 @@ class FillMaskPipeline(Pipeline):
             on the associated CUDA device id.
     """
 
+    _unwraps_single_output = True
+
     def __init__(
         self,
         model: Union["PreTrainedModel", "TFPreTrainedModel"],
@@ -659,37 +1079,77 @@ class FillMaskPipeline(Pipeline):
         self.topk = topk
 
     def __call__(self, *args, **kwargs):
-        inputs = self._parse_and_tokenize(*args, **kwargs)
-        outputs = self._forward(inputs, return_tensors=True)
+        """
+        Args:
+            args: (str, List[str]) text(s) holding one or several mask tokens
+            topk: (int, default to the one of the pipeline) number of candidates returned for each mask
+        Returns:
+            For each text, the list of the `topk` candidates {'sequence': str, 'score': float, 'token': int} of its
+            mask, or when the text holds several masks, one such list per mask (the sequence of a candidate then
+            holds the candidate in place of its mask and the other masks unchanged)
+        """
+        topk = kwargs.pop("topk", self.topk)
+        texts = self._args_parser(*args, **kwargs)
+        encoded_inputs = self.tokenizer.batch_encode_plus(
+            texts, add_special_tokens=True, max_length=self.tokenizer.max_len, return_attention_masks=False
+        )
+        inputs = self._pad(encoded_inputs)
+        outputs = self._forward(inputs)
+
+        # Gather the logits of all the masks of the batch and select their candidates at once
+        input_ids = np.array(inputs["input_ids"])
+        batch_idx, masked_idx = np.nonzero(input_ids == self.tokenizer.mask_token_id)
+        num_masks = np.bincount(batch_idx, minlength=len(texts))
+        if not num_masks.all():
+            raise ValueError(
+                "No mask token {} found in: {}".format(self.tokenizer.mask_token, texts[int(np.argmin(num_masks))])
+            )
+        logits = outputs[batch_idx, masked_idx]
+        probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs /= probs.sum(axis=-1, keepdims=True)
+        topk = min(topk, probs.shape[-1])
+        predictions = np.argpartition(-probs, topk - 1, axis=-1)[:, :topk]
+        values = np.take_along_axis(probs, predictions, axis=-1)
+        order = np.argsort(-values, axis=-1, kind="stable")
+        predictions = np.take_along_axis(predictions, order, axis=-1)
+        values = np.take_along_axis(values, order, axis=-1)
+
+        # The sequences are the decoded texts with the candidates spliced in place of their mask: a candidate is
+        # decoded after a mask token, which gives how it joins the text before it, in place of the separator
+        # between this text and the mask. The tokenization spaces are cleaned up once spliced, as the clean up can
+        # rewrite the text across the mask (e.g. "do not" to "don't")
+        mask_token, mask_token_id = self.tokenizer.mask_token, self.tokenizer.mask_token_id
+        separator = self.tokenizer.decode([mask_token_id, mask_token_id], clean_up_tokenization_spaces=False)[
+            len(mask_token) : -len(mask_token)
+        ]
+        candidates = {}
+        for token in np.unique(predictions).tolist():
+            candidate = self.tokenizer.decode([mask_token_id, token], clean_up_tokenization_spaces=False)
+            candidates[token] = candidate[len(mask_token) :] if candidate.startswith(mask_token) else candidate
 
         results = []
-        batch_size = outputs.shape[0] if self.framework == "tf" else outputs.size(0)
-
-        for i in range(batch_size):
-            input_ids = inputs["input_ids"][i]
+        mask_offsets = np.cumsum(num_masks) - num_masks
+        for i, ids in enumerate(encoded_inputs["input_ids"]):
+            parts = self.tokenizer.decode(ids, clean_up_tokenization_spaces=False).split(mask_token)
+            if len(parts) != num_masks[i] + 1:
+                raise ValueError("The decoded text of {} doesn't hold all its mask tokens".format(texts[i]))
             result = []
-
-            if self.framework == "tf":
-                masked_index = tf.where(input_ids == self.tokenizer.mask_token_id).numpy().item()
-                logits = outputs[i, masked_index, :]
-                probs = tf.nn.softmax(logits)
-                topk = tf.math.top_k(probs, k=self.topk)
-                values, predictions = topk.values.numpy(), topk.indices.numpy()
-            else:
-                masked_index = (input_ids == self.tokenizer.mask_token_id).nonzero().item()
-                logits = outputs[i, masked_index, :]
-                probs = logits.softmax(dim=0)
-                values, predictions = probs.topk(self.topk)
-
-            for v, p in zip(values.tolist(), predictions.tolist()):
-                tokens = input_ids.numpy()
-                tokens[masked_index] = p
-                # Filter padding out:
-                tokens = tokens[np.where(tokens != self.tokenizer.pad_token_id)]
-                result.append({"sequence": self.tokenizer.decode(tokens), "score": v, "token": p})
-
-            # Append
-            results += [result]
+            for j in range(num_masks[i]):
+                prefix, suffix = mask_token.join(parts[: j + 1]), mask_token.join(parts[j + 1 :])
+                if separator and prefix.endswith(separator):
+                    prefix = prefix[: -len(separator)]
+                mask = mask_offsets[i] + j
+                result.append(
+                    [
+                        {
+                            "sequence": self.tokenizer.clean_up_tokenization(prefix + candidates[token] + suffix),
+                            "score": score,
+                            "token": token,
+                        }
+                        for score, token in zip(values[mask].tolist(), predictions[mask].tolist())
+                    ]
+                )
+            results.append(result[0] if len(result) == 1 else result)
 
         if len(results) == 1:
             return results[0]
@@ -734,6 +1194,7 @@ class NerPipeline(Pipeline):
     """
 
     default_input_names = "sequences"
+    _unwraps_single_output = True
 
     def __init__(
         self,
@@ -746,6 +1207,8 @@ class NerPipeline(Pipeline):
         binary_output: bool = False,
         ignore_labels=["O"],
         task: str = "",
+        batch_size: int = 8,
+        grouped_entities: bool = False,
     ):
         super().__init__(
             model=model,
@@ -760,52 +1223,106 @@ class NerPipeline(Pipeline):
 
         self._basic_tokenizer = BasicTokenizer(do_lower_case=False)
         self.ignore_labels = ignore_labels
+        self.batch_size = batch_size
+        self.grouped_entities = grouped_entities
 
     def __call__(self, *texts, **kwargs):
+        """
+        Args:
+            texts: (str, List[str]) sentence(s) in which to look for entities
+            batch_size: (int, default to the one of the pipeline) number of sentences run in each forward pass, each
+                batch being padded to its longest sentence only
+            grouped_entities: (bool, default to the one of the pipeline) whether to group the adjacent tokens of the
+                same entity (e.g. the sub-tokens of a word, or the words of a name) in a single entity
+        Returns:
+            List of the entities of each sentence, dicts {'word': str, 'score': float, 'entity': str} (or
+            {'word': str, 'score': float, 'entity_group': str} with the mean score of the tokens of the group)
+        """
+        batch_size = kwargs.pop("batch_size", self.batch_size)
+        grouped_entities = kwargs.pop("grouped_entities", self.grouped_entities)
         inputs = self._args_parser(*texts, **kwargs)
-        answers = []
-        for sentence in inputs:
 
-            # Manage correct placement of the tensors
-            with self.device_placement():
+        # Tokenize all the sentences at once, padding is done by batch
+        encoded_inputs = self.tokenizer.batch_encode_plus(
+            inputs, add_special_tokens=True, max_length=self.tokenizer.max_len, return_attention_masks=False
+        )
+        id2label = self.model.config.id2label
+        labels = np.array([id2label[i] for i in range(len(id2label))])
+        kept_labels = np.array([label not in self.ignore_labels for label in labels])
 
-                tokens = self.tokenizer.encode_plus(
-                    sentence,
-                    return_attention_mask=False,
-                    return_tensors=self.framework,
-                    max_length=self.tokenizer.max_len,
+        answers = []
+        for batch_start in range(0, len(inputs), batch_size):
+            tokens = self._pad(encoded_inputs, range(batch_start, min(batch_start + batch_size, len(inputs))))
+            entities = self._forward(tokens)
+            input_ids = np.array(tokens["input_ids"])
+            attention_mask = np.array(tokens["attention_mask"])
+
+            # Softmax, best label and filtering of the whole batch at once
+            entities = np.exp(entities - entities.max(axis=-1, keepdims=True))
+            labels_idx = entities.argmax(axis=-1)
+            scores = np.take_along_axis(entities, labels_idx[..., None], axis=-1)[..., 0] / entities.sum(axis=-1)
+            kept = kept_labels[labels_idx] & (attention_mask == 1)
+
+            # Entities of each sentence, in the order of the tokens
+            sentence_idx, token_idx = np.nonzero(kept)
+            words = self.tokenizer.convert_ids_to_tokens(input_ids[sentence_idx, token_idx].tolist())
+            entity_labels = labels[labels_idx[sentence_idx, token_idx]]
+            entity_scores = scores[sentence_idx, token_idx]
+            if grouped_entities:
+                answers += self._group_entities(
+                    len(input_ids), sentence_idx, token_idx, words, entity_labels, entity_scores
                 )
-
-                # Forward
-                if self.framework == "tf":
-                    entities = self.model(tokens.data)[0][0].numpy()
-                    input_ids = tokens["input_ids"].numpy()[0]
-                else:
-                    with torch.no_grad():
-                        tokens = self.ensure_tensor_on_device(**tokens)
-                        entities = self.model(**tokens)[0][0].cpu().numpy()
-                        input_ids = tokens["input_ids"].cpu().numpy()[0]
-
-            score = np.exp(entities) / np.exp(entities).sum(-1, keepdims=True)
-            labels_idx = score.argmax(axis=-1)
-
-            answer = []
-            for idx, label_idx in enumerate(labels_idx):
-                if self.model.config.id2label[label_idx] not in self.ignore_labels:
-                    answer += [
-                        {
-                            "word": self.tokenizer.convert_ids_to_tokens(int(input_ids[idx])),
-                            "score": score[idx][label_idx].item(),
-                            "entity": self.model.config.id2label[label_idx],
-                        }
+            else:
+                boundaries = np.searchsorted(sentence_idx, np.arange(len(input_ids) + 1))
+                answers += [
+                    [
+                        {"word": word, "score": score.item(), "entity": entity}
+                        for word, score, entity in zip(
+                            words[begin:end], entity_scores[begin:end], entity_labels[begin:end].tolist()
+                        )
                     ]
+                    for begin, end in zip(boundaries[:-1], boundaries[1:])
+                ]
 
-            # Append
-            answers += [answer]
         if len(answers) == 1:
             return answers[0]
         return answers
 
+    def _group_entities(self, num_sentences, sentence_idx, token_idx, words, entity_labels, entity_scores):
+        """
+        Groups the adjacent tokens of the same entity type (the label without its B-/I- prefix), given the sentence
+        and token indices, words, labels and scores of the entities of a batch of `num_sentences` sentences. A B- label
+        begins a new entity, unless it is on a sub-token (starting with ``##``) of the word of the previous token.
+        """
+        entity_labels = entity_labels.tolist()
+        entity_types = np.array([label.split("-", 1)[-1] for label in entity_labels], dtype=object)
+        begins = np.array(
+            [label.startswith("B-") and not word.startswith("##") for label, word in zip(entity_labels, words)],
+            dtype=bool,
+        )
+        # A group starts at each entity which doesn't continue an entity of the same type in the same sentence
+        starts = np.ones(len(token_idx), dtype=bool)
+        starts[1:] = (
+            (sentence_idx[1:] != sentence_idx[:-1])
+            | (token_idx[1:] != token_idx[:-1] + 1)
+            | (entity_types[1:] != entity_types[:-1])
+            | begins[1:]
+        )
+        group_starts = np.nonzero(starts)[0]
+        group_ends = np.append(group_starts[1:], len(token_idx))
+        group_scores = np.add.reduceat(entity_scores, group_starts) / (group_ends - group_starts) if len(words) else []
+
+        answers = [[] for _ in range(num_sentences)]
+        for begin, end, score in zip(group_starts, group_ends, group_scores):
+            answers[sentence_idx[begin]].append(
+                {
+                    "word": self.tokenizer.convert_tokens_to_string(words[begin:end]),
+                    "score": score.item(),
+                    "entity_group": entity_types[begin],
+                }
+            )
+        return answers
+
 
 TokenClassificationPipeline = NerPipeline
 
@@ -960,6 +1477,8 @@ class QuestionAnsweringPipeline(Pipeline):
             data: sequence of SquadExample
             question: (str, List[str]), batch of question(s) to map along with context
             context: (str, List[str]), batch of context(s) associated with the provided question keyword argument
+            batch_size: (int, default 32), number of features (windows of the contexts) of all the examples run in
+                each forward pass
         Returns:
             dict: {'answer': str, 'score": float, 'start": int, "end": int}
             answer: the textual answer in the intial context
@@ -967,12 +1486,24 @@ class QuestionAnsweringPipeline(Pipeline):
             start: the character index in the original string corresponding to the beginning of the answer' span
             end: the character index in the original string corresponding to the ending of the answer' span
         """
+        all_answers = [answer for answers in self._answers(*texts, **kwargs) for answer in answers]
+        if len(all_answers) == 1:
+            return all_answers[0]
+        return all_answers
+
+    def outputs_per_input(self, inputs: List, **kwargs) -> List:
+        # The answers of all the examples are returned in a single list by __call__
+        return [answers[0] if len(answers) == 1 else answers for answers in self._answers(inputs, **kwargs)]
+
+    def _answers(self, *texts, **kwargs) -> List[List[dict]]:
+        """ The `topk` best answers of each example, best first (see :func:`__call__`). """
         # Set defaults values
         kwargs.setdefault("topk", 1)
         kwargs.setdefault("doc_stride", 128)
         kwargs.setdefault("max_answer_len", 15)
         kwargs.setdefault("max_seq_len", 384)
         kwargs.setdefault("max_question_len", 64)
+        kwargs.setdefault("batch_size", 32)
 
         if kwargs["topk"] < 1:
             raise ValueError("topk parameter should be >= 1 (got {})".format(kwargs["topk"]))
@@ -980,73 +1511,78 @@ class QuestionAnsweringPipeline(Pipeline):
         if kwargs["max_answer_len"] < 1:
             raise ValueError("max_answer_len parameter should be >= 1 (got {})".format(kwargs["max_answer_len"]))
 
-        # Convert inputs to features
+        if kwargs["batch_size"] < 1:
+            raise ValueError("batch_size parameter should be >= 1 (got {})".format(kwargs["batch_size"]))
+
+        # Convert inputs to features: the features of all the examples (one per window of `doc_stride` over the
+        # context) are pooled and run by batches of `batch_size` features
         examples = self._args_parser(*texts, **kwargs)
-        features_list = [
-            squad_convert_examples_to_features(
-                [example],
-                self.tokenizer,
-                kwargs["max_seq_len"],
-                kwargs["doc_stride"],
-                kwargs["max_question_len"],
-                False,
-            )
-            for example in examples
-        ]
-        all_answers = []
-        for features, example in zip(features_list, examples):
-            fw_args = self.inputs_for_model([f.__dict__ for f in features])
+        features = squad_convert_examples_to_features(
+            examples, self.tokenizer, kwargs["max_seq_len"], kwargs["doc_stride"], kwargs["max_question_len"], False,
+        )
+        batch_size = kwargs["batch_size"]
+        example_answers = [[] for _ in examples]
+        word_char_offsets = {}
+        for batch_start in range(0, len(features), batch_size):
+            batch = features[batch_start : batch_start + batch_size]
+            fw_args = self.inputs_for_model([f.__dict__ for f in batch])
 
             # Manage tensor allocation on correct device
             with self.device_placement():
                 if self.framework == "tf":
                     fw_args = {k: tf.constant(v) for (k, v) in fw_args.items()}
-                    start, end = self.model(fw_args)
+                    start, end = self.model(fw_args)[:2]
                     start, end = start.numpy(), end.numpy()
                 else:
                     with torch.no_grad():
-                        # Retrieve the score for the context tokens only (removing question tokens)
                         fw_args = {k: torch.tensor(v, device=self.device) for (k, v) in fw_args.items()}
-                        start, end = self.model(**fw_args)
+                        start, end = self.model(**fw_args)[:2]
                         start, end = start.cpu().numpy(), end.cpu().numpy()
 
-            answers = []
-            for (feature, start_, end_) in zip(features, start, end):
-                # Normalize logits and spans to retrieve the answer
-                start_ = np.exp(start_) / np.sum(np.exp(start_))
-                end_ = np.exp(end_) / np.sum(np.exp(end_))
-
-                # Mask padding and question
-                start_, end_ = (
-                    start_ * np.abs(np.array(feature.p_mask) - 1),
-                    end_ * np.abs(np.array(feature.p_mask) - 1),
-                )
-
-                # TODO : What happens if not possible
-                # Mask CLS
-                start_[0] = end_[0] = 0
-
-                starts, ends, scores = self.decode(start_, end_, kwargs["topk"], kwargs["max_answer_len"])
-                char_to_word = np.array(example.char_to_word_offset)
+            # Normalize logits and retrieve the score of the context tokens only (removing question, padding and CLS)
+            p_mask = np.array([feature.p_mask for feature in batch])
+            start, end = self._span_probabilities(start, p_mask), self._span_probabilities(end, p_mask)
+            starts, ends, scores = self.decode_batch(start, end, kwargs["topk"], kwargs["max_answer_len"])
+
+            for feature, feature_starts, feature_ends, feature_scores in zip(batch, starts, ends, scores):
+                example = examples[feature.example_index]
+                if feature.example_index not in word_char_offsets:
+                    # Index of the first and last character of each word of the context
+                    char_to_word = np.array(example.char_to_word_offset)
+                    words = np.arange(len(example.doc_tokens))
+                    word_char_offsets[feature.example_index] = (
+                        np.searchsorted(char_to_word, words, side="left"),
+                        np.searchsorted(char_to_word, words, side="right") - 1,
+                    )
+                word_starts, word_ends = word_char_offsets[feature.example_index]
 
                 # Convert the answer (tokens) back to the original text
-                answers += [
+                example_answers[feature.example_index] += [
                     {
                         "score": score.item(),
-                        "start": np.where(char_to_word == feature.token_to_orig_map[s])[0][0].item(),
-                        "end": np.where(char_to_word == feature.token_to_orig_map[e])[0][-1].item(),
+                        "start": word_starts[feature.token_to_orig_map[s]].item(),
+                        "end": word_ends[feature.token_to_orig_map[e]].item(),
                         "answer": " ".join(
                             example.doc_tokens[feature.token_to_orig_map[s] : feature.token_to_orig_map[e] + 1]
                         ),
                     }
-                    for s, e, score in zip(starts, ends, scores)
+                    for s, e, score in zip(feature_starts, feature_ends, feature_scores)
                 ]
-            answers = sorted(answers, key=lambda x: x["score"], reverse=True)[: kwargs["topk"]]
-            all_answers += answers
 
-        if len(all_answers) == 1:
-            return all_answers[0]
-        return all_answers
+        return [
+            sorted(answers, key=lambda x: x["score"], reverse=True)[: kwargs["topk"]] for answers in example_answers
+        ]
+
+    @staticmethod
+    def _span_probabilities(logits: np.ndarray, p_mask: np.ndarray) -> np.ndarray:
+        """
+        Softmax of the (batch_size, seq_len) start or end logits, with the tokens which can't be part of the answer
+        (question, padding and CLS) set to 0.
+        """
+        probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = probs / probs.sum(axis=-1, keepdims=True) * (1 - p_mask)
+        probs[:, 0] = 0
+        return probs
 
     def decode(self, start: np.ndarray, end: np.ndarray, topk: int, max_answer_len: int) -> Tuple:
         """
@@ -1069,24 +1605,35 @@ class QuestionAnsweringPipeline(Pipeline):
         if end.ndim == 1:
             end = end[None]
 
-        # Compute the score of each tuple(start, end) to be the real answer
-        outer = np.matmul(np.expand_dims(start, -1), np.expand_dims(end, 1))
+        starts, ends, scores = self.decode_batch(start, end, topk, max_answer_len)
+        return starts[0], ends[0], scores[0]
+
+    def decode_batch(self, start: np.ndarray, end: np.ndarray, topk: int, max_answer_len: int) -> Tuple:
+        """
+        Batched version of :func:`decode`: returns the start indices, end indices and scores of the `topk` best
+        spans of each of the (batch_size, seq_len) `start` and `end` probabilities, as (batch_size, topk) arrays.
 
-        # Remove candidate with end < start and end - start > max_answer_len
-        candidates = np.tril(np.triu(outer), max_answer_len - 1)
+        Only the spans of at most `max_answer_len` tokens are scored, i.e. a (batch_size, seq_len, max_answer_len)
+        band of the (seq_len, seq_len) outer product of the start and end probabilities.
+        """
+        batch_size, seq_len = start.shape
+        width = min(max_answer_len, seq_len)
 
         #  Inspired by Chen & al. (https://github.com/facebookresearch/DrQA)
-        scores_flat = candidates.flatten()
+        # Score of each span (start, start + offset), 0 for the spans ending after the sequence
+        end_indices = np.arange(seq_len)[:, None] + np.arange(width)[None, :]
+        candidates = start[:, :, None] * end[:, np.minimum(end_indices, seq_len - 1)] * (end_indices < seq_len)
+
+        scores_flat = candidates.reshape(batch_size, -1)
+        topk = min(topk, scores_flat.shape[1])
         if topk == 1:
-            idx_sort = [np.argmax(scores_flat)]
-        elif len(scores_flat) < topk:
-            idx_sort = np.argsort(-scores_flat)
+            idx_sort = scores_flat.argmax(axis=1)[:, None]
         else:
-            idx = np.argpartition(-scores_flat, topk)[0:topk]
-            idx_sort = idx[np.argsort(-scores_flat[idx])]
+            idx = np.argpartition(-scores_flat, topk - 1, axis=1)[:, :topk]
+            idx_sort = np.take_along_axis(idx, np.argsort(-np.take_along_axis(scores_flat, idx, axis=1)), axis=1)
 
-        start, end = np.unravel_index(idx_sort, candidates.shape)[1:]
-        return start, end, candidates[0, start, end]
+        starts, offsets = np.divmod(idx_sort, width)
+        return starts, starts + offsets, np.take_along_axis(scores_flat, idx_sort, axis=1)
 
     def span_to_answer(self, text: str, start: int, end: int):
         """
@@ -1133,7 +1680,157 @@ class QuestionAnsweringPipeline(Pipeline):
         }
 
 
-class SummarizationPipeline(Pipeline):
+class _GenerationPipeline(Pipeline):
+    """
+    Base class of the pipelines generating a text from each input text (summarization and translation). The texts
+    are run in micro-batches of at most `batch_size` texts of similar lengths, and their results are reassembled in
+    the order of the texts.
+    """
+
+    # Prefix of the keys of the results, e.g. "summary" for "summary_text" and "summary_token_ids"
+    result_name = None
+
+    def __init__(
+        self,
+        model: Union["PreTrainedModel", "TFPreTrainedModel"],
+        tokenizer: PreTrainedTokenizer,
+        modelcard: Optional[ModelCard] = None,
+        framework: Optional[str] = None,
+        args_parser: ArgumentHandler = None,
+        device: int = -1,
+        binary_output: bool = False,
+        task: str = "",
+        batch_size: int = 8,
+        sort_by_length: bool = True,
+    ):
+        super().__init__(
+            model=model,
+            tokenizer=tokenizer,
+            modelcard=modelcard,
+            framework=framework,
+            args_parser=args_parser,
+            device=device,
+            binary_output=binary_output,
+            task=task,
+        )
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+
+    def _check_inputs(self, input_length: int, generate_kwargs: dict):
+        """ Checks the length of the longest tokenized text of a call against the generation parameters. """
+        pass
+
+    def _parse_texts(self, texts):
+        if len(texts) == 0:
+            raise ValueError("Please provide a text to the pipeline")
+        if isinstance(texts[0], list):
+            return texts[0]
+        elif isinstance(texts[0], str):
+            return [texts[0]]
+        raise ValueError(
+            " `texts[0]`: {} have the wrong format. The should be either of type `str` or type `list`".format(texts[0])
+        )
+
+    def _generate(
+        self,
+        texts: List[str],
+        batch_size: int,
+        sort_by_length: bool,
+        return_tensors: bool,
+        return_text: bool,
+        clean_up_tokenization_spaces: bool,
+        generate_kwargs: dict,
+    ) -> List[dict]:
+        """ Results of `texts`, in their order. """
+        if not (return_tensors or return_text):
+            raise ValueError("You must specify return_tensors=True or return_text=True")
+        if batch_size < 1:
+            raise ValueError("batch_size should be at least 1, got {}".format(batch_size))
+
+        prefix = self.model.config.prefix if self.model.config.prefix is not None else ""
+        encoded_inputs = self.tokenizer.batch_encode_plus(
+            [prefix + text for text in texts],
+            add_special_tokens=True,
+            max_length=self.tokenizer.max_len,
+            return_attention_masks=False,
+        )
+        lengths = [len(input_ids) for input_ids in encoded_inputs["input_ids"]]
+        self._check_inputs(max(lengths), generate_kwargs)
+
+        order = np.argsort(lengths, kind="stable") if sort_by_length else np.arange(len(lengths))
+        results = [None] * len(texts)
+        for batch_start in range(0, len(order), batch_size):
+            indices = order[batch_start : batch_start + batch_size].tolist()
+            with self.device_placement():
+                inputs = self._pad(encoded_inputs, indices)
+                if self.framework == "pt":
+                    inputs = self.ensure_tensor_on_device(**inputs)
+                outputs = self.model.generate(
+                    inputs["input_ids"], attention_mask=inputs["attention_mask"], **generate_kwargs
+                )
+
+            for index, output in zip(indices, outputs):
+                record = {}
+                if return_tensors:
+                    record[self.result_name + "_token_ids"] = output
+                if return_text:
+                    record[self.result_name + "_text"] = self.tokenizer.decode(
+                        output, skip_special_tokens=True, clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+                    )
+                results[index] = record
+        return results
+
+    def __call__(
+        self, *texts, return_tensors=False, return_text=True, clean_up_tokenization_spaces=False, **generate_kwargs
+    ):
+        batch_size = generate_kwargs.pop("batch_size", self.batch_size)
+        sort_by_length = generate_kwargs.pop("sort_by_length", self.sort_by_length)
+        return self._generate(
+            self._parse_texts(texts),
+            batch_size,
+            sort_by_length,
+            return_tensors,
+            return_text,
+            clean_up_tokenization_spaces,
+            generate_kwargs,
+        )
+
+    def iter_results(
+        self,
+        texts,
+        window_size: Optional[int] = None,
+        return_tensors=False,
+        return_text=True,
+        clean_up_tokenization_spaces=False,
+        **generate_kwargs
+    ):
+        r"""
+        Generates the results of `texts` (any iterable of strings, e.g. the lines of a file) as they are reached:
+        the texts are read by windows of `window_size` texts (defaults to 32 batches), each window being sorted by
+        length and split in micro-batches. Only the texts and results of one window are held in memory.
+
+        Yields:
+            The result of each text, in the order of the texts (see :func:`__call__`)
+        """
+        batch_size = generate_kwargs.pop("batch_size", self.batch_size)
+        sort_by_length = generate_kwargs.pop("sort_by_length", self.sort_by_length)
+        window_size = window_size or 32 * batch_size
+        texts = iter(texts)
+        window = list(itertools.islice(texts, window_size))
+        while window:
+            yield from self._generate(
+                window,
+                batch_size,
+                sort_by_length,
+                return_tensors,
+                return_text,
+                clean_up_tokenization_spaces,
+                generate_kwargs,
+            )
+            window = list(itertools.islice(texts, window_size))
+
+
+class SummarizationPipeline(_GenerationPipeline):
     """
     Summarize news articles and other documents
 
@@ -1177,8 +1874,15 @@ class SummarizationPipeline(Pipeline):
         device (:obj:`int`, `optional`, defaults to :obj:`-1`):
             Device ordinal for CPU/GPU supports. Setting this to -1 will leverage CPU, >=0 will run the model
             on the associated CUDA device id.
+        batch_size (:obj:`int`, `optional`, defaults to :obj:`8`):
+            Maximum number of texts given to each ``generate`` call.
+        sort_by_length (:obj:`bool`, `optional`, defaults to :obj:`True`):
+            Whether to batch the texts of similar tokenized lengths together, so that each batch is padded as little
+            as possible. The results are returned in the order of the texts in any case.
     """
 
+    result_name = "summary"
+
     def __call__(
         self, *documents, return_tensors=False, return_text=True, clean_up_tokenization_spaces=False, **generate_kwargs
     ):
@@ -1189,6 +1893,10 @@ class SummarizationPipeline(Pipeline):
             return_tensors: (bool, default=False) whether to return the raw "summary_token_ids" to each result
 
             clean_up_tokenization_spaces: (`optional`) bool whether to include extra spaces in the output
+            batch_size: (`optional`) int, default to the one of the pipeline, maximum number of articles summarized
+                in each call of `self.model.generate`_
+            sort_by_length: (`optional`) bool, default to the one of the pipeline, whether to batch articles of
+                similar lengths
             **generate_kwargs: extra kwargs passed to `self.model.generate`_
 
         Returns:
@@ -1198,77 +1906,38 @@ class SummarizationPipeline(Pipeline):
             https://huggingface.co/transformers/model_doc/bart.html#transformers.BartForConditionalGeneration.generate
 
         """
-        assert return_tensors or return_text, "You must specify return_tensors=True or return_text=True"
-        assert len(documents) > 0, "Please provide a document to summarize"
+        return super().__call__(
+            *documents,
+            return_tensors=return_tensors,
+            return_text=return_text,
+            clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+            **generate_kwargs,
+        )
 
+    def _check_inputs(self, input_length, generate_kwargs):
         if self.framework == "tf" and "BartForConditionalGeneration" in self.model.__class__.__name__:
             raise NotImplementedError(
                 "Tensorflow is not yet supported for Bart. Please consider using T5, e.g. `t5-base`"
             )
 
-        prefix = self.model.config.prefix if self.model.config.prefix is not None else ""
-
-        if isinstance(documents[0], list):
-            assert (
-                self.tokenizer.pad_token_id is not None
-            ), "Please make sure that the tokenizer has a pad_token_id when using a batch input"
-
-            documents = ([prefix + document for document in documents[0]],)
-            pad_to_max_length = True
-
-        elif isinstance(documents[0], str):
-            documents = (prefix + documents[0],)
-            pad_to_max_length = False
-        else:
-            raise ValueError(
-                " `documents[0]`: {} have the wrong format. The should be either of type `str` or type `list`".format(
-                    documents[0]
+        min_length = generate_kwargs.get("min_length", self.model.config.min_length)
+        if input_length < min_length // 2:
+            logger.warning(
+                "Your min_length is set to {}, but you input_length is only {}. You might consider decreasing min_length manually, e.g. summarizer('...', min_length=10)".format(
+                    min_length, input_length
                 )
             )
 
-        with self.device_placement():
-            inputs = self._parse_and_tokenize(*documents, pad_to_max_length=pad_to_max_length)
-
-            if self.framework == "pt":
-                inputs = self.ensure_tensor_on_device(**inputs)
-                input_length = inputs["input_ids"].shape[-1]
-            elif self.framework == "tf":
-                input_length = tf.shape(inputs["input_ids"])[-1].numpy()
-
-            min_length = generate_kwargs.get("min_length", self.model.config.min_length)
-            if input_length < min_length // 2:
-                logger.warning(
-                    "Your min_length is set to {}, but you input_length is only {}. You might consider decreasing min_length manually, e.g. summarizer('...', min_length=10)".format(
-                        min_length, input_length
-                    )
-                )
-
-            max_length = generate_kwargs.get("max_length", self.model.config.max_length)
-            if input_length < max_length:
-                logger.warning(
-                    "Your max_length is set to {}, but you input_length is only {}. You might consider decreasing max_length manually, e.g. summarizer('...', max_length=50)".format(
-                        max_length, input_length
-                    )
+        max_length = generate_kwargs.get("max_length", self.model.config.max_length)
+        if input_length < max_length:
+            logger.warning(
+                "Your max_length is set to {}, but you input_length is only {}. You might consider decreasing max_length manually, e.g. summarizer('...', max_length=50)".format(
+                    max_length, input_length
                 )
-
-            summaries = self.model.generate(
-                inputs["input_ids"], attention_mask=inputs["attention_mask"], **generate_kwargs,
             )
 
-            results = []
-            for summary in summaries:
-                record = {}
-                if return_tensors:
-                    record["summary_token_ids"] = summary
-                if return_text:
-                    record["summary_text"] = self.tokenizer.decode(
-                        summary, skip_special_tokens=True, clean_up_tokenization_spaces=clean_up_tokenization_spaces,
-                    )
-                results.append(record)
-            return results
-
 
-class TranslationPipeline(Pipeline):
+class TranslationPipeline(_GenerationPipeline):
     """
     Translates from one language to another.
 
@@ -1302,8 +1971,15 @@ class TranslationPipeline(Pipeline):
         device (:obj:`int`, `optional`, defaults to :obj:`-1`):
             Device ordinal for CPU/GPU supports. Setting this to -1 will leverage CPU, >=0 will run the model
             on the associated CUDA device id.
+        batch_size (:obj:`int`, `optional`, defaults to :obj:`8`):
+            Maximum number of texts given to each ``generate`` call.
+        sort_by_length (:obj:`bool`, `optional`, defaults to :obj:`True`):
+            Whether to batch the texts of similar tokenized lengths together, so that each batch is padded as little
+            as possible. The results are returned in the order of the texts in any case.
     """
 
+    result_name = "translation"
+
     def __call__(
         self, *texts, return_tensors=False, return_text=True, clean_up_tokenization_spaces=False, **generate_kwargs
     ):
@@ -1313,6 +1989,10 @@ class TranslationPipeline(Pipeline):
             return_text: (bool, default=True) whether to add a decoded "translation_text" to each result
             return_tensors: (bool, default=False) whether to return the raw "translation_token_ids" to each result
 
+            batch_size: (`optional`) int, default to the one of the pipeline, maximum number of texts translated in
+                each call of `self.model.generate`_
+            sort_by_length: (`optional`) bool, default to the one of the pipeline, whether to batch texts of similar
+                lengths
             **generate_kwargs: extra kwargs passed to `self.model.generate`_
 
         Returns:
@@ -1320,61 +2000,22 @@ class TranslationPipeline(Pipeline):
         .. _`self.model.generate`:
             https://huggingface.co/transformers/model_doc/bart.html#transformers.BartForConditionalGeneration.generate
         """
-        assert return_tensors or return_text, "You must specify return_tensors=True or return_text=True"
-
-        prefix = self.model.config.prefix if self.model.config.prefix is not None else ""
-
-        if isinstance(texts[0], list):
-            assert (
-                self.tokenizer.pad_token_id is not None
-            ), "Please make sure that the tokenizer has a pad_token_id when using a batch input"
-            texts = ([prefix + text for text in texts[0]],)
-            pad_to_max_length = True
-
-        elif isinstance(texts[0], str):
-            texts = (prefix + texts[0],)
-            pad_to_max_length = False
-        else:
-            raise ValueError(
-                " `documents[0]`: {} have the wrong format. The should be either of type `str` or type `list`".format(
-                    texts[0]
-                )
-            )
-
-        with self.device_placement():
-            inputs = self._parse_and_tokenize(*texts, pad_to_max_length=pad_to_max_length)
-
-            if self.framework == "pt":
-                inputs = self.ensure_tensor_on_device(**inputs)
-                input_length = inputs["input_ids"].shape[-1]
-
-            elif self.framework == "tf":
-                input_length = tf.shape(inputs["input_ids"])[-1].numpy()
+        return super().__call__(
+            *texts,
+            return_tensors=return_tensors,
+            return_text=return_text,
+            clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+            **generate_kwargs,
+        )
 
-            max_length = generate_kwargs.get("max_length", self.model.config.max_length)
-            if input_length > 0.9 * max_length:
-                logger.warning(
-                    "Your input_length: {} is bigger than 0.9 * max_length: {}. You might consider increasing your max_length manually, e.g. translator('...', max_length=400)".format(
-                        input_length, max_length
-                    )
+    def _check_inputs(self, input_length, generate_kwargs):
+        max_length = generate_kwargs.get("max_length", self.model.config.max_length)
+        if input_length > 0.9 * max_length:
+            logger.warning(
+                "Your input_length: {} is bigger than 0.9 * max_length: {}. You might consider increasing your max_length manually, e.g. translator('...', max_length=400)".format(
+                    input_length, max_length
                 )
-
-            translations = self.model.generate(
-                inputs["input_ids"], attention_mask=inputs["attention_mask"], **generate_kwargs,
             )
-            results = []
-            for translation in translations:
-                record = {}
-                if return_tensors:
-                    record["translation_token_ids"] = translation
-                if return_text:
-                    record["translation_text"] = self.tokenizer.decode(
-                        translation,
-                        skip_special_tokens=True,
-                        clean_up_tokenization_spaces=clean_up_tokenization_spaces,
-                    )
-                results.append(record)
-            return results
 
 
 # Register all the supported task here
@@ -1484,6 +2125,7 @@ def pipeline(
     config: Optional[Union[str, PretrainedConfig]] = None,
     tokenizer: Optional[Union[str, PreTrainedTokenizer]] = None,
     framework: Optional[str] = None,
+    backend: Optional[str] = None,
     **kwargs
 ) -> Pipeline:
     """
@@ -1509,7 +2151,8 @@ def pipeline(
             The model that will be used by the pipeline to make predictions. This can be :obj:`None`, a string
             checkpoint identifier or an actual pre-trained model inheriting from
             :class:`~transformers.PreTrainedModel` for PyTorch and :class:`~transformers.TFPreTrainedModel` for
-            TensorFlow.
+            TensorFlow. Directories of :func:`~transformers.PreTrainedModel.export_torchscript` exports are loaded
+            as a :class:`~transformers.TorchScriptModel`.
 
             If :obj:`None`, the default of the pipeline will be loaded.
         config (:obj:`str` or :obj:`~transformers.PretrainedConfig`, `optional`, defaults to :obj:`None`):
@@ -1530,6 +2173,12 @@ def pipeline(
 
             If no framework is specified, will default to the one currently installed. If no framework is specified
             and both frameworks are installed, will default to PyTorch.
+        backend (:obj:`str`, `optional`, defaults to :obj:`None`):
+            The runtime executing the model, one of ``PIPELINE_BACKENDS``: :obj:`None` for the framework itself or
+            "onnx" for ONNX Runtime (PyTorch only). With "onnx", `model` is either a directory exported with
+            ``transformers-cli convert --to onnx`` or a PyTorch model, exported in memory (see
+            :class:`~transformers.OnnxModel`).
+            The pre- and post-processing of the pipeline are the same for all backends.
 
     Returns:
         :class:`~transformers.Pipeline`: Class inheriting from :class:`~transformers.Pipeline`, according to
@@ -1559,7 +2208,12 @@ def pipeline(
     if task not in SUPPORTED_TASKS:
         raise KeyError("Unknown task {}, available tasks are {}".format(task, list(SUPPORTED_TASKS.keys())))
 
+    if backend not in PIPELINE_BACKENDS:
+        raise KeyError("Unknown backend {}, available backends are {}".format(backend, PIPELINE_BACKENDS))
+
     framework = framework or get_framework(model)
+    if backend == "onnx" and framework != "pt":
+        raise ValueError("The ONNX backend runs models exported from PyTorch, it requires the framework 'pt'")
 
     targeted_task = SUPPORTED_TASKS[task]
     task_class, model_class = targeted_task["impl"], targeted_task[framework]
@@ -1621,6 +2275,16 @@ def pipeline(
                 "Model might be a PyTorch model (ending with `.bin`) but PyTorch is not available. "
                 "Trying to load the model with Tensorflow."
             )
-        model = model_class.from_pretrained(model, config=config, **model_kwargs)
+        if backend == "onnx" and os.path.isfile(os.path.join(model, ONNX_WEIGHTS_NAME)):
+            # Export of `transformers-cli convert --to onnx`
+            model = OnnxModel.from_pretrained(model)
+        elif framework == "pt" and os.path.isfile(os.path.join(model, TORCHSCRIPT_CONFIG_NAME)):
+            # Export of `PreTrainedModel.export_torchscript`
+            model = TorchScriptModel.from_pretrained(model)
+        else:
+            model = model_class.from_pretrained(model, config=config, **model_kwargs)
+
+    if backend == "onnx" and not isinstance(model, OnnxModel):
+        model = OnnxModel.from_model(model)
 
     return task_class(model=model, tokenizer=tokenizer, modelcard=modelcard, framework=framework, task=task, **kwargs,)
@@ -19,6 +19,7 @@
 
 
 import glob
+import itertools
 import logging
 import os
 import pickle
@@ -252,6 +253,29 @@ class TransfoXLTokenizer(PreTrainedTokenizer):
 
         return encoded
 
+    def encode_file_stream(self, path, shard=0, num_shards=1, add_eos=True, add_double_eos=False):
+        """ Generator of the token ids of the file `path`, read and tokenized line by line.
+
+            The file is split in `num_shards` byte ranges of equal size, and only the lines starting in the `shard`-th
+            range are read, so that consecutive parts of a long file can be read as parallel streams (see
+            :class:`LMStreamIterator`).
+        """
+        assert os.path.exists(path)
+        size = os.path.getsize(path)
+        begin, end = size * shard // num_shards, size * (shard + 1) // num_shards
+        with open(path, "rb") as f:
+            if begin > 0:
+                # Skip the line started in the previous shard
+                f.seek(begin - 1)
+                f.readline()
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                symbols = self.tokenize(line.decode("utf-8"), add_eos=add_eos, add_double_eos=add_double_eos)
+                for idx in self.convert_tokens_to_ids(symbols):
+                    yield idx
+
     def encode_sents(self, sents, ordered=False, verbose=False):
         if verbose:
             logger.info("encoding {} sents ...".format(len(sents)))
@@ -518,6 +542,44 @@ class LMOrderedIterator(object):
         return self.get_fixlen_iter()
 
 
+class LMStreamIterator(object):
+    def __init__(self, streams, bptt, device="cpu", ext_len=None):
+        """
+            streams -- list of iterables of token ids -- one stream per sequence of the batch (e.g. consecutive parts
+            of a corpus, see `TransfoXLTokenizer.encode_file_stream`), read lazily so that arbitrarily long streams
+            are iterated in constant memory. Yields the same batches as `LMOrderedIterator` and stops at the end of
+            the shortest stream.
+        """
+        self.streams = streams
+        self.bsz = len(streams)
+        self.bptt = bptt
+        self.ext_len = ext_len if ext_len is not None else 0
+
+        self.device = device
+
+    def __iter__(self):
+        iterators = [iter(stream) for stream in self.streams]
+        # Last tokens of the previous batch: the extended context followed by the first input of the next batch
+        first_tokens = [list(itertools.islice(iterator, 1)) for iterator in iterators]
+        if not all(first_tokens):
+            return
+        history = torch.tensor(first_tokens, dtype=torch.long)
+
+        while True:
+            tokens = [list(itertools.islice(iterator, self.bptt)) for iterator in iterators]
+            seq_len = min(len(stream_tokens) for stream_tokens in tokens)
+            if seq_len == 0:
+                return
+            target = torch.tensor([stream_tokens[:seq_len] for stream_tokens in tokens], dtype=torch.long)
+            data = torch.cat([history, target[:, :-1]], dim=1)
+
+            yield data.to(self.device), target.to(self.device), seq_len
+
+            history = torch.cat([history, target], dim=1)[:, -(self.ext_len + 1) :]
+            if seq_len < self.bptt:
+                return
+
+
 class LMShuffledIterator(object):
     def __init__(self, data, bsz, bptt, device="cpu", ext_len=None, shuffle=False):
         """
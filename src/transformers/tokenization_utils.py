@@ -33,8 +33,6 @@ from tokenizers.implementations import BaseTokenizer
 from .file_utils import cached_path, hf_bucket_url, is_remote_url, is_tf_available, is_torch_available
 
 
-if is_tf_available():
-    import tensorflow as tf
 if is_torch_available():
     import torch
 
@@ -1450,6 +1448,8 @@ class PreTrainedTokenizer(SpecialTokensMixin):
             # Do the tensor conversion in batch
             for key, value in batch_outputs.items():
                 if return_tensors == "tf" and is_tf_available():
+                    import tensorflow as tf
+
                     try:
                         batch_outputs[key] = tf.constant(value)
                     except ValueError:
@@ -1648,6 +1648,8 @@ class PreTrainedTokenizer(SpecialTokensMixin):
 
         # Prepare inputs as tensors if asked
         if return_tensors == "tf" and is_tf_available():
+            import tensorflow as tf
+
             encoded_inputs["input_ids"] = tf.constant([encoded_inputs["input_ids"]])
 
             if "token_type_ids" in encoded_inputs:
@@ -1957,6 +1959,8 @@ class PreTrainedTokenizerFast(PreTrainedTokenizer):
 
         # Prepare inputs as tensors if asked
         if return_tensors == "tf" and is_tf_available():
+            import tensorflow as tf
+
             encoding_dict["input_ids"] = tf.constant(encoding_dict["input_ids"])
             if "token_type_ids" in encoding_dict:
                 encoding_dict["token_type_ids"] = tf.constant(encoding_dict["token_type_ids"])
@@ -2153,6 +2157,8 @@ class PreTrainedTokenizerFast(PreTrainedTokenizer):
         for key in tokens[0].keys():
             stack = [e for item in tokens for e in item[key]]
             if return_tensors == "tf":
+                import tensorflow as tf
+
                 stack = tf.stack(stack, axis=0)
             elif return_tensors == "pt":
                 stack = torch.stack(stack, dim=0)
@@ -0,0 +1,194 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+from transformers.file_utils import CACHE_INDEX_NAME, cached_path, get_from_cache, prefetch, read_cache_index
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """ Serves `server.files` (a dict path -> bytes) with ETags and HTTP range requests, like S3 does. """
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_headers(self, content, status=200, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.server.etags.get(self.path, '"{}"'.format(hashlib.md5(content).hexdigest())))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.server.head_requests.append(self.path)
+        if self.path not in self.server.files:
+            self.send_error(404)
+            return
+        self._send_headers(self.server.files[self.path])
+
+    def do_GET(self):
+        if self.path not in self.server.files:
+            self.send_error(404)
+            return
+        content = self.server.files[self.path]
+        range_header = self.headers.get("Range")
+        self.server.requests.append((self.path, range_header))
+        if range_header is None:
+            self._send_headers(content)
+            self.wfile.write(content)
+            return
+        start, end = range_header[len("bytes=") :].split("-")
+        start, end = int(start), int(end) if end else len(content) - 1
+        if start >= len(content):
+            self.send_error(416)
+            return
+        if (self.path, start) in self.server.failing_ranges:
+            self.send_error(500)
+            return
+        chunk = content[start : end + 1]
+        self._send_headers(
+            chunk, status=206, extra_headers={"Content-Range": "bytes {}-{}/{}".format(start, end, len(content))}
+        )
+        self.wfile.write(chunk)
+
+
+class FileUtilsHTTPTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        self.server.files = {}
+        self.server.etags = {}
+        self.server.requests = []
+        self.server.head_requests = []
+        self.server.failing_ranges = set()
+        self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_download_and_cache(self):
+        content = os.urandom(1000)
+        self.server.files["/model/config.json"] = content
+
+        path = get_from_cache(self.base_url + "/model/config.json", cache_dir=self.cache_dir)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(self.server.requests, [("/model/config.json", None)])
+
+        # Second call is served from the cache
+        self.assertEqual(get_from_cache(self.base_url + "/model/config.json", cache_dir=self.cache_dir), path)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_parallel_range_download(self):
+        content = os.urandom(10000)
+        self.server.files["/model/pytorch_model.bin"] = content
+
+        with patch("transformers.file_utils.PARALLEL_DOWNLOAD_THRESHOLD", 1000), patch(
+            "transformers.file_utils.PARALLEL_DOWNLOAD_CHUNK_SIZE", 3000
+        ):
+            path = get_from_cache(self.base_url + "/model/pytorch_model.bin", cache_dir=self.cache_dir)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        ranges = sorted(range_header for _, range_header in self.server.requests)
+        self.assertListEqual(ranges, ["bytes=0-2999", "bytes=3000-5999", "bytes=6000-8999", "bytes=9000-9999"])
+
+    def test_interrupted_parallel_download_is_not_resumed(self):
+        content = os.urandom(10000)
+        self.server.files["/model/pytorch_model.bin"] = content
+        # Multipart S3 uploads and CDNs have ETags which aren't the MD5 of the file
+        self.server.etags["/model/pytorch_model.bin"] = '"0123456789abcdef-2"'
+        self.server.failing_ranges.add(("/model/pytorch_model.bin", 6000))
+        url = self.base_url + "/model/pytorch_model.bin"
+
+        with patch("transformers.file_utils.PARALLEL_DOWNLOAD_THRESHOLD", 1000), patch(
+            "transformers.file_utils.PARALLEL_DOWNLOAD_CHUNK_SIZE", 3000
+        ):
+            with self.assertRaises(EnvironmentError):
+                get_from_cache(url, cache_dir=self.cache_dir, resume_download=True)
+            # No partially written file is left behind to be resumed as if it were complete
+            self.assertListEqual([f for f in os.listdir(self.cache_dir) if not f.endswith(".lock")], [])
+
+            self.server.failing_ranges.clear()
+            path = get_from_cache(url, cache_dir=self.cache_dir, resume_download=True)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_etag_mismatch_is_rejected(self):
+        self.server.files["/model/pytorch_model.bin"] = os.urandom(1000)
+        self.server.etags["/model/pytorch_model.bin"] = '"{}"'.format(hashlib.md5(b"something else").hexdigest())
+
+        with self.assertRaises(EnvironmentError):
+            get_from_cache(self.base_url + "/model/pytorch_model.bin", cache_dir=self.cache_dir)
+        self.assertListEqual([f for f in os.listdir(self.cache_dir) if not f.endswith(".lock")], [])
+
+    def test_prefetch(self):
+        for model in ["model-a", "model-b"]:
+            self.server.files["/{}/config.json".format(model)] = os.urandom(100)
+            self.server.files["/{}/pytorch_model.bin".format(model)] = os.urandom(1000)
+        model_ids = [self.base_url + "/model-a", self.base_url + "/model-b", self.base_url + "/unknown"]
+
+        paths = prefetch(model_ids, cache_dir=self.cache_dir)
+
+        self.assertListEqual(list(paths.keys()), model_ids)
+        self.assertListEqual(paths[self.base_url + "/unknown"], [None, None])
+        for model, model_id in zip(["model-a", "model-b"], model_ids):
+            for path, filename in zip(paths[model_id], ["config.json", "pytorch_model.bin"]):
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), self.server.files["/{}/{}".format(model, filename)])
+            # Prefetched files are then resolved from the cache
+            self.assertEqual(cached_path(model_id + "/config.json", cache_dir=self.cache_dir), paths[model_id][0])
+
+    def test_cache_index_ttl(self):
+        url = self.base_url + "/model/config.json"
+        self.server.files["/model/config.json"] = os.urandom(100)
+
+        path = get_from_cache(url, cache_dir=self.cache_dir)
+        self.assertTrue(os.path.isfile(os.path.join(self.cache_dir, CACHE_INDEX_NAME)))
+        self.assertEqual(read_cache_index(self.cache_dir)[url]["filename"], os.path.basename(path))
+        self.assertEqual(len(self.server.head_requests), 1)
+
+        # Within the TTL the file is resolved without any request
+        self.assertEqual(get_from_cache(url, cache_dir=self.cache_dir, cache_ttl=3600), path)
+        self.assertEqual(len(self.server.head_requests), 1)
+
+        # Without TTL, the ETag is revalidated
+        self.assertEqual(get_from_cache(url, cache_dir=self.cache_dir, cache_ttl=0), path)
+        self.assertEqual(len(self.server.head_requests), 2)
+
+    def test_cache_index_offline(self):
+        url = self.base_url + "/model/config.json"
+        self.server.files["/model/config.json"] = os.urandom(100)
+        path = get_from_cache(url, cache_dir=self.cache_dir)
+
+        # The server can't be reached anymore: the last downloaded file is found through the index
+        del self.server.files["/model/config.json"]
+        with patch("transformers.file_utils.fnmatch.filter") as fnmatch_filter:
+            self.assertEqual(get_from_cache(url, cache_dir=self.cache_dir), path)
+            self.assertEqual(get_from_cache(url, cache_dir=self.cache_dir, local_files_only=True), path)
+            fnmatch_filter.assert_not_called()
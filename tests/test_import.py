@@ -0,0 +1,80 @@
+# coding=utf-8
+# Copyright 2020 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import logging
+import subprocess
+import sys
+import unittest
+
+import transformers
+
+from .utils import require_torch
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_in_subprocess(code):
+    """ Run `code` in a fresh interpreter (so that nothing is imported yet) and return what it printed as JSON. """
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_time(self):
+        result = run_in_subprocess(
+            "import json, sys, time\n"
+            "start = time.time()\n"
+            "import transformers\n"
+            "duration = time.time() - start\n"
+            "modules = [m for m in sys.modules if m.startswith('transformers.')]\n"
+            "frameworks = [m for m in ('torch', 'tensorflow') if m in sys.modules]\n"
+            "print(json.dumps({'duration': duration, 'modules': modules, 'frameworks': frameworks}))\n"
+        )
+        logger.warning("import transformers took {:.3f}s".format(result["duration"]))
+
+        # Only the file utilities are imported eagerly, neither the models nor PyTorch or TensorFlow
+        self.assertListEqual(result["modules"], ["transformers.file_utils"])
+        self.assertListEqual(result["frameworks"], [])
+        # Generous bound: importing the frameworks or the models takes several seconds
+        self.assertLess(result["duration"], 2.0)
+
+    def test_lazy_attribute_only_imports_its_module(self):
+        result = run_in_subprocess(
+            "import json, sys\n"
+            "from transformers import BertConfig\n"
+            "modules = [m for m in sys.modules if m.startswith('transformers.')]\n"
+            "print(json.dumps({'modules': modules, 'config': BertConfig.__module__}))\n"
+        )
+        self.assertEqual(result["config"], "transformers.configuration_bert")
+        self.assertNotIn("transformers.pipelines", result["modules"])
+        self.assertFalse(any(module.startswith("transformers.modeling_") for module in result["modules"]))
+
+    def test_public_api(self):
+        self.assertIn("BertTokenizer", dir(transformers))
+        self.assertIn("BertTokenizer", transformers.__all__)
+        self.assertIs(transformers.BertTokenizer, transformers.tokenization_bert.BertTokenizer)
+        self.assertEqual(transformers.__version__, transformers.file_utils.__version__)
+        with self.assertRaises(AttributeError):
+            transformers.NotAnObject
+
+    @require_torch
+    def test_torch_objects(self):
+        from transformers import BertModel, PreTrainedModel
+
+        self.assertTrue(issubclass(BertModel, PreTrainedModel))
+        self.assertIs(transformers.BertModel, transformers.modeling_bert.BertModel)
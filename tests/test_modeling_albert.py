@@ -24,6 +24,7 @@ from .utils import CACHE_DIR, require_torch, slow, torch_device
 
 
 if is_torch_available():
+    import torch
     from transformers import (
         AlbertConfig,
         AlbertModel,
@@ -208,6 +209,43 @@ class AlbertModelTest(ModelTesterMixin, unittest.TestCase):
             self.parent.assertListEqual(list(result["logits"].size()), [self.batch_size, self.num_labels])
             self.check_loss_output(result)
 
+        def create_and_check_albert_prepared_for_inference(
+            self, config, input_ids, token_type_ids, input_mask, sequence_labels, token_labels, choice_labels
+        ):
+            model = AlbertModel(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                expected = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)[0]
+                model.prepare_for_inference()
+                packed = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)[0]
+            self.parent.assertTrue(torch.allclose(packed, expected, atol=1e-5))
+
+        def create_and_check_albert_early_exit(
+            self, config, input_ids, token_type_ids, input_mask, sequence_labels, token_labels, choice_labels
+        ):
+            config.num_labels = self.num_labels
+            model = AlbertForSequenceClassification(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                expected = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)[0]
+
+                # No example is confident enough to exit before the last layer
+                model.config.early_exit_threshold = 1.1
+                logits = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)[0]
+                self.parent.assertTrue(torch.allclose(logits, expected, atol=1e-5))
+
+                # All the examples exit after the first layer, like with a model of one layer
+                logits, exit_layers = model.early_exit_forward(
+                    input_ids, attention_mask=input_mask, token_type_ids=token_type_ids, threshold=0.0
+                )
+                self.parent.assertListEqual(exit_layers.tolist(), [1] * self.batch_size)
+                model.config.num_hidden_layers = 1
+                model.config.early_exit_threshold = None
+                expected = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)[0]
+                self.parent.assertTrue(torch.allclose(logits, expected, atol=1e-5))
+
         def create_and_check_albert_for_token_classification(
             self, config, input_ids, token_type_ids, input_mask, sequence_labels, token_labels, choice_labels
         ):
@@ -264,6 +302,14 @@ class AlbertModelTest(ModelTesterMixin, unittest.TestCase):
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_albert_for_sequence_classification(*config_and_inputs)
 
+    def test_albert_prepared_for_inference(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_albert_prepared_for_inference(*config_and_inputs)
+
+    def test_albert_early_exit(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_albert_early_exit(*config_and_inputs)
+
     @slow
     def test_model_from_pretrained(self):
         for model_name in list(ALBERT_PRETRAINED_MODEL_ARCHIVE_MAP.keys())[:1]:
@@ -54,6 +54,10 @@ class BertModelTest(ModelTesterMixin, unittest.TestCase):
         if is_torch_available()
         else ()
     )
+    test_unpadded = True
+    test_quantization = True
+    test_torchscript_export = True
+    test_onnx = True
 
     class BertModelTester(object):
         def __init__(
@@ -22,7 +22,7 @@ import unittest
 
 from transformers import is_torch_available
 
-from .utils import require_torch, slow, torch_device
+from .utils import require_onnxruntime, require_torch, slow, torch_device
 
 
 if is_torch_available():
@@ -33,11 +33,17 @@ if is_torch_available():
         AdaptiveEmbedding,
         PretrainedConfig,
         PreTrainedModel,
+        OnnxModel,
+        TorchScriptModel,
         BertModel,
         BertConfig,
         BERT_PRETRAINED_MODEL_ARCHIVE_MAP,
+        MMAP_WEIGHTS_NAME,
+        WEIGHTS_INDEX_NAME,
+        WEIGHTS_NAME,
         top_k_top_p_filtering,
     )
+    from transformers.modeling_utils import Conv1D, load_mmap_state_dict, save_mmap_state_dict
 
 
 def _config_zero_init(config):
@@ -59,6 +65,10 @@ class ModelTesterMixin:
     test_resize_embeddings = True
     test_head_masking = True
     test_missing_keys = True
+    test_unpadded = False
+    test_quantization = False
+    test_torchscript_export = False
+    test_onnx = False
     is_encoder_decoder = False
 
     def test_save_load(self):
@@ -86,6 +96,265 @@ class ModelTesterMixin:
                 max_diff = np.amax(np.abs(out_1 - out_2))
                 self.assertLessEqual(max_diff, 1e-5)
 
+    def test_save_load_low_cpu_mem_usage(self):
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                outputs = model(**inputs_dict)
+            out_2 = outputs[0].cpu().numpy()
+            out_2[np.isnan(out_2)] = 0
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                model.save_pretrained(tmpdirname, mmap_format=True)
+                self.assertTrue(os.path.isfile(os.path.join(tmpdirname, MMAP_WEIGHTS_NAME)))
+                model, loading_info = model_class.from_pretrained(
+                    tmpdirname, low_cpu_mem_usage=True, output_loading_info=True
+                )
+                self.assertEqual(loading_info["error_msgs"], [])
+                model.to(torch_device)
+                with torch.no_grad():
+                    after_outputs = model(**inputs_dict)
+
+                out_1 = after_outputs[0].cpu().numpy()
+                out_1[np.isnan(out_1)] = 0
+                max_diff = np.amax(np.abs(out_1 - out_2))
+                self.assertLessEqual(max_diff, 1e-5)
+
+    def test_save_load_sharded(self):
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                outputs = model(**inputs_dict)
+            out_2 = outputs[0].cpu().numpy()
+            out_2[np.isnan(out_2)] = 0
+
+            total_size = sum(t.numel() * t.element_size() for t in model.state_dict().values())
+            for mmap_format in [False, True]:
+                with tempfile.TemporaryDirectory() as tmpdirname:
+                    model.save_pretrained(tmpdirname, mmap_format=mmap_format, max_shard_size=total_size // 3)
+                    self.assertTrue(os.path.isfile(os.path.join(tmpdirname, WEIGHTS_INDEX_NAME)))
+                    self.assertFalse(os.path.isfile(os.path.join(tmpdirname, WEIGHTS_NAME)))
+                    self.assertFalse(os.path.isfile(os.path.join(tmpdirname, MMAP_WEIGHTS_NAME)))
+                    self.assertGreater(len(os.listdir(tmpdirname)), 4)
+
+                    for low_cpu_mem_usage in [False, True]:
+                        new_model, loading_info = model_class.from_pretrained(
+                            tmpdirname, low_cpu_mem_usage=low_cpu_mem_usage, output_loading_info=True
+                        )
+                        self.assertEqual(loading_info["error_msgs"], [])
+                        new_model.to(torch_device)
+                        with torch.no_grad():
+                            after_outputs = new_model(**inputs_dict)
+
+                        out_1 = after_outputs[0].cpu().numpy()
+                        out_1[np.isnan(out_1)] = 0
+                        max_diff = np.amax(np.abs(out_1 - out_2))
+                        self.assertLessEqual(max_diff, 1e-5)
+
+    def test_fused_qkv(self):
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+
+        def set_fused_qkv(model, fused_qkv):
+            for module in model.modules():
+                if hasattr(module, "fused_qkv"):
+                    module.fused_qkv = fused_qkv
+
+        def check_same_outputs(model):
+            outputs = []
+            for fused_qkv in (False, True):
+                set_fused_qkv(model, fused_qkv)
+                with torch.no_grad():
+                    output = model(**inputs_dict)[0].cpu().numpy()
+                output[np.isnan(output)] = 0
+                outputs.append(output)
+            self.assertLessEqual(np.amax(np.abs(outputs[0] - outputs[1])), 1e-5)
+            return outputs[1]
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+            parameters = list(model.parameters())
+            fused_outputs = check_same_outputs(model)
+            # The packed weights are cached next to the parameters, which are not replaced
+            self.assertTrue(all(a is b for a, b in zip(parameters, model.parameters())))
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                model.save_pretrained(tmpdirname)
+                model = model_class.from_pretrained(tmpdirname, fused_qkv=True)
+                model.to(torch_device)
+                with torch.no_grad():
+                    after_outputs = model(**inputs_dict)[0]
+                self.assertLessEqual((after_outputs - fused_outputs).abs().max().item(), 1e-5)
+
+            if self.test_pruning and "head_mask" not in inputs_dict:
+                model.prune_heads({0: [0]})
+                check_same_outputs(model)
+
+    def test_chunked_attention(self):
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+
+            outputs = []
+            for attention_chunk_size in (None, 2):
+                for module in model.modules():
+                    if hasattr(module, "attention_chunk_size"):
+                        module.attention_chunk_size = attention_chunk_size
+                with torch.no_grad():
+                    output = model(**inputs_dict)[0].cpu().numpy()
+                output[np.isnan(output)] = 0
+                outputs.append(output)
+            self.assertLessEqual(np.amax(np.abs(outputs[0] - outputs[1])), 1e-5)
+
+    def test_unpad_inputs(self):
+        if not self.test_unpadded:
+            return
+
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+        input_ids = inputs_dict["input_ids"]
+        seq_length = input_ids.size(-1)
+        # Right-padded sequences of random lengths
+        lengths = ids_tensor(list(input_ids.size()[:-1]), seq_length) + 1
+        attention_mask = (torch.arange(seq_length, device=torch_device) < lengths.unsqueeze(-1)).long()
+        inputs_dict["attention_mask"] = attention_mask
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+
+            outputs = []
+            for unpad_inputs in (False, True):
+                model.config.unpad_inputs = unpad_inputs
+                with torch.no_grad():
+                    outputs.append(model(**inputs_dict)[0])
+            padded_output, unpadded_output = outputs
+
+            self.assertEqual(padded_output.shape, unpadded_output.shape)
+            if padded_output.size()[: attention_mask.dim()] == attention_mask.size():
+                # Token-level outputs only match on the real tokens, padding tokens are zeros when unpadded
+                padded_output = padded_output[attention_mask.bool()]
+                unpadded_output = unpadded_output[attention_mask.bool()]
+            self.assertLessEqual((padded_output - unpadded_output).abs().max().item(), 1e-5)
+
+    def test_quantize(self):
+        # Dynamically quantized layers only run on CPU
+        if not self.test_quantization or torch_device != "cpu":
+            return
+
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+
+        for model_class in self.all_model_classes:
+            model = model_class(copy.deepcopy(config))
+            model.eval()
+            with torch.no_grad():
+                float_output = model(**inputs_dict)[0]
+
+            model.quantize(dtype="int8")
+            output_embeddings = model.get_output_embeddings()
+            for module in model.modules():
+                if module is not output_embeddings:
+                    self.assertNotIsInstance(module, (torch.nn.Linear, Conv1D))
+            with torch.no_grad():
+                quantized_output = model(**inputs_dict)[0]
+            self.assertEqual(quantized_output.shape, float_output.shape)
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                model.save_pretrained(tmpdirname)
+                model = model_class.from_pretrained(tmpdirname)
+                self.assertEqual(model.config.quantization, {"dtype": "int8", "modules": None})
+                with torch.no_grad():
+                    after_output = model(**inputs_dict)[0]
+                self.assertLessEqual((after_output - quantized_output).abs().max().item(), 1e-5)
+
+    def test_export_torchscript(self):
+        if not self.test_torchscript_export:
+            return
+
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+        input_ids = inputs_dict["input_ids"]
+        batch_size, seq_length = input_ids.size()
+        lengths = ids_tensor([batch_size], seq_length) + 1
+        inputs_dict["attention_mask"] = (torch.arange(seq_length, device=torch_device) < lengths.unsqueeze(-1)).long()
+        # The batch is split in chunks of the largest batch size and the sequences are padded to the next bucket
+        dynamic_axes = {0: [1, batch_size // 2], 1: [seq_length + 1, 2 * seq_length]}
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                outputs = model(**inputs_dict)
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                model.export_torchscript(tmpdirname, inputs_dict, dynamic_axes=dynamic_axes)
+                traced_model = TorchScriptModel.from_pretrained(tmpdirname, map_location=torch_device)
+                with torch.no_grad():
+                    traced_outputs = traced_model(**inputs_dict)
+
+            self.assertIsInstance(traced_model.config, config.__class__)
+            self.assertEqual(len(traced_outputs), len(outputs))
+            for output, traced_output in zip(outputs, traced_outputs):
+                self.assertEqual(output.shape, traced_output.shape)
+                self.assertLessEqual((output - traced_output).abs().max().item(), 1e-5)
+            # Only the traced modules of the buckets used are loaded
+            self.assertIn((batch_size // 2, seq_length + 1), traced_model._traced_modules)
+            self.assertNotIn((batch_size // 2, 2 * seq_length), traced_model._traced_modules)
+
+            # With a single bucket per axis, the output axes which have the size of a bucket by chance (here the
+            # hidden size) are not cropped
+            if config.hidden_size >= seq_length:
+                with tempfile.TemporaryDirectory() as tmpdirname:
+                    model.export_torchscript(
+                        tmpdirname, inputs_dict, dynamic_axes={0: [batch_size], 1: [config.hidden_size]}
+                    )
+                    traced_model = TorchScriptModel.from_pretrained(tmpdirname, map_location=torch_device)
+                    with torch.no_grad():
+                        traced_outputs = traced_model(**inputs_dict)
+                for output, traced_output in zip(outputs, traced_outputs):
+                    self.assertEqual(output.shape, traced_output.shape)
+                    self.assertLessEqual((output - traced_output).abs().max().item(), 1e-5)
+
+    @require_onnxruntime
+    def test_onnx_export(self):
+        if not self.test_onnx:
+            return
+
+        config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
+        input_ids = inputs_dict["input_ids"]
+        batch_size, seq_length = input_ids.size()
+        lengths = ids_tensor([batch_size], seq_length) + 1
+        inputs_dict["attention_mask"] = (torch.arange(seq_length, device=torch_device) < lengths.unsqueeze(-1)).long()
+
+        for model_class in self.all_model_classes:
+            model = model_class(config)
+            model.to(torch_device)
+            model.eval()
+            with torch.no_grad():
+                outputs = model(**inputs_dict)
+
+            # The graph is exported with other batch and sequence sizes than the ones of the inputs
+            onnx_model = OnnxModel.from_model(model)
+            self.assertTrue(set(inputs_dict.keys()) <= set(onnx_model.input_names))
+            onnx_outputs = onnx_model(**inputs_dict)
+
+            self.assertEqual(len(onnx_outputs), len(outputs))
+            for output, onnx_output in zip(outputs, onnx_outputs):
+                self.assertEqual(output.shape, onnx_output.shape)
+                self.assertLessEqual((output.cpu() - onnx_output).abs().max().item(), 1e-4)
+
     def test_initialization(self):
         config, inputs_dict = self.model_tester.prepare_config_and_inputs_for_common()
 
@@ -791,6 +1060,47 @@ class ModelUtilsTest(unittest.TestCase):
             self.assertEqual(model.config.output_hidden_states, True)
             self.assertEqual(model.config, config)
 
+    def test_mmap_state_dict_round_trip(self):
+        state_dict = {
+            "weight": torch.randn(3, 5),
+            "half": torch.randn(7).half(),
+            "index": torch.arange(4),
+            "flag": torch.tensor(True),
+            "empty": torch.zeros(0, 2),
+        }
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, MMAP_WEIGHTS_NAME)
+            save_mmap_state_dict(state_dict, path)
+            loaded = load_mmap_state_dict(path)
+            self.assertListEqual(list(loaded.keys()), list(state_dict.keys()))
+            for key, tensor in state_dict.items():
+                self.assertEqual(loaded[key].dtype, tensor.dtype)
+                self.assertTrue(torch.equal(loaded[key], tensor))
+
+            # Loaded tensors are copy-on-write: the file is left untouched
+            loaded["weight"].zero_()
+            self.assertTrue(torch.equal(load_mmap_state_dict(path)["weight"], state_dict["weight"]))
+
+    def test_low_cpu_mem_usage_legacy_layer_norm_names(self):
+        config = BertConfig(
+            vocab_size=99, hidden_size=32, num_hidden_layers=2, num_attention_heads=4, intermediate_size=37
+        )
+        model = BertModel(config).eval()
+        state_dict = {
+            key.replace("LayerNorm.weight", "LayerNorm.gamma").replace("LayerNorm.bias", "LayerNorm.beta"): value
+            for key, value in model.state_dict().items()
+        }
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            config.save_pretrained(tmpdirname)
+            save_mmap_state_dict(state_dict, os.path.join(tmpdirname, MMAP_WEIGHTS_NAME))
+            new_model, loading_info = BertModel.from_pretrained(
+                tmpdirname, low_cpu_mem_usage=True, output_loading_info=True
+            )
+        for value in loading_info.values():
+            self.assertEqual(len(value), 0)
+        for key, value in model.state_dict().items():
+            self.assertTrue(torch.equal(new_model.state_dict()[key], value), key)
+
 
 @require_torch
 class UtilsFunctionsTest(unittest.TestCase):
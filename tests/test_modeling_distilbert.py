@@ -46,6 +46,10 @@ class DistilBertModelTest(ModelTesterMixin, unittest.TestCase):
     test_torchscript = True
     test_resize_embeddings = True
     test_head_masking = True
+    test_unpadded = True
+    test_quantization = True
+    test_torchscript_export = True
+    test_onnx = True
 
     class DistilBertModelTester(object):
         def __init__(
@@ -20,7 +20,7 @@ from transformers import is_torch_available
 
 from .test_configuration_common import ConfigTester
 from .test_modeling_common import ModelTesterMixin, ids_tensor
-from .utils import CACHE_DIR, require_torch, slow, torch_device
+from .utils import CACHE_DIR, require_onnxruntime, require_torch, slow, torch_device
 
 
 if is_torch_available():
@@ -31,6 +31,7 @@ if is_torch_available():
         GPT2_PRETRAINED_MODEL_ARCHIVE_MAP,
         GPT2LMHeadModel,
         GPT2DoubleHeadsModel,
+        OnnxModel,
     )
 
 
@@ -41,6 +42,7 @@ class GPT2ModelTest(ModelTesterMixin, unittest.TestCase):
     all_generative_model_classes = (
         (GPT2LMHeadModel,) if is_torch_available() else ()
     )  # TODO (PVP): Add Double HeadsModel when generate() function is changed accordingly
+    test_quantization = True
 
     class GPT2ModelTester(object):
         def __init__(
@@ -238,6 +240,27 @@ class GPT2ModelTest(ModelTesterMixin, unittest.TestCase):
             # test that outputs are equal for slice
             self.parent.assertTrue(torch.allclose(output_from_past_slice, output_from_no_past_slice, atol=1e-3))
 
+        def create_and_check_gpt2_onnx_past(self, config, input_ids, *args):
+            model = GPT2LMHeadModel(config)
+            model.to(torch_device)
+            model.eval()
+            onnx_model = OnnxModel.from_model(model, use_past=True)
+
+            # Full sequence without past, then one more token with the past of each model
+            next_tokens = ids_tensor((self.batch_size, 1), config.vocab_size)
+            with torch.no_grad():
+                logits, past = model(input_ids)
+                next_logits, next_past = model(next_tokens, past=past)
+            onnx_logits, onnx_past = onnx_model(input_ids=input_ids)
+            onnx_next_logits, onnx_next_past = onnx_model(input_ids=next_tokens, past=onnx_past)
+
+            self.parent.assertEqual(len(onnx_next_past), config.n_layer)
+            expected = (logits, next_logits) + tuple(past) + tuple(next_past)
+            results = (onnx_logits, onnx_next_logits) + tuple(onnx_past) + tuple(onnx_next_past)
+            for tensor, onnx_tensor in zip(expected, results):
+                self.parent.assertEqual(tensor.shape, onnx_tensor.shape)
+                self.parent.assertLessEqual((tensor.cpu() - onnx_tensor).abs().max().item(), 1e-4)
+
         def create_and_check_lm_head_model(self, config, input_ids, input_mask, head_mask, token_type_ids, *args):
             model = GPT2LMHeadModel(config)
             model.to(torch_device)
@@ -324,6 +347,11 @@ class GPT2ModelTest(ModelTesterMixin, unittest.TestCase):
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_gpt2_model_attention_mask_past(*config_and_inputs)
 
+    @require_onnxruntime
+    def test_gpt2_onnx_past(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_gpt2_onnx_past(*config_and_inputs)
+
     def test_gpt2_lm_head_model(self):
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_lm_head_model(*config_and_inputs)
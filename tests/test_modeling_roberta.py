@@ -41,6 +41,9 @@ if is_torch_available():
 class RobertaModelTest(ModelTesterMixin, unittest.TestCase):
 
     all_model_classes = (RobertaForMaskedLM, RobertaModel) if is_torch_available() else ()
+    test_unpadded = True
+    test_quantization = True
+    test_onnx = True
 
     class RobertaModelTester(object):
         def __init__(
@@ -26,7 +26,7 @@ from .utils import CACHE_DIR, require_torch, slow, torch_device
 if is_torch_available():
     import torch
     from transformers import T5Config, T5Model, T5ForConditionalGeneration
-    from transformers.modeling_t5 import T5_PRETRAINED_MODEL_ARCHIVE_MAP
+    from transformers.modeling_t5 import T5_PRETRAINED_MODEL_ARCHIVE_MAP, T5Attention
     from transformers.tokenization_t5 import T5Tokenizer
 
 
@@ -247,6 +247,31 @@ class T5ModelTest(ModelTesterMixin, unittest.TestCase):
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_t5_with_lm_head(*config_and_inputs)
 
+    def test_relative_position_buckets_cache(self):
+        config = self.model_tester.prepare_config_and_inputs()[0]
+        for is_decoder in (False, True):
+            config.is_decoder = is_decoder
+            attention = T5Attention(config, has_relative_attention_bias=True)
+            attention.to(torch_device)
+            # The last lengths are larger than the table built on first use
+            for qlen, klen, query_offset in [(7, 7, 0), (3, 9, 0), (1, 12, 11), (2 * config.n_positions, 5, 0)]:
+                context_position = torch.arange(query_offset, query_offset + qlen)[:, None]
+                memory_position = torch.arange(klen)[None, :]
+                expected_buckets = T5Attention._relative_position_bucket(
+                    memory_position - context_position,
+                    bidirectional=not is_decoder,
+                    num_buckets=config.relative_attention_num_buckets,
+                )
+                buckets = attention.relative_position_buckets(qlen, klen, query_offset=query_offset)
+                self.assertEqual(buckets.device, attention.relative_attention_bias.weight.device)
+                self.assertListEqual(buckets.tolist(), expected_buckets.tolist())
+
+            # Incremental decoding gets the last row of the bias of the full sequence
+            with torch.no_grad():
+                full_bias = attention.compute_bias(12, 12)
+                last_bias = attention.compute_bias(1, 12, query_offset=11)
+            self.assertTrue(torch.allclose(full_bias[:, :, -1:], last_bias))
+
     @slow
     def test_model_from_pretrained(self):
         for model_name in list(T5_PRETRAINED_MODEL_ARCHIVE_MAP.keys())[:1]:
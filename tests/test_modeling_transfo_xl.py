@@ -26,7 +26,7 @@ from .utils import CACHE_DIR, require_torch, slow, torch_device
 
 if is_torch_available():
     import torch
-    from transformers import TransfoXLConfig, TransfoXLModel, TransfoXLLMHeadModel
+    from transformers import TransfoXLConfig, TransfoXLModel, TransfoXLLMHeadModel, TransfoXLMems
     from transformers.modeling_transfo_xl import TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP
 
 
@@ -182,6 +182,76 @@ class TransfoXLModelTest(ModelTesterMixin, unittest.TestCase):
                 [[self.mem_len, self.batch_size, self.hidden_size]] * self.num_hidden_layers,
             )
 
+        def create_and_check_transfo_xl_mems_buffers(self, config, input_ids_1, input_ids_2, lm_labels):
+            model = TransfoXLLMHeadModel(config)
+            model.to(torch_device)
+            model.eval()
+
+            # By default, the buffers only hold the memory until they are sized for the first segment
+            default_mems = model.init_mems(self.batch_size, use_buffers=True)
+            self.parent.assertEqual(default_mems.buffers[0].size(0), self.mem_len)
+            with torch.no_grad():
+                model(ids_tensor([self.batch_size, self.seq_length], self.vocab_size), mems=default_mems)
+            capacity = self.mem_len + TransfoXLMems.segments_per_move * self.seq_length
+            self.parent.assertEqual(default_mems.capacity, capacity)
+            self.parent.assertEqual(default_mems.buffers[0].size(0), capacity)
+
+            mems = None
+            # A small capacity, so that the buffers are grown and the memory is moved back to their beginning
+            buffered_mems = model.init_mems(self.batch_size, use_buffers=True, capacity=self.mem_len + 5)
+            self.parent.assertIsInstance(buffered_mems, TransfoXLMems)
+            with torch.no_grad():
+                for _ in range(10):
+                    input_ids = ids_tensor([self.batch_size, self.seq_length], self.vocab_size)
+                    lm_logits, mems = model(input_ids, mems=mems)
+                    buffered_lm_logits, buffered_mems = model(input_ids, mems=buffered_mems)
+
+                    self.parent.assertIsInstance(buffered_mems, TransfoXLMems)
+                    self.parent.assertTrue(torch.allclose(buffered_lm_logits, lm_logits, atol=1e-5))
+                    for mem, buffered_mem in zip(mems, buffered_mems):
+                        self.parent.assertTrue(torch.allclose(buffered_mem, mem, atol=1e-5))
+
+        def create_and_check_transfo_xl_adaptive_softmax(self, config, input_ids_1, input_ids_2, lm_labels):
+            model = TransfoXLLMHeadModel(config)
+            model.to(torch_device)
+            model.eval()
+            crit = model.crit
+            hidden = torch.randn(self.batch_size, self.hidden_size, device=torch_device)
+
+            with torch.no_grad():
+                expected = crit(hidden)
+                self.parent.assertTrue(torch.allclose(crit.log_prob(hidden), expected, atol=1e-5))
+                self.parent.assertTrue(
+                    torch.allclose(crit.head_log_prob(hidden)[:, : self.cutoffs[0]], expected[:, : self.cutoffs[0]])
+                )
+                self.parent.assertTrue(
+                    torch.allclose(
+                        crit.tail_log_prob(hidden, 2, crit.head_log_prob(hidden)),
+                        expected[:, self.cutoffs[1] : self.cutoffs[2]],
+                        atol=1e-5,
+                    )
+                )
+
+                # The concatenated weights are kept, and concatenated again once a parameter is modified
+                self.parent.assertIs(crit.cluster_weights()[0][0], crit.cluster_weights()[0][0])
+                crit.cluster_bias.add_(1.0)
+                self.parent.assertTrue(torch.allclose(crit.log_prob(hidden), crit(hidden), atol=1e-5))
+                self.parent.assertFalse(torch.allclose(crit(hidden), expected, atol=1e-5))
+
+                tokens = crit.sample(hidden)
+            self.parent.assertListEqual(list(tokens.size()), [self.batch_size])
+            self.parent.assertTrue(((tokens >= 0) & (tokens < self.vocab_size)).all())
+
+            with torch.no_grad():
+                next_tokens, mems = model.sample_next_tokens(input_ids_1)
+                next_tokens, mems = model.sample_next_tokens(next_tokens.unsqueeze(-1), mems=mems)
+            self.parent.assertListEqual(list(next_tokens.size()), [self.batch_size])
+            self.parent.assertTrue(((next_tokens >= 0) & (next_tokens < self.vocab_size)).all())
+            self.parent.assertListEqual(
+                list(list(mem.size()) for mem in mems),
+                [[self.mem_len, self.batch_size, self.hidden_size]] * self.num_hidden_layers,
+            )
+
         def prepare_config_and_inputs_for_common(self):
             config_and_inputs = self.prepare_config_and_inputs()
             (config, input_ids_1, input_ids_2, lm_labels) = config_and_inputs
@@ -207,6 +277,16 @@ class TransfoXLModelTest(ModelTesterMixin, unittest.TestCase):
         output_result = self.model_tester.create_transfo_xl_lm_head(*config_and_inputs)
         self.model_tester.check_transfo_xl_lm_head_output(output_result)
 
+    def test_transfo_xl_mems_buffers(self):
+        self.model_tester.set_seed()
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_transfo_xl_mems_buffers(*config_and_inputs)
+
+    def test_transfo_xl_adaptive_softmax(self):
+        self.model_tester.set_seed()
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_transfo_xl_adaptive_softmax(*config_and_inputs)
+
     @slow
     def test_model_from_pretrained(self):
         for model_name in list(TRANSFO_XL_PRETRAINED_MODEL_ARCHIVE_MAP.keys())[:1]:
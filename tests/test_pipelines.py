@@ -1,17 +1,40 @@
+import json
+import os
+import pickle
+import tempfile
 import unittest
 from typing import Iterable, List, Optional
 
-from transformers import pipeline
+import numpy as np
+
+from transformers import is_torch_available, pipeline
 from transformers.pipelines import (
     FeatureExtractionPipeline,
     FillMaskPipeline,
     NerPipeline,
     Pipeline,
+    PipelineDataFormat,
     QuestionAnsweringPipeline,
     TextClassificationPipeline,
 )
 
-from .utils import require_tf, require_torch, slow
+from .utils import require_onnxruntime, require_pyarrow, require_tf, require_torch, slow
+
+
+if is_torch_available():
+    from transformers import (
+        BartConfig,
+        BartForConditionalGeneration,
+        BertConfig,
+        BertForMaskedLM,
+        BertForQuestionAnswering,
+        BertForSequenceClassification,
+        BertForTokenClassification,
+        BertModel,
+        BertTokenizer,
+        OnnxModel,
+    )
+    from transformers.convert_graph_to_onnx import convert
 
 
 QA_FINETUNED_MODELS = [
@@ -391,3 +414,404 @@ class PipelineCommonTests(unittest.TestCase):
         for default_pipeline in self.pipelines:
             with self.subTest(msg="Testing Torch defaults with PyTorch and {}".format(default_pipeline.task)):
                 default_pipeline(framework="pt")
+
+
+class PipelineBackendTest(unittest.TestCase):
+    texts = ["the cat sat on the mat", "unwanted running", "the cat"]
+
+    def setUp(self):
+        self.tmpdirname = tempfile.mkdtemp()
+        vocab_tokens = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "cat", "sat", "on", "mat"]
+        vocab_tokens += ["un", "##want", "##ed", "runn", "##ing"]
+        with open(os.path.join(self.tmpdirname, "vocab.txt"), "w", encoding="utf-8") as vocab_writer:
+            vocab_writer.write("".join([token + "\n" for token in vocab_tokens]))
+
+    def _model_and_tokenizer(self):
+        tokenizer = BertTokenizer(os.path.join(self.tmpdirname, "vocab.txt"))
+        config = BertConfig(
+            vocab_size=tokenizer.vocab_size,
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=37,
+        )
+        model = BertForSequenceClassification(config)
+        model.eval()
+        return model, tokenizer
+
+    def _check_same_results(self, results, expected_results):
+        self.assertEqual(len(results), len(expected_results))
+        for result, expected_result in zip(results, expected_results):
+            self.assertEqual(result["label"], expected_result["label"])
+            self.assertAlmostEqual(float(result["score"]), float(expected_result["score"]), places=4)
+
+    @require_torch
+    @require_onnxruntime
+    def test_onnx_backend(self):
+        model, tokenizer = self._model_and_tokenizer()
+        expected_results = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)(self.texts)
+
+        # Model exported in memory
+        nlp = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, backend="onnx")
+        self.assertIsInstance(nlp.model, OnnxModel)
+        self._check_same_results(nlp(self.texts), expected_results)
+
+        # Directory exported by `transformers-cli convert --to onnx`
+        model.save_pretrained(self.tmpdirname)
+        onnx_dirname = os.path.join(self.tmpdirname, "onnx")
+        convert(self.tmpdirname, onnx_dirname, "sentiment-analysis")
+        nlp = pipeline("sentiment-analysis", model=onnx_dirname, tokenizer=onnx_dirname, backend="onnx")
+        self.assertIsInstance(nlp.model, OnnxModel)
+        self._check_same_results(nlp(self.texts), expected_results)
+
+    @require_torch
+    def test_unknown_backend(self):
+        model, tokenizer = self._model_and_tokenizer()
+        with self.assertRaises(KeyError):
+            pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, backend="tensorrt")
+
+
+class PipelineBatchingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdirname = tempfile.mkdtemp()
+        vocab_tokens = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "cat", "sat", "on", "mat", "where", "?"]
+        vocab_tokens += ["un", "##want", "##ed", "runn", "##ing", ",", ".", "do", "not"]
+        with open(os.path.join(self.tmpdirname, "vocab.txt"), "w", encoding="utf-8") as vocab_writer:
+            vocab_writer.write("".join([token + "\n" for token in vocab_tokens]))
+        self.tokenizer = BertTokenizer(os.path.join(self.tmpdirname, "vocab.txt"))
+        self.config = BertConfig(
+            vocab_size=self.tokenizer.vocab_size,
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=37,
+        )
+
+    @require_torch
+    def test_question_answering_batches(self):
+        model = BertForQuestionAnswering(self.config)
+        model.eval()
+        nlp = pipeline("question-answering", model=model, tokenizer=self.tokenizer)
+        samples = [
+            {"question": "where sat the cat ?", "context": "the cat sat on the mat , unwanted running on the mat ."},
+            {"question": "where ?", "context": "the mat sat on the cat ."},
+            {"question": "the cat ?", "context": "running , the cat sat . the mat sat on the cat , unwanted ."},
+        ]
+        # Short windows, so that the contexts are split in several features
+        kwargs = {"topk": 3, "max_seq_len": 16, "doc_stride": 4, "max_question_len": 6, "max_answer_len": 4}
+        expected_answers = [nlp(sample, batch_size=1, **kwargs) for sample in samples]
+        answers = nlp(samples, batch_size=5, **kwargs)
+
+        expected_answers = [answer for sample_answers in expected_answers for answer in sample_answers]
+        self.assertEqual(len(answers), len(expected_answers))
+        for answer, expected_answer in zip(answers, expected_answers):
+            self.assertEqual(answer["answer"], expected_answer["answer"])
+            self.assertEqual((answer["start"], answer["end"]), (expected_answer["start"], expected_answer["end"]))
+            self.assertAlmostEqual(answer["score"], expected_answer["score"], places=5)
+
+    @require_torch
+    def test_question_answering_decode_batch(self):
+        nlp = pipeline("question-answering", model=BertForQuestionAnswering(self.config), tokenizer=self.tokenizer)
+        start, end = np.random.rand(4, 12), np.random.rand(4, 12)
+        starts, ends, scores = nlp.decode_batch(start, end, topk=5, max_answer_len=3)
+        for i in range(4):
+            # All the spans of at most 3 tokens, best first
+            spans = sorted(
+                ((start[i, s] * end[i, e], s, e) for s in range(12) for e in range(s, min(s + 3, 12))), reverse=True
+            )[:5]
+            self.assertListEqual(list(zip(starts[i], ends[i])), [(s, e) for _, s, e in spans])
+            self.assertTrue(np.allclose(scores[i], [score for score, _, _ in spans]))
+
+    @require_torch
+    def test_ner_batches(self):
+        self.config.id2label = {0: "O", 1: "B-PER", 2: "I-PER", 3: "B-LOC", 4: "I-LOC"}
+        self.config.label2id = {label: i for i, label in self.config.id2label.items()}
+        model = BertForTokenClassification(self.config)
+        model.eval()
+        # Keep all the labels, so that the entities of the padded batches cover whole sentences
+        nlp = pipeline("ner", model=model, tokenizer=self.tokenizer, ignore_labels=[])
+        sentences = ["the cat sat on the mat .", "unwanted", "where sat the running cat , on the mat ?"]
+        expected_entities = [nlp(sentence) for sentence in sentences]
+        entities = nlp(sentences, batch_size=2)
+
+        self.assertEqual(len(entities), len(sentences))
+        for sentence_entities, expected_sentence_entities in zip(entities, expected_entities):
+            self.assertEqual(len(sentence_entities), len(expected_sentence_entities))
+            for entity, expected_entity in zip(sentence_entities, expected_sentence_entities):
+                self.assertEqual(entity["word"], expected_entity["word"])
+                self.assertEqual(entity["entity"], expected_entity["entity"])
+                self.assertAlmostEqual(entity["score"], expected_entity["score"], places=5)
+
+        # The groups partition the tokens of each sentence in entities of the same type
+        groups = nlp(sentences, batch_size=2, grouped_entities=True)
+        for sentence_groups, sentence_entities in zip(groups, entities):
+            self.assertTrue(all(group["entity_group"] in ["O", "PER", "LOC"] for group in sentence_groups))
+            words = [entity["word"] for entity in sentence_entities]
+            self.assertEqual(
+                "".join(group["word"] for group in sentence_groups).replace(" ", "").replace("##", ""),
+                "".join(words).replace("##", ""),
+            )
+
+    @require_torch
+    def test_ner_group_entities(self):
+        nlp = pipeline("ner", model=BertForTokenClassification(self.config), tokenizer=self.tokenizer)
+        words = ["the", "cat", "runn", "##ing", "mat", "on", "the", "mat"]
+        labels = np.array(["B-PER", "B-PER", "B-LOC", "B-LOC", "I-LOC", "I-LOC", "B-LOC", "I-LOC"], dtype=object)
+        scores = np.array([0.5, 0.7, 0.2, 0.4, 0.6, 0.1, 0.3, 0.5])
+        sentence_idx = np.array([0, 0, 0, 0, 0, 1, 1, 1])
+        token_idx = np.array([1, 2, 3, 4, 5, 1, 2, 3])
+        groups = nlp._group_entities(2, sentence_idx, token_idx, words, labels, scores)
+
+        # Adjacent B- entities of the same type are not merged, but B- sub-tokens and I- tokens extend the entity
+        self.assertListEqual(
+            [[(group["word"], group["entity_group"]) for group in sentence_groups] for sentence_groups in groups],
+            [[("the", "PER"), ("cat", "PER"), ("running mat", "LOC")], [("on", "LOC"), ("the mat", "LOC")]],
+        )
+        self.assertTrue(np.allclose([group["score"] for group in groups[0]], [0.5, 0.7, 0.4]))
+
+    @require_torch
+    def test_fill_mask_batches(self):
+        model = BertForMaskedLM(self.config)
+        model.eval()
+        nlp = pipeline("fill-mask", model=model, tokenizer=self.tokenizer, topk=4)
+        texts = ["the cat [MASK] on the mat .", "where [MASK] the runn [MASK] cat ?"]
+        results = nlp(texts)
+        self.assertEqual(len(results[0]), 4)
+        self.assertEqual([len(mask_results) for mask_results in results[1]], [4, 4])
+        self.assertListEqual([result["token"] for result in nlp(texts[0])], [result["token"] for result in results[0]])
+
+        for text, text_results in zip(texts, [[results[0]], results[1]]):
+            input_ids = self.tokenizer.encode(text)
+            mask_positions = [i for i, token in enumerate(input_ids) if token == self.tokenizer.mask_token_id]
+            for position, mask_results in zip(mask_positions, text_results):
+                scores = [result["score"] for result in mask_results]
+                self.assertListEqual(scores, sorted(scores, reverse=True))
+                for result in mask_results:
+                    # Same sequence as decoding the text with the candidate in place of its mask
+                    filled_ids = list(input_ids)
+                    filled_ids[position] = result["token"]
+                    self.assertEqual(result["sequence"], self.tokenizer.decode(filled_ids))
+
+        # The tokenization spaces are cleaned up across the mask, like in a full decode ("do not" becomes "don't")
+        text = "do [MASK] sat ."
+        input_ids = self.tokenizer.encode(text)
+        position = input_ids.index(self.tokenizer.mask_token_id)
+        for result in nlp(text, topk=self.tokenizer.vocab_size):
+            filled_ids = list(input_ids)
+            filled_ids[position] = result["token"]
+            self.assertEqual(result["sequence"], self.tokenizer.decode(filled_ids))
+            if result["token"] == self.tokenizer.convert_tokens_to_ids("not"):
+                self.assertIn("don't", result["sequence"])
+
+        self.assertRaises(ValueError, nlp, "the cat sat on the mat .")
+
+    @require_torch
+    def test_feature_extraction_pooling(self):
+        model = BertModel(self.config)
+        model.eval()
+        nlp = pipeline("feature-extraction", model=model, tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat .", "unwanted", "where sat the running cat ?"]
+        hidden_states = [np.array(nlp(text)[0]) for text in texts]
+
+        expected = {
+            "cls": [states[0] for states in hidden_states],
+            "mean": [states.mean(axis=0) for states in hidden_states],
+            "max": [states.max(axis=0) for states in hidden_states],
+        }
+        for pooling, expected_embeddings in expected.items():
+            embeddings = np.array(nlp(texts, pooling=pooling))
+            self.assertEqual(embeddings.shape, (len(texts), self.config.hidden_size))
+            self.assertTrue(np.allclose(embeddings, expected_embeddings, atol=1e-5))
+
+        self.assertRaises(ValueError, nlp, texts, pooling="min")
+
+    @require_torch
+    def test_feature_extraction_save_embeddings(self):
+        nlp = pipeline("feature-extraction", model=BertModel(self.config).eval(), tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat .", "unwanted", "where sat the running cat ?", "the mat", "on"]
+        expected = np.array(nlp(texts, pooling="mean"))
+
+        batches = list(nlp.iter_embeddings(iter(texts), batch_size=2))
+        self.assertListEqual([start for start, _ in batches], [0, 2, 4])
+        self.assertTrue(np.allclose(np.concatenate([batch for _, batch in batches]), expected, atol=1e-5))
+
+        npy_file = os.path.join(self.tmpdirname, "embeddings.npy")
+        nlp.save_embeddings(texts, npy_file, dtype="float16", batch_size=2)
+        embeddings = np.load(npy_file)
+        self.assertEqual(embeddings.dtype, np.float16)
+        self.assertTrue(np.allclose(embeddings, expected, atol=1e-2))
+
+        raw_file = os.path.join(self.tmpdirname, "embeddings.bin")
+        nlp.save_embeddings(texts, raw_file, batch_size=2)
+        embeddings = np.memmap(raw_file, dtype="float32", mode="r").reshape(len(texts), -1)
+        self.assertTrue(np.allclose(embeddings, expected, atol=1e-5))
+
+        # Streams without a length, e.g. the lines of a file, are saved given their number of texts
+        embeddings = nlp.save_embeddings((text for text in texts), npy_file, batch_size=2, num_texts=len(texts))
+        self.assertTrue(np.allclose(embeddings, expected, atol=1e-5))
+        self.assertRaises(ValueError, nlp.save_embeddings, (text for text in texts), npy_file)
+        self.assertRaises(ValueError, nlp.save_embeddings, iter(texts), npy_file, num_texts=len(texts) - 1)
+
+    @require_torch
+    def test_text_classification_batches(self):
+        model = BertForSequenceClassification(self.config)
+        model.eval()
+        nlp = pipeline("sentiment-analysis", model=model, tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat , unwanted .", "on", "where sat the running cat ?", "the mat", "unwanted"]
+        expected_results = nlp(texts, batch_size=1, sort_by_length=False)
+        self.assertEqual(len(expected_results), len(texts))
+
+        for kwargs in ({"batch_size": 2}, {"batch_size": 2, "sort_by_length": False}, {"batch_size": 10}):
+            results = nlp(texts, **kwargs)
+            self.assertListEqual([result["label"] for result in results], [r["label"] for r in expected_results])
+            for result, expected_result in zip(results, expected_results):
+                self.assertAlmostEqual(result["score"], expected_result["score"], places=5)
+
+        self.assertRaises(ValueError, nlp, texts, batch_size=0)
+
+    @require_torch
+    def test_summarization_batches(self):
+        config = BartConfig(
+            vocab_size=self.tokenizer.vocab_size,
+            d_model=16,
+            encoder_ffn_dim=8,
+            encoder_layers=1,
+            encoder_attention_heads=2,
+            decoder_ffn_dim=8,
+            decoder_layers=1,
+            decoder_attention_heads=2,
+            max_position_embeddings=64,
+            output_past=True,
+            pad_token_id=self.tokenizer.pad_token_id,
+            bos_token_id=self.tokenizer.cls_token_id,
+            eos_token_id=self.tokenizer.sep_token_id,
+        )
+        model = BartForConditionalGeneration(config)
+        model.eval()
+        nlp = pipeline("summarization", model=model, tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat , unwanted .", "on", "where sat the running cat ?", "the mat", "unwanted"]
+        generate_kwargs = {"max_length": 6, "min_length": 2, "do_sample": False, "num_beams": 1}
+        expected_results = [nlp(text, return_tensors=True, **generate_kwargs)[0] for text in texts]
+
+        results = nlp(texts, batch_size=2, return_tensors=True, **generate_kwargs)
+        iterated_results = list(nlp.iter_results(iter(texts), window_size=3, batch_size=2, **generate_kwargs))
+        self.assertEqual(len(results), len(texts))
+        self.assertEqual(len(iterated_results), len(texts))
+        for result, iterated_result, expected_result in zip(results, iterated_results, expected_results):
+            self.assertEqual(result["summary_text"], expected_result["summary_text"])
+            self.assertEqual(iterated_result["summary_text"], expected_result["summary_text"])
+            self.assertIn("summary_token_ids", result)
+
+    @require_torch
+    def test_run_command_batches(self):
+        from transformers.commands.run import RunCommand
+
+        model = BertForSequenceClassification(self.config)
+        model.eval()
+        nlp = pipeline("sentiment-analysis", model=model, tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat .", "on", "where sat the running cat ?", "the mat", "unwanted"]
+        input_path = os.path.join(self.tmpdirname, "input.jsonl")
+        with open(input_path, "w") as f:
+            f.write("".join(json.dumps({"text": text}) + "\n" for text in texts))
+
+        outputs = {}
+        for batch_size, num_workers in [(1, 0), (2, 0), (2, 2)]:
+            output_path = os.path.join(self.tmpdirname, "output-{}-{}.jsonl".format(batch_size, num_workers))
+            reader = PipelineDataFormat.from_str("jsonl", output_path, input_path, "text")
+            RunCommand(nlp, reader, batch_size=batch_size, num_workers=num_workers).run()
+            with open(output_path) as f:
+                outputs[(batch_size, num_workers)] = [json.loads(line) for line in f]
+
+        expected_outputs = outputs[(1, 0)]
+        self.assertEqual(len(expected_outputs), len(texts))
+        for batch_outputs in outputs.values():
+            self.assertListEqual([o["label"] for o in batch_outputs], [o["label"] for o in expected_outputs])
+            for output, expected_output in zip(batch_outputs, expected_outputs):
+                self.assertAlmostEqual(output["score"], expected_output["score"], places=5)
+
+    @require_torch
+    def test_run_command_feature_extraction_batches(self):
+        from transformers.commands.run import RunCommand
+
+        nlp = pipeline("feature-extraction", model=BertModel(self.config).eval(), tokenizer=self.tokenizer)
+        texts = ["the cat sat on the mat .", "on", "where sat the running cat ?"]
+        input_path = os.path.join(self.tmpdirname, "input.jsonl")
+        with open(input_path, "w") as f:
+            f.write("".join(json.dumps({"text": text}) + "\n" for text in texts))
+
+        outputs = {}
+        for batch_size in (1, 2):
+            output_path = os.path.join(self.tmpdirname, "features-{}.jsonl".format(batch_size))
+            reader = PipelineDataFormat.from_str("jsonl", output_path, input_path, "text")
+            RunCommand(nlp, reader, batch_size=batch_size).run()
+            with open(os.path.join(self.tmpdirname, "features-{}.pickle".format(batch_size)), "rb") as f:
+                outputs[batch_size] = pickle.load(f)
+
+        # One (sequence_length, hidden_size) output per row, whatever the padding of the batches
+        for batch_size, features in outputs.items():
+            self.assertEqual(len(features), len(texts))
+            for text, text_features, expected_features in zip(texts, features, outputs[1]):
+                self.assertEqual(
+                    np.array(text_features).shape, (len(self.tokenizer.encode(text)), self.config.hidden_size)
+                )
+                self.assertTrue(np.allclose(text_features, expected_features, atol=1e-5))
+
+
+class PipelineDataFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdirname = tempfile.mkdtemp()
+        self.rows = [{"question": "where ?", "context": "the mat"}, {"question": "who ?", "context": "the cat"}]
+        self.outputs = [{"answer": "mat", "score": 0.5}, {"answer": "cat", "score": 0.25}]
+
+    def _check_format(self, format, input_path):
+        output_path = os.path.join(self.tmpdirname, "output." + format)
+        reader = PipelineDataFormat.from_str(format, output_path, input_path, "question,context")
+        self.assertListEqual(list(reader), self.rows)
+        with reader:
+            # Written in several chunks, as by `transformers-cli run`
+            reader.write(self.outputs[:1])
+            reader.write([])
+            reader.write(self.outputs[1:])
+
+        reader = PipelineDataFormat.from_str(format, None, output_path, "answer")
+        self.assertListEqual(list(reader), [output["answer"] for output in self.outputs])
+        return output_path
+
+    def test_jsonl_format(self):
+        input_path = os.path.join(self.tmpdirname, "input.jsonl")
+        with open(input_path, "w") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in self.rows))
+        output_path = self._check_format("jsonl", input_path)
+        with open(output_path) as f:
+            self.assertListEqual([json.loads(line) for line in f], self.outputs)
+
+    def test_csv_format(self):
+        input_path = os.path.join(self.tmpdirname, "input.csv")
+        with open(input_path, "w") as f:
+            f.write("question,context\n" + "".join("{question},{context}\n".format(**row) for row in self.rows))
+        self._check_format("csv", input_path)
+
+    @require_pyarrow
+    def test_arrow_format(self):
+        import pyarrow as pa
+
+        input_path = os.path.join(self.tmpdirname, "input.arrow")
+        table = pa.Table.from_pydict({key: [row[key] for row in self.rows] for key in self.rows[0]})
+        writer = pa.ipc.new_file(input_path, table.schema)
+        writer.write_table(table)
+        writer.close()
+        output_path = self._check_format("arrow", input_path)
+        with pa.memory_map(output_path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            self.assertEqual(reader.num_record_batches, 2)
+            self.assertListEqual(reader.read_all().column("score").to_pylist(), [0.5, 0.25])
+
+    @require_pyarrow
+    def test_arrow_format_without_outputs(self):
+        output_path = os.path.join(self.tmpdirname, "output.arrow")
+        with PipelineDataFormat.from_str("arrow", output_path, None, "answer") as writer:
+            writer.write([])
+
+        # An empty output is still a valid Arrow file
+        reader = PipelineDataFormat.from_str("arrow", None, output_path, "answer")
+        self.assertListEqual(list(reader), [])
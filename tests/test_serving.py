@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from transformers import is_torch_available, pipeline
+from transformers.commands.serving import DynamicBatcher, ServeCommand, _serve_dependencies_installed, process_memory
+
+from .utils import require_torch
+
+
+if is_torch_available():
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+if _serve_dependencies_installed:
+    from fastapi.testclient import TestClient
+
+
+def require_serving(test_case):
+    """
+    Decorator marking a test that requires the serving dependencies (FastAPI, uvicorn).
+    """
+    if not _serve_dependencies_installed:
+        test_case = unittest.skip("test requires the serving dependencies")(test_case)
+    return test_case
+
+
+class DynamicBatcherTest(unittest.TestCase):
+    def test_batches(self):
+        started, release = threading.Event(), threading.Event()
+        batches = []
+
+        def process(inputs):
+            batches.append(list(inputs))
+            started.set()
+            # Hold the first batch, so that the next requests are queued
+            release.wait()
+            return [2 * x for x in inputs]
+
+        batcher = DynamicBatcher(process, max_batch_size=4, max_wait_ms=50)
+        first = batcher.submit([0])
+        started.wait()
+        futures = [batcher.submit([1, 2]), batcher.submit([3]), batcher.submit([4, 5]), batcher.submit([6])]
+        self.assertEqual(batcher.metrics()["queue_depth"], 6)
+        release.set()
+
+        self.assertListEqual(first.result(), [0])
+        self.assertListEqual([future.result() for future in futures], [[2, 4], [6], [8, 10], [12]])
+        # Requests are batched up to 4 inputs, without being split
+        self.assertListEqual(batches, [[0], [1, 2, 3], [4, 5, 6]])
+
+        metrics = batcher.metrics()
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertDictEqual(metrics["batch_sizes"], {1: 1, 3: 2})
+        self.assertEqual(metrics["requests"], 5)
+        self.assertLessEqual(metrics["latency_p50_ms"], metrics["latency_p99_ms"])
+        batcher.close()
+
+    def test_errors(self):
+        def process(inputs):
+            raise ValueError("wrong input")
+
+        batcher = DynamicBatcher(process)
+        self.assertRaises(ValueError, batcher.submit(["a"]).result)
+        self.assertListEqual(batcher.submit([]).result(), [])
+        batcher.close()
+
+    def test_close_with_batch_in_flight(self):
+        def process(inputs):
+            time.sleep(0.2)
+            return inputs
+
+        batcher = DynamicBatcher(process, max_wait_ms=50)
+        future = batcher.submit([1])
+        # Closed while the batch of the request is being collected or run
+        closing = threading.Thread(target=batcher.close, daemon=True)
+        closing.start()
+        closing.join(timeout=10)
+        self.assertFalse(closing.is_alive())
+        self.assertListEqual(future.result(timeout=0), [1])
+
+
+class ProcessMemoryTest(unittest.TestCase):
+    @unittest.skipUnless(os.path.isdir("/proc/self"), "test requires /proc")
+    def test_process_memory(self):
+        memory = process_memory(os.getpid())
+        self.assertGreater(memory["rss"], 0)
+        self.assertIsNone(process_memory(-1))
+
+
+class ServeCommandTest(unittest.TestCase):
+    def _pipeline(self):
+        tmpdirname = tempfile.mkdtemp()
+        vocab_tokens = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "cat", "sat", "on", "mat", "."]
+        with open(os.path.join(tmpdirname, "vocab.txt"), "w", encoding="utf-8") as vocab_writer:
+            vocab_writer.write("".join([token + "\n" for token in vocab_tokens]))
+        tokenizer = BertTokenizer(os.path.join(tmpdirname, "vocab.txt"))
+        config = BertConfig(
+            vocab_size=tokenizer.vocab_size,
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=37,
+        )
+        model = BertForSequenceClassification(config)
+        model.eval()
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    @require_serving
+    @require_torch
+    def test_forward_batches(self):
+        nlp = self._pipeline()
+        command = ServeCommand(nlp, "localhost", 8888, 1, batch_size=4, batch_timeout_ms=20)
+        client = TestClient(command._app)
+
+        texts = ["the cat sat on the mat .", "the cat", "on the mat", "sat .", "the mat sat on the cat ."]
+        with ThreadPoolExecutor(len(texts)) as executor:
+            responses = list(executor.map(lambda text: client.post("/forward", json={"inputs": text}), texts))
+        for text, response in zip(texts, responses):
+            self.assertEqual(response.status_code, 200)
+            output = response.json()["output"]
+            self.assertEqual(output["label"], nlp(text)[0]["label"])
+            self.assertAlmostEqual(output["score"], nlp(text)[0]["score"], places=5)
+
+        response = client.post("/forward", json={"inputs": texts[:2]})
+        self.assertEqual(len(response.json()["output"]), 2)
+
+        metrics = client.get("/metrics").json()["metrics"]
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["requests"], len(texts) + 1)
+        self.assertEqual(sum(int(size) * count for size, count in metrics["batch_sizes"].items()), len(texts) + 2)
+
+    @require_serving
+    @require_torch
+    def test_forward_alone(self):
+        nlp = self._pipeline()
+        client = TestClient(ServeCommand(nlp, "localhost", 8888, 1, batch_size=4)._app)
+
+        # A request run alone in its batch gets the same output as in a larger batch
+        text = "the cat sat on the mat ."
+        output = client.post("/forward", json={"inputs": text}).json()["output"]
+        self.assertEqual(output["label"], nlp(text)[0]["label"])
+        self.assertAlmostEqual(output["score"], nlp(text)[0]["score"], places=5)
+
+        outputs = client.post("/forward", json={"inputs": [text]}).json()["output"]
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs[0]["label"], output["label"])
+
+    @require_serving
+    @require_torch
+    def test_model_info(self):
+        nlp = self._pipeline()
+        client = TestClient(ServeCommand(nlp, "localhost", 8888, 1)._app)
+        response = client.get("/").json()
+        self.assertEqual(response["infos"]["hidden_size"], 32)
+        self.assertEqual(response["memory"]["pid"], os.getpid())
+        self.assertIn(str(os.getpid()), response["memory"]["workers"])
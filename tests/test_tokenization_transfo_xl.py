@@ -24,7 +24,13 @@ from .utils import require_torch
 
 
 if is_torch_available():
-    from transformers.tokenization_transfo_xl import TransfoXLTokenizer, VOCAB_FILES_NAMES
+    import torch
+    from transformers.tokenization_transfo_xl import (
+        LMOrderedIterator,
+        LMStreamIterator,
+        TransfoXLTokenizer,
+        VOCAB_FILES_NAMES,
+    )
 
 
 @require_torch
@@ -82,3 +88,24 @@ class TransfoXLTokenizationTest(TokenizerTesterMixin, unittest.TestCase):
         self.assertListEqual(
             tokenizer.tokenize(" \tHeLLo ! how  \n Are yoU ?  "), ["HeLLo", "!", "how", "Are", "yoU", "?"]
         )
+
+    def test_encode_file_stream(self):
+        tokenizer = TransfoXLTokenizer(vocab_file=self.vocab_file, lower_case=True)
+        text_file = os.path.join(self.tmpdirname, "text.txt")
+        lines = [" ".join(["want", "running", ",", "low"][: 1 + i % 4]) for i in range(50)]
+        with open(text_file, "w", encoding="utf-8") as writer:
+            writer.write("".join(line + "\n" for line in lines))
+
+        ids = list(tokenizer.encode_file_stream(text_file))
+        self.assertListEqual(ids, tokenizer.encode_file(text_file, ordered=True).tolist())
+        # The shards hold each line exactly once
+        shards = [list(tokenizer.encode_file_stream(text_file, shard=i, num_shards=3)) for i in range(3)]
+        self.assertListEqual(shards[0] + shards[1] + shards[2], ids)
+
+        ordered_batches = list(LMOrderedIterator(torch.tensor(ids), 1, 16, ext_len=3))
+        stream_batches = list(LMStreamIterator([iter(ids)], 16, ext_len=3))
+        self.assertEqual(len(stream_batches), len(ordered_batches))
+        for (stream_data, stream_target, stream_len), (data, target, seq_len) in zip(stream_batches, ordered_batches):
+            self.assertListEqual(stream_data.tolist(), data.tolist())
+            self.assertListEqual(stream_target.tolist(), target.tolist())
+            self.assertEqual(stream_len, seq_len)
@@ -3,7 +3,7 @@ import tempfile
 import unittest
 from distutils.util import strtobool
 
-from transformers.file_utils import _tf_available, _torch_available
+from transformers.file_utils import _onnxruntime_available, _pyarrow_available, _tf_available, _torch_available
 
 
 CACHE_DIR = os.path.join(tempfile.gettempdir(), "transformers_test")
@@ -97,6 +97,30 @@ def require_tf(test_case):
     return test_case
 
 
+def require_onnxruntime(test_case):
+    """
+    Decorator marking a test that requires ONNX Runtime.
+
+    These tests are skipped when ONNX Runtime isn't installed.
+
+    """
+    if not _onnxruntime_available:
+        test_case = unittest.skip("test requires ONNX Runtime")(test_case)
+    return test_case
+
+
+def require_pyarrow(test_case):
+    """
+    Decorator marking a test that requires PyArrow.
+
+    These tests are skipped when PyArrow isn't installed.
+
+    """
+    if not _pyarrow_available:
+        test_case = unittest.skip("test requires PyArrow")(test_case)
+    return test_case
+
+
 if _torch_available:
     # Set the USE_CUDA environment variable to select a GPU.
     torch_device = "cuda" if parse_flag_from_env("USE_CUDA") else "cpu"